@@ -1,15 +1,186 @@
-from retrieve import generate_payees_infos
-from process import generate_forms
-from generate_path import retrieve_source_path, retrieve_drop_path
-from payor_info import generate_payor_info
+from generate_path import retrieve_source_path
+from batch import expand_source_paths, run_books, exit_code, format_summaries
+from instrument import metrics
+from pathlib import Path
+import argparse
+import sys
 
-book_path = retrieve_source_path()
-drop_path = retrieve_drop_path(book_path)
+def main():
+    parser = argparse.ArgumentParser(prog='generate2307')
+    parser.add_argument(
+        'sources',
+        nargs='*',
+        help='source books or glob patterns, e.g. "clients/*.xlsx", the source path is asked when none is given'
+    )
+    parser.add_argument(
+        '--drop-path',
+        default='',
+        help='overrides the DROP_PATH of the sources, every book gets a sub directory named after it when many books are given'
+    )
+    parser.add_argument(
+        '--book-workers',
+        type=int,
+        default=1,
+        help='number of worker processes running the books in parallel, each worker owns its own session'
+    )
+    parser.add_argument(
+        '--renderer',
+        choices=['excel', 'xlsx'],
+        default='excel',
+        help='excel: write the forms through Excel, xlsx: patch the 2307 template package directly without Excel'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of worker processes rendering the forms, each worker owns its own renderer'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='reuse an existing drop path and render only the forms that changed since its manifest'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='continue a stopped run at its existing drop path, the forms recorded at its journal are skipped'
+    )
+    parser.add_argument(
+        '--sheets-per-workbook',
+        type=int,
+        default=0,
+        help='xlsx renderer only: write the forms as the sheets of workbooks holding up to this number of sheets, '
+            '0 writes one file per form'
+    )
+    parser.add_argument(
+        '--source-reader',
+        choices=['excel', 'xlsx'],
+        default='excel',
+        help='excel opens the xlsx sources with xlwings, xlsx streams their first sheet from the package without Excel, '
+            'a check always streams them'
+    )
+    parser.add_argument(
+        '--payee-master',
+        default='',
+        help='SQLite payee master kept across runs, the unchanged payees are taken from it, the new or changed ones are '
+            'saved to it and a row may leave the payee details of a known tin empty, a check only reads it'
+    )
+    parser.add_argument(
+        '--period',
+        choices=['month', 'quarter'],
+        default='month',
+        help='month writes a form per payee month, quarter writes a form per payee quarter with the base of each month '
+            'at its month column'
+    )
+    parser.add_argument(
+        '--output',
+        choices=['directory', 'zip'],
+        default='directory',
+        help='directory writes one file per form, zip streams the forms to zip archives at the drop path'
+    )
+    parser.add_argument(
+        '--archive-max-mb',
+        type=int,
+        default=0,
+        help='zip output only: start the next archive once an archive would exceed this size, 0 for the zip format limit'
+    )
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='render the forms at --workers worker processes while the source is still read, only a source '
+            'sorted by tin and period (--sorted-source) is rendered before its end'
+    )
+    parser.add_argument(
+        '--sorted-source',
+        action='store_true',
+        help='pipeline only: the source rows are sorted by tin and period, a payee period is rendered as soon as its rows end'
+    )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='dry run: validate the payor and every payee row and count the forms without writing them, '
+            'no drop path is created and no template is opened'
+    )
+    parser.add_argument(
+        '--metrics-json',
+        help='also write the phase timings, form latencies and backend operation counts of the run to this json file'
+    )
+    parser.add_argument(
+        '--profile',
+        help='profile the first form with cProfile and write its stats to this file, forms rendered by worker '
+            'processes aren\'t profiled'
+    )
+    args = parser.parse_args()
 
-payor_item = generate_payor_info(book_path)
+    if args.sheets_per_workbook < 0:
+        parser.error('--sheets-per-workbook should be 0 or more')
+    if args.sheets_per_workbook and args.renderer != 'xlsx':
+        parser.error('--sheets-per-workbook needs --renderer xlsx')
+    if args.sheets_per_workbook and (args.incremental or args.resume):
+        parser.error('--sheets-per-workbook can\'t be used with --incremental or --resume')
+    if args.archive_max_mb < 0:
+        parser.error('--archive-max-mb should be 0 or more')
+    if args.archive_max_mb and args.output != 'zip':
+        parser.error('--archive-max-mb needs --output zip')
+    if args.output == 'zip' and (args.incremental or args.resume or args.sheets_per_workbook):
+        parser.error('--output zip can\'t be used with --incremental, --resume or --sheets-per-workbook')
+    if args.profile and (args.workers > 1 or args.sheets_per_workbook):
+        parser.error('--profile needs the forms rendered one file at a time at this process')
 
-payee_info_dict = generate_payees_infos(book_path)
+    if args.book_workers < 1:
+        parser.error('--book-workers should be at least 1')
+    if args.book_workers > 1 and args.workers > 1:
+        parser.error('--book-workers can\'t be combined with --workers')
+    if args.book_workers > 1 and args.profile:
+        parser.error('--profile needs the books run at this process')
+    if args.check and (args.incremental or args.resume or args.profile):
+        parser.error('--check can\'t be used with --incremental, --resume or --profile')
+    if args.sorted_source and not args.pipeline:
+        parser.error('--sorted-source needs --pipeline')
+    if args.pipeline and (args.incremental or args.resume or args.sheets_per_workbook or args.profile or args.book_workers > 1):
+        parser.error('--pipeline can\'t be used with --incremental, --resume, --sheets-per-workbook, --profile or --book-workers')
 
-generate_forms(drop_path, payee_info_dict, payor_item)
+    metrics.profile_path = args.profile
 
-print('Test Finished')
\ No newline at end of file
+    try:
+        book_paths = expand_source_paths(args.sources) if args.sources else [retrieve_source_path()]
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    if args.drop_path and len(book_paths) > 1:
+        book_names = [Path(book_path).stem for book_path in book_paths]
+        if len(set(book_names)) < len(book_names):
+            parser.error('--drop-path needs books with distinct file names, their forms are written to sub directories named after them')
+
+    summaries = run_books({
+        'renderer': args.renderer,
+        'book_paths': book_paths,
+        'book_workers': args.book_workers,
+        'options': {
+            'drop_path': args.drop_path,
+            'check': args.check,
+            'pipeline': args.pipeline,
+            'sorted_source': args.sorted_source,
+            'source_reader': args.source_reader,
+            'workers': args.workers,
+            'incremental': args.incremental,
+            'resume': args.resume,
+            'sheets_per_workbook': args.sheets_per_workbook,
+            'output': args.output,
+            'archive_max_bytes': args.archive_max_mb * 1024 * 1024,
+            'payee_master': args.payee_master,
+            'period': args.period
+        }
+    })
+
+    print(format_summaries(summaries))
+    print(metrics.summary())
+    if args.metrics_json:
+        metrics.save(args.metrics_json)
+
+    print('Test Finished')
+
+    sys.exit(exit_code(summaries))
+
+if __name__ == '__main__':
+    main()
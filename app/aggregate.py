@@ -0,0 +1,173 @@
+from wtax_info import PayeeInfoDict, PayeeInfo, WtaxCellRef, PERIOD_MONTHS, period_first_month
+from wtax_item import EntityItem, WithholdingTaxItem
+from array import array
+from typing import Any, Hashable, NamedTuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class WtaxGroup(NamedTuple):
+    '''
+        sums of one (tin, year, month, atc code) group,
+        first_row is the column index of the first row of the group
+    '''
+    payee_key: Hashable
+    first_row: int
+    base: float
+    tax: float
+
+class WtaxColumns:
+    '''
+        Column store of the validated source rows, the strings are kept once and the rows only hold their codes.
+        The rows are grouped only when `aggregate_columns` is called
+    '''
+    def __init__(self) -> None:
+        self.entities: list[EntityItem] = []
+        self.atc_codes: list[str] = []
+        self.atc_descriptions: list[str] = []
+
+        self.__entity_codes: dict[int, int] = {}
+        self.__tin_codes: dict[str, int] = {}
+        self.__atc_codes: dict[str, int] = {}
+        self.__description_codes: dict[str, int] = {}
+
+        self.entity = array('q')
+        self.tin = array('q')
+        self.year = array('q')
+        self.month = array('q')
+        self.atc = array('q')
+        self.description = array('q')
+        self.base = array('d')
+        self.tax = array('d')
+
+    @staticmethod
+    def code_of(codes: dict[Any, int], value: Any, values: list[Any] | None = None) -> int:
+        code = codes.get(value)
+        if code is not None: return code
+
+        code = len(codes)
+        codes[value] = code
+        if values is not None: values.append(value)
+
+        return code
+
+    def append(self, payee_item: EntityItem, wtax_item: WithholdingTaxItem):
+        entity_code = self.__entity_codes.get(id(payee_item))
+        if entity_code is None:
+            entity_code = len(self.entities)
+            self.__entity_codes[id(payee_item)] = entity_code
+            self.entities.append(payee_item)
+
+        self.entity.append(entity_code)
+        self.tin.append(WtaxColumns.code_of(self.__tin_codes, payee_item.tin))
+        self.year.append(wtax_item.year)
+        self.month.append(wtax_item.month)
+        self.atc.append(WtaxColumns.code_of(self.__atc_codes, wtax_item.atc_code, self.atc_codes))
+        self.description.append(WtaxColumns.code_of(self.__description_codes, wtax_item.atc_description, self.atc_descriptions))
+        self.base.append(wtax_item.base)
+        self.tax.append(wtax_item.tax)
+
+    def __len__(self):
+        return len(self.base)
+
+def group_rows(columns: WtaxColumns) -> list[WtaxGroup]:
+    '''
+        pure python group by, the sums are added in row order
+    '''
+    groups: dict[tuple[int, int, int, int], list[Any]] = {}
+
+    for row, group_key in enumerate(zip(columns.tin, columns.year, columns.month, columns.atc)):
+        group = groups.get(group_key)
+        if group is None:
+            groups[group_key] = [row, columns.base[row], columns.tax[row]]
+        else:
+            group[1] += columns.base[row]
+            group[2] += columns.tax[row]
+
+    return [
+        WtaxGroup(group_key[:3], first_row, base, tax)
+        for group_key, (first_row, base, tax) in groups.items()
+    ]
+
+def group_rows_numpy(columns: WtaxColumns) -> list[WtaxGroup]:
+    '''
+        numpy group by on one composite integer key per row, `bincount` adds the sums in row order
+        so both group by give the same totals
+    '''
+    assert numpy is not None
+
+    tin = numpy.frombuffer(columns.tin, dtype=numpy.int64)
+    period = numpy.frombuffer(columns.year, dtype=numpy.int64) * 12 + numpy.frombuffer(columns.month, dtype=numpy.int64) - 1
+    atc = numpy.frombuffer(columns.atc, dtype=numpy.int64)
+
+    period = period - period.min()
+    period_count = int(period.max()) + 1
+    atc_count = len(columns.atc_codes)
+
+    row_keys = (tin * period_count + period) * atc_count + atc
+    group_keys, first_rows, row_groups = numpy.unique(row_keys, return_index=True, return_inverse=True)
+
+    row_groups = row_groups.reshape(-1)
+    base_sums = numpy.bincount(row_groups, weights=numpy.frombuffer(columns.base, dtype=numpy.float64), minlength=len(group_keys))
+    tax_sums = numpy.bincount(row_groups, weights=numpy.frombuffer(columns.tax, dtype=numpy.float64), minlength=len(group_keys))
+
+    return [
+        WtaxGroup(int(group_keys[group]) // atc_count, int(first_rows[group]), float(base_sums[group]), float(tax_sums[group]))
+        for group in numpy.argsort(first_rows, kind='stable')
+    ]
+
+def aggregate_columns(columns: WtaxColumns, use_numpy: bool | None = None, period: str = 'month') -> PayeeInfoDict:
+    '''
+        groups the rows by (tin, year, month, atc code) and returns the payee infos of the groups,
+        the payees and their atc codes keep the order of their first rows and every `WtaxCellRef.max_rows`
+        atc codes of a payee period starts another form.
+        use_numpy: None uses numpy when it is installed
+        period: quarter - the month groups of a payee quarter share its forms, an atc code is one line of a form
+            with the base of each month at its month column
+    '''
+    period_months = PERIOD_MONTHS[period]
+    payee_info_dict = PayeeInfoDict(period)
+    if not len(columns): return payee_info_dict
+
+    if use_numpy is None: use_numpy = numpy is not None
+    if use_numpy and numpy is None:
+        raise ImportError('numpy isn\'t installed')
+
+    groups = group_rows_numpy(columns) if use_numpy else group_rows(columns)
+
+    payee_groups: dict[Hashable, dict[int, list[WtaxGroup]]] = {}
+    for group in groups:
+        payee_key = group.payee_key
+        if period_months > 1:
+            row = group.first_row
+            payee_key = (columns.tin[row], columns.year[row], period_first_month(columns.month[row], period_months))
+
+        payee_groups.setdefault(payee_key, {}).setdefault(columns.atc[group.first_row], []).append(group)
+
+    for atc_groups in payee_groups.values():
+        atc_lines = list(atc_groups.values())
+
+        for form_start in range(0, len(atc_lines), WtaxCellRef.max_rows):
+            form_lines = atc_lines[form_start:form_start + WtaxCellRef.max_rows]
+
+            payee_info = None
+            for group in (group for line_groups in form_lines for group in line_groups):
+                row = group.first_row
+                wtax_item = WithholdingTaxItem.from_totals(
+                    atc_code=columns.atc_codes[columns.atc[row]],
+                    atc_description=columns.atc_descriptions[columns.description[row]],
+                    month=columns.month[row],
+                    year=columns.year[row],
+                    base=group.base,
+                    tax=group.tax
+                )
+
+                if payee_info is None:
+                    payee_info = PayeeInfo(columns.entities[columns.entity[row]], wtax_item, period_months)
+                payee_info.add_wtax_info(wtax_item)
+
+            if payee_info is not None: payee_info_dict.append_info(payee_info)
+
+    return payee_info_dict
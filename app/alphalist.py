@@ -0,0 +1,201 @@
+from row_source import RowSource
+from utils import ConvertTo
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Iterator, TextIO
+import csv
+import json
+
+PAYOR_FIELDS = (
+    'DROP_PATH',
+    'PAYOR_TIN',
+    'PAYOR_ORG_NAME',
+    'PAYOR_LAST_NAME',
+    'PAYOR_FIRST_NAME',
+    'PAYOR_MID_NAME',
+    'PAYOR_ADDRESS',
+    'PAYOR_ZIP_CODE',
+    'SIGNOR_NAME',
+    'SIGNOR_POSITION',
+    'SIGNOR_TIN'
+)
+ALPHALIST_SUFFIXES = ('.dat', '.csv')
+SIDECAR_SUFFIX = '.json'
+SOURCE_COLUMN_COUNT = 15
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y', '%m/%Y')
+
+def is_alphalist_path(source_path: str):
+    return Path(source_path).suffix.lower() in ALPHALIST_SUFFIXES
+
+def sidecar_path(source_path: str):
+    return Path(source_path).with_suffix(SIDECAR_SUFFIX)
+
+def read_sidecar(source_path: str) -> dict[str, Any]:
+    '''
+        returns the config next to the source, e.g. `alphalist.json` of `alphalist.dat`, or an empty dict when it doesn't exists
+            {"DROP_PATH": ..., "SIGNOR_NAME": ..., "ATC_DESCRIPTIONS": {"WC158": ...}}
+    '''
+    config_path = sidecar_path(source_path)
+    if not config_path.exists(): return {}
+
+    with open(config_path, encoding='utf-8') as config_file:
+        config = json.load(config_file)
+
+    if not isinstance(config, dict):
+        raise ValueError(f'This \'{config_path}\' config should be an object')
+
+    return config
+
+def parse_date(value: Any) -> Any:
+    '''
+        returns the datetime of the date texts of the exports, other values are returned as is
+        so the item validation reports them
+    '''
+    processed_value = ConvertTo.trimm_str(value)
+
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(processed_value, date_format)
+        except ValueError:
+            continue
+
+    return value
+
+def parse_amount(value: Any) -> Any:
+    return ConvertTo.trimm_str(value).replace(',', '') or value
+
+def dat_tin(tin: Any, branch: Any):
+    '''
+        the DAT keeps the 9 tin digits and the branch code apart, the form uses a 5 digits branch code
+    '''
+    processed_tin = ConvertTo.trimm_str(tin)
+    processed_branch = ConvertTo.trimm_str(branch)
+
+    if len(processed_tin) != 9: return processed_tin
+
+    return '-'.join((processed_tin[0:3], processed_tin[3:6], processed_tin[6:9], processed_branch.zfill(5)))
+
+class AlphalistSource(RowSource):
+    '''
+        Source rows streamed line by line from a BIR alphalist DAT export or a CSV of the source template columns.
+            DAT:
+                H line: H..., form type, tin, branch code, "registered name", MM/YYYY, ...
+                D line: D..., form type, sequence, tin, branch code, "registered name", "last name", "first name",
+                        "middle name", MM/YYYY, atc code, tax rate, income payment, tax withheld
+            CSV:
+                optional payor lines `PAYOR_TIN,<value>`, optional column header starting with `TIN`,
+                then the A-O columns of the source template
+        The payor fields found at the file are replaced by the fields of the sidecar config
+    '''
+    def __init__(self, source_path: str) -> None:
+        self.source_path = source_path
+        self.is_dat = Path(source_path).suffix.lower() == '.dat'
+        self.__config: dict[str, Any] | None = None
+        self.__payor_fields: dict[str, Any] | None = None
+
+    @property
+    def config(self) -> dict[str, Any]:
+        if self.__config is None: self.__config = read_sidecar(self.source_path)
+
+        return self.__config
+
+    @property
+    def atc_descriptions(self) -> dict[str, str]:
+        return {
+            ConvertTo.cap_str(atc_code): description
+            for atc_code, description in self.config.get('ATC_DESCRIPTIONS', {}).items()
+        }
+
+    def __open(self) -> TextIO:
+        return open(self.source_path, newline='', encoding='utf-8-sig')
+
+    def __read_header(self, source_file: TextIO) -> dict[str, Any]:
+        header_fields: dict[str, Any] = {}
+
+        for line in csv.reader(source_file):
+            if not line or not ''.join(line).strip(): continue
+
+            record_type = ConvertTo.cap_str(line[0])
+
+            if self.is_dat:
+                if not record_type.startswith('H'): break
+                if len(line) > 4:
+                    header_fields['PAYOR_TIN'] = dat_tin(line[2], line[3])
+                    header_fields['PAYOR_ORG_NAME'] = line[4]
+                continue
+
+            if record_type in PAYOR_FIELDS:
+                header_fields[record_type] = line[1] if len(line) > 1 else None
+                continue
+
+            break
+
+        return header_fields
+
+    @property
+    def payor_fields(self) -> dict[str, Any]:
+        '''
+            {payor field: value} of the PAYOR_FIELDS, missing fields are None
+        '''
+        if self.__payor_fields is None:
+            with self.__open() as source_file:
+                header_fields = self.__read_header(source_file)
+
+            self.__payor_fields = {
+                field: self.config.get(field, header_fields.get(field))
+                for field in PAYOR_FIELDS
+            }
+
+        return self.__payor_fields
+
+    def __dat_row(self, line: list[str], atc_descriptions: dict[str, str]) -> list[Any] | None:
+        if not ConvertTo.cap_str(line[0]).startswith('D'): return None
+
+        values = line + [''] * max(0, 14 - len(line))
+        atc_code = ConvertTo.cap_str(values[10])
+
+        return [
+            dat_tin(values[3], values[4]),
+            values[5],
+            values[6],
+            values[7],
+            values[8],
+            '',
+            '',
+            parse_date(values[9]),
+            atc_code,
+            atc_descriptions.get(atc_code, atc_code),
+            parse_amount(values[12]),
+            parse_amount(values[13]),
+            '',
+            '',
+            ''
+        ]
+
+    def __csv_row(self, line: list[str]) -> list[Any] | None:
+        record_type = ConvertTo.cap_str(line[0])
+        if record_type in PAYOR_FIELDS or record_type == 'TIN': return None
+
+        values = (line + [''] * SOURCE_COLUMN_COUNT)[:SOURCE_COLUMN_COUNT]
+        values[7] = parse_date(values[7])
+        values[10] = parse_amount(values[10])
+        values[11] = parse_amount(values[11])
+
+        return values
+
+    def rows(self) -> Iterator[tuple[str, list[Any]]]:
+        '''
+            yields (line reference, raw row values of the A-O source columns), only one line is kept at a time
+        '''
+        file_name = Path(self.source_path).name
+        atc_descriptions = self.atc_descriptions
+
+        with self.__open() as source_file:
+            source_reader = csv.reader(source_file)
+            for line in source_reader:
+                if not line or not ''.join(line).strip(): continue
+
+                raw_item = self.__dat_row(line, atc_descriptions) if self.is_dat else self.__csv_row(line)
+                if raw_item is None: continue
+
+                yield f'{file_name}:{source_reader.line_num}', raw_item
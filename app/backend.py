@@ -0,0 +1,97 @@
+from write_plan import WritePlan
+from instrument import metrics
+from pathlib import Path
+from typing import Any
+import os
+import tempfile
+
+def value_rows(value: Any) -> list[list[Any]]:
+    '''
+        returns the 2 dimensional rows of a value assigned to a range, a list is treated as one row
+    '''
+    if not isinstance(value, list): return [[value]]
+    if value and isinstance(value[0], list): return value
+
+    return [value]
+
+def range_value(rows: list[list[Any]], ndim: int | None = None) -> Any:
+    '''
+        returns the rows read from a range in the same shape as xlwings, a single cell is a scalar
+        and a single row or column is a list unless `ndim` is 2
+    '''
+    if ndim == 2: return rows
+    if len(rows) == 1 and len(rows[0]) == 1: return rows[0][0]
+    if len(rows) == 1: return rows[0]
+    if rows and len(rows[0]) == 1: return [row[0] for row in rows]
+
+    return rows
+
+class Backend:
+    '''
+        Spreadsheet engine used by the session manager. The `Sheet`, `Range` and `Shape`
+        attributes are the object types returned by the engine, used by callers for type checks
+    '''
+    name = ''
+    Sheet: Any = None
+    Range: Any = None
+    Shape: Any = None
+
+    def start_app(self) -> Any:
+        raise NotImplementedError
+
+    def quit_app(self, app: Any) -> None:
+        raise NotImplementedError
+
+    def open_book(self, app: Any, book_path: str) -> Any:
+        raise NotImplementedError
+
+    def book_bytes(self, book: Any) -> bytes:
+        '''
+            returns the book saved as an xlsx package, engines that only save to a path use a local temporary file
+        '''
+        temp_file, temp_path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(temp_file)
+
+        try:
+            book.save(path=temp_path)
+            return Path(temp_path).read_bytes()
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+
+    def apply_plan(self, sheet: Any, write_plan: WritePlan):
+        '''
+            writes the plan with one range write per column block or defined name and one text write per shape
+        '''
+        for range_ref, value in write_plan.range_blocks():
+            xw_range = sheet[range_ref]
+            if not isinstance(xw_range, self.Range):
+                raise TypeError(f'This range name or reference {range_ref} doesn\'t return a Range object')
+            xw_range.value = value
+            metrics.count('range_writes')
+
+        for shape_name, text in write_plan.shape_texts():
+            xw_shape = sheet.shapes[shape_name]
+            if not isinstance(xw_shape, self.Shape):
+                raise TypeError(f'This range name or reference {shape_name} doesn\'t return a Shape object')
+            xw_shape.text = text
+            metrics.count('shape_writes')
+
+class XlwingsBackend(Backend):
+    name = 'excel'
+
+    def __init__(self) -> None:
+        import xlwings
+
+        self.__xlwings = xlwings
+        self.Sheet = xlwings.Sheet
+        self.Range = xlwings.Range
+        self.Shape = xlwings.Shape
+
+    def start_app(self):
+        return self.__xlwings.App(visible=False, add_book=False)
+
+    def quit_app(self, app):
+        app.quit()
+
+    def open_book(self, app, book_path: str):
+        return app.books.open(book_path)
@@ -0,0 +1,376 @@
+from retrieve import generate_payees_infos, generate_source_payees_infos, retrieve_payees_infos, read_src_rows
+from process import generate_forms
+from pipeline import run_pipeline
+from generate_path import retrieve_drop_path, retrieve_source_drop_path, create_drop_path
+from payor_info import generate_payor_info, generate_source_payor_info
+from row_source import RowSource
+from alphalist import AlphalistSource, is_alphalist_path
+from xlsx_source import XlsxSource, is_xlsx_path
+from payee_master import PayeeMaster
+from session import ExcelSession, create_backend
+from checkpoint import ErrorReport, FormJournal
+from wtax_info import PayeeInfoDict
+from utils import ConvertTo
+from instrument import metrics
+from pathlib import Path
+from typing import Literal, TypedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+import glob
+import time
+import traceback
+
+EXIT_OK = 0
+EXIT_BOOK_ERRORS = 1
+EXIT_BOOK_FAILED = 2
+
+def expand_source_paths(patterns: list[str]) -> list[str]:
+    '''
+        returns the source paths of the given paths and glob patterns in the given order without duplicates,
+        a pattern matching nothing is an error
+    '''
+    source_paths: list[str] = []
+    for pattern in patterns:
+        matched_paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        matched_paths = [matched_path for matched_path in matched_paths if Path(matched_path).is_file()]
+
+        if not matched_paths:
+            raise FileNotFoundError(f'This source path \'{pattern}\' doesn\'t match any file')
+
+        for matched_path in matched_paths:
+            if matched_path not in source_paths: source_paths.append(matched_path)
+
+    return source_paths
+
+def book_drop_path(drop_path: str, book_path: str, is_shared: bool):
+    '''
+        drop path override of a book, a drop path shared by many books gets a sub directory named after each book
+    '''
+    if not drop_path or not is_shared: return drop_path
+
+    return str(Path(drop_path) / Path(book_path).stem)
+
+class BookOptions(TypedDict):
+    '''
+        drop_path: overrides the DROP_PATH of the source, empty to use the source's own
+        check: only validates the source and counts its forms, nothing is written and no template is opened
+        pipeline: renders the payee infos at the form workers while the source is still read
+        sorted_source: the source is sorted by tin and period, used by the pipeline
+        source_reader: excel - the xlsx sources are read by the session backend, xlsx - they're streamed from the package
+        output: directory - one file per form, zip - the forms are streamed to zip archives at the drop path
+        archive_max_bytes: size of a zip archive before the next one is started, 0 for the zip format limit
+        payee_master: path of the SQLite payee master reused across runs, empty to build every payee from the source,
+            a check only reads it
+        period: month - a form per payee month, quarter - a form per payee quarter with a column per month
+    '''
+    drop_path: str
+    check: bool
+    pipeline: bool
+    sorted_source: bool
+    source_reader: Literal['excel', 'xlsx']
+    workers: int
+    incremental: bool
+    resume: bool
+    sheets_per_workbook: int
+    output: Literal['directory', 'zip']
+    archive_max_bytes: int
+    payee_master: str
+    period: Literal['month', 'quarter']
+
+class BookSummary(TypedDict):
+    '''
+        status: ok - every form is saved, errors - invalid rows or failed forms, failed - the book stopped
+        On a check, forms are the forms that would be saved and failed_forms the forms skipped for invalid rows
+    '''
+    source_path: str
+    drop_path: str
+    status: Literal['ok', 'errors', 'failed']
+    forms: int
+    failed_forms: int
+    invalid_rows: int
+    error: str
+    seconds: float
+
+def count_checked_forms(payee_info_dict: PayeeInfoDict, error_report: ErrorReport) -> tuple[int, int]:
+    '''
+        returns (forms that would be saved, forms skipped for the invalid rows of their payee)
+    '''
+    form_count = 0
+    skipped_count = 0
+    for _, payee_info in payee_info_dict:
+        if payee_info.info.tin in error_report.failed_tins:
+            skipped_count += 1
+        else:
+            form_count += 1
+
+    return form_count, skipped_count
+
+def open_row_source(book_path: str, source_reader: str) -> RowSource | None:
+    '''
+        returns the reader of a source that isn't read by the session backend: an alphalist export,
+        or an xlsx source streamed from its package
+    '''
+    if is_alphalist_path(book_path): return AlphalistSource(book_path)
+    if source_reader == 'xlsx' and is_xlsx_path(book_path): return XlsxSource(book_path)
+
+    return None
+
+def open_payee_master(options: BookOptions):
+    return PayeeMaster(options['payee_master'], read_only=options['check']) if options['payee_master'] else None
+
+def check_book(session: ExcelSession, book_path: str, options: BookOptions) -> BookSummary:
+    '''
+        runs every validation of the payor and payee rows of a book and counts the forms it would generate,
+        no drop path is created and no form is written. An xlsx source is always streamed from its package
+        whatever the source reader, so a check doesn't start Excel
+    '''
+    summary: BookSummary = {
+        'source_path': book_path,
+        'drop_path': '',
+        'status': 'failed',
+        'forms': 0,
+        'failed_forms': 0,
+        'invalid_rows': 0,
+        'error': '',
+        'seconds': 0.0
+    }
+    error_report = ErrorReport()
+    row_source = open_row_source(book_path, 'xlsx')
+    payee_master: PayeeMaster | None = None
+    started = time.perf_counter()
+
+    try:
+        payee_master = open_payee_master(options)
+
+        if row_source is not None:
+            with metrics.phase('path resolution'):
+                summary['drop_path'] = ConvertTo.trimm_str(row_source.payor_fields['DROP_PATH'])
+
+            with metrics.phase('payor info'):
+                generate_source_payor_info(row_source)
+
+            payee_info_dict = generate_source_payees_infos(row_source, error_report, payee_master, options['period'])
+        else:
+            with metrics.phase('path resolution'):
+                summary['drop_path'] = ConvertTo.trimm_str(session.first_sheet(book_path)['DROP_PATH'].value)
+
+            with metrics.phase('payor info'):
+                generate_payor_info(session, book_path)
+
+            payee_info_dict = generate_payees_infos(session, book_path, error_report, payee_master, options['period'])
+
+        if not summary['drop_path']:
+            raise ValueError('The drop path is empty')
+
+        summary['forms'], summary['failed_forms'] = count_checked_forms(payee_info_dict, error_report)
+        summary['invalid_rows'] = error_report.count('retrieve')
+        summary['status'] = 'errors' if len(error_report) else 'ok'
+
+        validated_refs = {row_error.reference for row_error in error_report.row_errors}
+        for row_error in error_report.row_errors:
+            print(f'Check Phase - {row_error.reference} {row_error.column}: {row_error.message}')
+        for batch_error in error_report:
+            if batch_error.reference in validated_refs: continue
+            print(f'Check Phase - {batch_error.reference}: {batch_error.message}')
+    except Exception as e:
+        summary['error'] = f'{type(e).__name__}: {e}'
+        print(f'{traceback.format_exc()}\nBook Failed - {book_path}')
+    finally:
+        if row_source is not None: row_source.close()
+        if payee_master is not None: payee_master.close()
+
+    summary['seconds'] = time.perf_counter() - started
+
+    return summary
+
+def run_book(session: ExcelSession, book_path: str, options: BookOptions) -> BookSummary:
+    '''
+        generates the forms of one source book, an error stopping the book is reported on its summary
+    '''
+    if options['check']: return check_book(session, book_path, options)
+
+    summary: BookSummary = {
+        'source_path': book_path,
+        'drop_path': '',
+        'status': 'failed',
+        'forms': 0,
+        'failed_forms': 0,
+        'invalid_rows': 0,
+        'error': '',
+        'seconds': 0.0
+    }
+    exist_ok = options['incremental'] or options['resume']
+    error_report = ErrorReport()
+    row_source = open_row_source(book_path, options['source_reader'])
+    payee_master: PayeeMaster | None = None
+    started = time.perf_counter()
+
+    try:
+        payee_master = open_payee_master(options)
+
+        if row_source is not None:
+            with metrics.phase('path resolution'):
+                if options['drop_path']:
+                    drop_path = create_drop_path(options['drop_path'], exist_ok)
+                else:
+                    drop_path = retrieve_source_drop_path(row_source, exist_ok)
+
+            with metrics.phase('payor info'):
+                payor_item = generate_source_payor_info(row_source)
+
+            src_rows = row_source.rows()
+        else:
+            with metrics.phase('path resolution'):
+                if options['drop_path']:
+                    drop_path = create_drop_path(options['drop_path'], exist_ok)
+                else:
+                    drop_path = retrieve_drop_path(session, book_path, exist_ok)
+
+            with metrics.phase('payor info'):
+                payor_item = generate_payor_info(session, book_path)
+
+            src_rows = read_src_rows(session.first_sheet(book_path), session.backend.Range)
+
+        summary['drop_path'] = drop_path
+
+        if options['pipeline']:
+            results = run_pipeline({
+                'renderer': session.render_backend.name,
+                'workers': options['workers'],
+                'drop_path': drop_path,
+                'src_rows': src_rows,
+                'payor_item': payor_item,
+                'sorted_source': options['sorted_source'],
+                'sink_settings': {'kind': options['output'], 'drop_path': drop_path, 'max_bytes': options['archive_max_bytes']},
+                'error_report': error_report,
+                'journal': FormJournal(drop_path) if options['output'] == 'directory' else None,
+                'payee_master': payee_master,
+                'period': options['period']
+            })
+        else:
+            results = generate_forms(
+                session,
+                drop_path,
+                retrieve_payees_infos(src_rows, error_report, payee_master, options['period']),
+                payor_item,
+                workers=options['workers'],
+                incremental=options['incremental'],
+                resume=options['resume'],
+                error_report=error_report,
+                sheets_per_workbook=options['sheets_per_workbook'],
+                output=options['output'],
+                archive_max_bytes=options['archive_max_bytes']
+            )
+
+        summary['forms'] = len([result for result in results if result['is_success']])
+        summary['failed_forms'] = len(results) - summary['forms']
+        summary['invalid_rows'] = error_report.count('retrieve')
+        summary['status'] = 'errors' if len(error_report) else 'ok'
+
+        report_path = error_report.save(drop_path)
+        if report_path is not None:
+            print(f'{len(error_report)} errors, see the error report: {report_path}')
+    except Exception as e:
+        summary['error'] = f'{type(e).__name__}: {e}'
+        print(f'{traceback.format_exc()}\nBook Failed - {book_path}')
+    finally:
+        if row_source is not None: row_source.close()
+        if payee_master is not None: payee_master.close()
+
+    summary['seconds'] = time.perf_counter() - started
+
+    return summary
+
+def create_session(renderer: str, check: bool = False):
+    '''
+        the render apps are started upfront for a run, a check only opens the source books when they need a backend
+    '''
+    session = ExcelSession(render_backend=None if check or renderer == 'excel' else create_backend(renderer))
+
+    return session if check else session.start()
+
+worker_session: ExcelSession | None = None
+
+def init_book_worker(renderer: str, check: bool):
+    '''
+        creates the session owned by a book worker process, it's closed when the worker exits.
+        The render apps aren't started by a check
+    '''
+    global worker_session
+
+    worker_session = create_session(renderer, check)
+    Finalize(None, worker_session.close, exitpriority=10)
+
+def render_book(book_path: str, options: BookOptions) -> tuple[BookSummary, tuple[dict[str, float], dict[str, int], list[float]]]:
+    '''
+        returns the summary of the book and the metrics the worker collected for it
+    '''
+    if worker_session is None:
+        raise RuntimeError('The book worker isn\'t initialized')
+
+    summary = run_book(worker_session, book_path, options)
+
+    return summary, metrics.take()
+
+class SettingsRunBooks(TypedDict):
+    '''
+        book_workers: number of worker processes running the books, each worker owns its own session
+    '''
+    renderer: str
+    book_paths: list[str]
+    book_workers: int
+    options: BookOptions
+
+def run_books(settings: SettingsRunBooks) -> list[BookSummary]:
+    '''
+        runs every book in the given order, one after another sharing a single session or at a pool of worker processes.
+        A drop path override shared by many books gets a sub directory per book
+    '''
+    book_paths = settings['book_paths']
+    is_shared = bool(settings['options']['drop_path']) and len(book_paths) > 1
+
+    book_options: list[BookOptions] = [
+        {**settings['options'], 'drop_path': book_drop_path(settings['options']['drop_path'], book_path, is_shared)}
+        for book_path in book_paths
+    ]
+
+    if settings['book_workers'] <= 1:
+        session = create_session(settings['renderer'], settings['options']['check'])
+        try:
+            return [run_book(session, book_path, options) for book_path, options in zip(book_paths, book_options)]
+        finally:
+            session.close()
+
+    with ProcessPoolExecutor(
+        max_workers=settings['book_workers'],
+        initializer=init_book_worker,
+        initargs=(settings['renderer'], settings['options']['check'])
+    ) as executor:
+        summaries: list[BookSummary] = []
+        for summary, book_metrics in executor.map(render_book, book_paths, book_options):
+            summaries.append(summary)
+            metrics.merge(book_metrics)
+
+        return summaries
+
+def exit_code(summaries: list[BookSummary]):
+    '''
+        0 - every book is ok, 1 - a book has invalid rows or failed forms, 2 - a book stopped
+    '''
+    statuses = {summary['status'] for summary in summaries}
+
+    if 'failed' in statuses: return EXIT_BOOK_FAILED
+    if 'errors' in statuses: return EXIT_BOOK_ERRORS
+
+    return EXIT_OK
+
+def format_summaries(summaries: list[BookSummary]) -> str:
+    lines = [f'{"status":<7} {"forms":>6} {"failed":>6} {"invalid":>7} {"seconds":>8}  source']
+    for summary in summaries:
+        lines.append(
+            f'{summary["status"]:<7} {summary["forms"]:>6} {summary["failed_forms"]:>6} {summary["invalid_rows"]:>7} '
+            f'{summary["seconds"]:>8.2f}  {summary["source_path"]}'
+        )
+        if summary['error']: lines.append(f'        {summary["error"]}')
+
+    return '\n'.join(lines)
@@ -0,0 +1,97 @@
+from validation import RowError
+from pathlib import Path
+from typing import Iterable, Literal, NamedTuple
+import csv
+
+JOURNAL_NAME = '2307.journal'
+ERROR_REPORT_NAME = '2307.errors.csv'
+
+class BatchError(NamedTuple):
+    '''
+        phase: retrieve - a source row, process - a form
+        reference: row reference of the source or file path of the form
+    '''
+    phase: Literal['retrieve', 'process']
+    reference: str
+    message: str
+    detail: str
+
+class ErrorReport:
+    '''
+        Failures of a run collected instead of stopping the batch, the tins of the failed source rows
+        are kept so their payees aren't rendered with incomplete totals.
+            row_errors: every invalid column of the source rows found by the validation
+    '''
+    def __init__(self) -> None:
+        self.errors: list[BatchError] = []
+        self.row_errors: list[RowError] = []
+        self.failed_tins: set[str] = set()
+
+    def add(self, phase: Literal['retrieve', 'process'], reference: str, message: str, detail: str = ''):
+        self.errors.append(BatchError(phase, reference, message, detail))
+
+    def add_row(self, reference: str, tin: str, error: Exception, detail: str = ''):
+        self.add('retrieve', reference, f'{type(error).__name__}: {error}', detail)
+        if tin: self.failed_tins.add(tin)
+
+    def add_row_errors(self, reference: str, tin: str, row_errors: list[RowError]):
+        '''
+            adds every invalid column of a source row as one error of the row, the detail lists them by column
+        '''
+        self.add(
+            'retrieve',
+            reference,
+            '; '.join(row_error.message for row_error in row_errors),
+            '\n'.join(f'{row_error.column}: {row_error.message}' for row_error in row_errors)
+        )
+        self.row_errors += row_errors
+        if tin: self.failed_tins.add(tin)
+
+    def __len__(self):
+        return len(self.errors)
+
+    def __iter__(self):
+        return iter(self.errors)
+
+    def count(self, phase: Literal['retrieve', 'process']):
+        return len([error for error in self.errors if error.phase == phase])
+
+    def save(self, drop_path: str) -> str | None:
+        '''
+            writes the report at the drop path, a report of a previous run is removed when there's no error.
+            Returns the report path when written
+        '''
+        report_path = Path(drop_path) / ERROR_REPORT_NAME
+
+        if not self.errors:
+            report_path.unlink(missing_ok=True)
+            return None
+
+        with open(report_path, 'w', newline='', encoding='utf-8') as report_file:
+            report_writer = csv.writer(report_file)
+            report_writer.writerow(BatchError._fields)
+            report_writer.writerows(self.errors)
+
+        return str(report_path)
+
+class FormJournal:
+    '''
+        Append only list of the file names of the saved forms, every line is flushed once the form is saved
+        so a stopped run can be resumed
+    '''
+    def __init__(self, drop_path: str) -> None:
+        self.path = Path(drop_path) / JOURNAL_NAME
+
+    def completed(self) -> set[str]:
+        if not self.path.exists(): return set()
+
+        with open(self.path, encoding='utf-8') as journal_file:
+            return {line.strip() for line in journal_file if line.strip()}
+
+    def reset(self):
+        self.path.unlink(missing_ok=True)
+
+    def record(self, file_names: Iterable[str]):
+        with open(self.path, 'a', encoding='utf-8') as journal_file:
+            for file_name in file_names:
+                journal_file.write(file_name + '\n')
@@ -1,6 +1,9 @@
 from pathlib import Path
-import xlwings
+from session import ExcelSession
 from utils import ConvertTo
+from row_source import RowSource
+from instrument import metrics
+from typing import Any
 
 def retrieve_source_path():
     book_path = ConvertTo.trimm_str(input('Please provide the complete source path : '))
@@ -10,18 +13,26 @@ def retrieve_source_path():
     
     return book_path
 
-def retrieve_drop_path(book_path: str):
-    with xlwings.App() as xw_app:
-        souce_book = xw_app.books.open(book_path)
-        source_sheet = souce_book.sheets[0]
-        if not isinstance(source_sheet, xlwings.Sheet):
-            raise TypeError(f'The first sheet of this \'{book_path}\' doesn\'t return a Sheet Object')
-        
-        drop_path = ConvertTo.trimm_str(source_sheet['DROP_PATH'].value)
-        
-        if Path(drop_path).exists():
-            raise FileExistsError(f'This \'{drop_path}\' drop path directory exists, kindly delete it first if not needed')
-        
-        Path(drop_path).mkdir(parents=True)
-        
-        return drop_path
\ No newline at end of file
+def retrieve_drop_path(session: ExcelSession, book_path: str, exist_ok: bool = False):
+    source_sheet = session.first_sheet(book_path)
+    metrics.count('range_reads')
+
+    return create_drop_path(source_sheet['DROP_PATH'].value, exist_ok)
+
+def retrieve_source_drop_path(source: RowSource, exist_ok: bool = False):
+    return create_drop_path(source.payor_fields['DROP_PATH'], exist_ok)
+
+def create_drop_path(raw_drop_path: Any, exist_ok: bool = False):
+    '''
+        exist_ok: an existing drop path is reused, used by the incremental run
+    '''
+    drop_path = ConvertTo.trimm_str(raw_drop_path)
+    if not drop_path:
+        raise ValueError('The drop path is empty')
+
+    if Path(drop_path).exists() and not exist_ok:
+        raise FileExistsError(f'This \'{drop_path}\' drop path directory exists, kindly delete it first if not needed')
+
+    Path(drop_path).mkdir(parents=True, exist_ok=exist_ok)
+
+    return drop_path
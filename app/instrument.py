@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+import bisect
+import cProfile
+import json
+import time
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+class RunMetrics:
+    '''
+        Wall time per phase, latency of every rendered form and counts of the backend operations of a run.
+        The counts only cover the calls made at this process, worker processes report their form latencies
+        through the form results
+    '''
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.form_seconds: list[float] = []
+        self.profile_path: str | None = None
+        self.is_profiled = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        '''
+            adds the wall time of the block to the phase, repeated phases are summed
+        '''
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_form(self, seconds: float):
+        self.form_seconds.append(seconds)
+
+    def take(self) -> tuple[dict[str, float], dict[str, int], list[float]]:
+        '''
+            returns (phases, counters, form seconds) collected so far and starts over, used by worker processes
+        '''
+        collected = (self.phases, self.counters, self.form_seconds)
+        self.phases, self.counters, self.form_seconds = {}, {}, []
+
+        return collected
+
+    def merge(self, collected: tuple[dict[str, float], dict[str, int], list[float]]):
+        phases, counters, form_seconds = collected
+        for name, seconds in phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        for name, amount in counters.items():
+            self.count(name, amount)
+        self.form_seconds += form_seconds
+
+    def profile_once(self, call: Callable[[], Any]):
+        '''
+            runs the call under cProfile the first time when a profile path is set, otherwise only runs the call.
+            The stats are only written to the profile path, e.g. read with `python -m pstats`
+        '''
+        if self.profile_path is None or self.is_profiled:
+            return call()
+
+        self.is_profiled = True
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(call)
+        finally:
+            profiler.dump_stats(self.profile_path)
+
+    def form_latency(self) -> dict[str, Any]:
+        form_ms = sorted(seconds * 1000 for seconds in self.form_seconds)
+        if not form_ms: return {'count': 0}
+
+        def percentile(rank: float):
+            return round(form_ms[min(len(form_ms) - 1, int(rank * len(form_ms)))], 3)
+
+        histogram: dict[str, int] = {}
+        bucket_labels = [f'<{limit}ms' for limit in LATENCY_BUCKETS_MS] + [f'>={LATENCY_BUCKETS_MS[-1]}ms']
+        for milliseconds in form_ms:
+            label = bucket_labels[bisect.bisect_right(LATENCY_BUCKETS_MS, milliseconds)]
+            histogram[label] = histogram.get(label, 0) + 1
+
+        return {
+            'count': len(form_ms),
+            'mean_ms': round(sum(form_ms) / len(form_ms), 3),
+            'p50_ms': percentile(0.5),
+            'p90_ms': percentile(0.9),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(form_ms[-1], 3),
+            'histogram': {label: histogram[label] for label in bucket_labels if label in histogram}
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            'counters': dict(self.counters),
+            'forms': self.form_latency()
+        }
+
+    def summary(self) -> str:
+        lines = ['Run Summary']
+        for name, seconds in self.phases.items():
+            lines.append(f'  {name:<20} {seconds:10.3f} s')
+
+        for name, amount in self.counters.items():
+            lines.append(f'  {name:<20} {amount:10d}')
+
+        form_latency = self.form_latency()
+        if form_latency['count']:
+            lines.append(
+                f'  {"forms":<20} {form_latency["count"]:10d}  mean {form_latency["mean_ms"]} ms, '
+                f'p50 {form_latency["p50_ms"]} ms, p90 {form_latency["p90_ms"]} ms, max {form_latency["max_ms"]} ms'
+            )
+            for label, amount in form_latency['histogram'].items():
+                lines.append(f'    {label:>9} {amount:8d}')
+
+        return '\n'.join(lines)
+
+    def save(self, json_path: str):
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+
+metrics = RunMetrics()
@@ -0,0 +1,77 @@
+from write_plan import WritePlan
+from pathlib import Path
+from typing import Iterable
+import hashlib
+import json
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = '2307.manifest.json'
+
+def plan_hash(write_plan: WritePlan, content_hash: str, renderer: str) -> str:
+    '''
+        hash of every write of a form together with the hash of its template and the name of its render backend,
+        so a form is rendered again when its inputs, the template or the renderer changed
+    '''
+    form_hash = hashlib.sha256(f'{renderer}:{content_hash}'.encode('utf-8'))
+
+    for entry in write_plan:
+        form_hash.update(json.dumps((entry.kind, entry.target, entry.value), default=str).encode('utf-8'))
+
+    return form_hash.hexdigest()
+
+class OutputManifest:
+    '''
+        {file name: form hash} of the forms saved at the drop path by the previous run
+    '''
+    def __init__(self, drop_path: str, forms: dict[str, str] | None = None) -> None:
+        self.drop_path = drop_path
+        self.forms: dict[str, str] = {} if forms is None else forms
+
+    @property
+    def path(self):
+        return Path(self.drop_path) / MANIFEST_NAME
+
+    @staticmethod
+    def load(drop_path: str):
+        manifest = OutputManifest(drop_path)
+
+        try:
+            with open(manifest.path, encoding='utf-8') as manifest_file:
+                manifest_dict = json.load(manifest_file)
+        except (OSError, ValueError):
+            return manifest
+
+        if manifest_dict.get('version') == MANIFEST_VERSION:
+            manifest.forms = dict(manifest_dict.get('forms', {}))
+
+        return manifest
+
+    def is_current(self, file_name: str, form_hash: str):
+        return self.forms.get(file_name) == form_hash and (Path(self.drop_path) / file_name).exists()
+
+    def record(self, file_name: str, form_hash: str):
+        self.forms[file_name] = form_hash
+
+    def discard(self, file_name: str):
+        self.forms.pop(file_name, None)
+
+    def remove_stale(self, file_names: Iterable[str]) -> list[str]:
+        '''
+            deletes the forms of the previous run that aren't part of `file_names` anymore, returns their names
+        '''
+        current_names = set(file_names)
+        stale_names = [file_name for file_name in self.forms if file_name not in current_names]
+
+        for file_name in stale_names:
+            (Path(self.drop_path) / file_name).unlink(missing_ok=True)
+            self.discard(file_name)
+
+        return stale_names
+
+    def save(self):
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+
+        with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump({'version': MANIFEST_VERSION, 'forms': self.forms}, manifest_file, indent=2)
+
+        temp_path.replace(self.path)
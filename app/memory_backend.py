@@ -0,0 +1,193 @@
+from backend import Backend, value_rows, range_value
+from utils import split_range_ref, column_letter
+from typing import Any
+
+MAX_ROW = 1048576
+
+class MemoryRange:
+    def __init__(self, sheet: 'MemorySheet', range_ref: str, ndim: int | None = None) -> None:
+        (first_row, first_col), (last_row, last_col) = split_range_ref(range_ref)
+
+        self.sheet = sheet
+        self.address = range_ref
+        self.row = first_row
+        self.column = first_col
+        self.last_row = last_row
+        self.last_column = last_col
+        self.__ndim = ndim
+
+    def options(self, ndim: int | None = None):
+        return MemoryRange(self.sheet, self.address, ndim)
+
+    @property
+    def value(self) -> Any:
+        cells = self.sheet.cells
+        rows = [
+            [cells.get((row, col)) for col in range(self.column, self.last_column + 1)]
+            for row in range(self.row, self.last_row + 1)
+        ]
+        self.sheet.book.backend.range_reads += 1
+
+        return range_value(rows, self.__ndim)
+
+    @value.setter
+    def value(self, value: Any):
+        self.sheet.book.backend.range_writes += 1
+
+        for row_offset, row_values in enumerate(value_rows(value)):
+            for col_offset, cell_value in enumerate(row_values):
+                self.sheet.set_cell(self.row + row_offset, self.column + col_offset, cell_value)
+
+    def end(self, direction: str):
+        if direction != 'down':
+            raise ValueError(f'Unsupported direction: \'{direction}\'')
+
+        cells = self.sheet.cells
+        row = self.row
+
+        if cells.get((row + 1, self.column)) is not None:
+            while cells.get((row + 1, self.column)) is not None: row += 1
+        else:
+            below_rows = [cell_row for cell_row, cell_col in cells if cell_col == self.column and cell_row > row]
+            row = min(below_rows) if below_rows else MAX_ROW
+
+        return MemoryRange(self.sheet, f'{column_letter(self.column)}{row}')
+
+class MemoryShape:
+    def __init__(self, sheet: 'MemorySheet', name: str) -> None:
+        self.sheet = sheet
+        self.name = name
+
+    @property
+    def text(self) -> str:
+        return self.sheet.shape_texts[self.name]
+
+    @text.setter
+    def text(self, value: str):
+        self.sheet.book.backend.shape_writes += 1
+        self.sheet.shape_texts[self.name] = value
+
+class MemoryShapes:
+    def __init__(self, sheet: 'MemorySheet') -> None:
+        self.__sheet = sheet
+
+    def __getitem__(self, name: str):
+        if name not in self.__sheet.shape_texts:
+            raise KeyError(f'The shape \'{name}\' doesn\'t exist')
+
+        return MemoryShape(self.__sheet, name)
+
+    def __iter__(self):
+        return iter([MemoryShape(self.__sheet, name) for name in self.__sheet.shape_texts])
+
+class MemorySheet:
+    '''
+        In-memory stand-in of a worksheet.
+            cells: {(row, column index): value}, empty cells aren't stored
+            names: {defined name: A1 style reference}
+            shape_texts: {shape name: text}
+    '''
+    def __init__(
+        self,
+        name: str = 'Sheet1',
+        cells: dict[tuple[int, int], Any] | None = None,
+        names: dict[str, str] | None = None,
+        shape_texts: dict[str, str] | None = None
+    ) -> None:
+        self.name = name
+        self.cells: dict[tuple[int, int], Any] = {} if cells is None else dict(cells)
+        self.names: dict[str, str] = {} if names is None else dict(names)
+        self.shape_texts: dict[str, str] = {} if shape_texts is None else dict(shape_texts)
+        self.shapes = MemoryShapes(self)
+        self.book: MemoryBook
+
+    def __getitem__(self, ref: str):
+        return MemoryRange(self, self.names.get(ref, ref))
+
+    def set_cell(self, row: int, col: int, value: Any):
+        if value is None or value == '':
+            self.cells.pop((row, col), None)
+        else:
+            self.cells[(row, col)] = value
+
+    def copy(self):
+        return MemorySheet(self.name, self.cells, self.names, self.shape_texts)
+
+class MemoryBook:
+    def __init__(self, sheets: list[MemorySheet], backend: 'MemoryBackend | None' = None, path: str = '') -> None:
+        self.sheets = sheets
+        self.backend = MemoryBackend() if backend is None else backend
+        self.path = path
+
+        for sheet in sheets: sheet.book = self
+
+    def save(self, path: str | None = None):
+        saved_path = self.path if path is None else path
+        self.path = saved_path
+        self.backend.book_saves += 1
+        self.backend.saved[saved_path] = self.copy()
+
+    def close(self):
+        pass
+
+    def copy(self, backend: 'MemoryBackend | None' = None):
+        return MemoryBook([sheet.copy() for sheet in self.sheets], self.backend if backend is None else backend, self.path)
+
+class MemoryBooks:
+    def __init__(self, app: 'MemoryApp') -> None:
+        self.__app = app
+
+    def open(self, book_path: str):
+        return self.__app.backend.open_book(self.__app, book_path)
+
+class MemoryApp:
+    def __init__(self, backend: 'MemoryBackend') -> None:
+        self.backend = backend
+        self.books = MemoryBooks(self)
+
+    def quit(self):
+        self.backend.quit_app(self)
+
+class MemoryBackend(Backend):
+    '''
+        Backend holding registered books in memory, each open returns a fresh copy of the registered book
+        and each save records a copy of the book at `saved` keyed by the path
+    '''
+    name = 'memory'
+    Sheet = MemorySheet
+    Range = MemoryRange
+    Shape = MemoryShape
+
+    def __init__(self, books: dict[str, MemoryBook] | None = None) -> None:
+        self.books: dict[str, MemoryBook] = {}
+        self.saved: dict[str, MemoryBook] = {}
+        self.app_starts = 0
+        self.app_quits = 0
+        self.book_opens = 0
+        self.book_saves = 0
+        self.range_reads = 0
+        self.range_writes = 0
+        self.shape_writes = 0
+
+        for book_path, book in (books or {}).items(): self.register(book_path, book)
+
+    def register(self, book_path: str, book: MemoryBook):
+        self.books[book_path] = book.copy(self)
+
+    def start_app(self):
+        self.app_starts += 1
+        return MemoryApp(self)
+
+    def quit_app(self, app: MemoryApp):
+        self.app_quits += 1
+
+    def open_book(self, app: MemoryApp, book_path: str):
+        book = self.books.get(book_path)
+        if book is None:
+            raise FileNotFoundError(f'This book path \'{book_path}\' isn\'t registered')
+
+        self.book_opens += 1
+        opened_book = book.copy(self)
+        opened_book.path = book_path
+
+        return opened_book
@@ -0,0 +1,102 @@
+from backend import Backend
+from session import TemplateHandle
+from zip_stream import ZipStreamWriter, LOCAL_HEADER, CENTRAL_HEADER, END_RECORD, stored_entry
+from pathlib import Path
+from typing import BinaryIO, Literal, TypedDict
+
+ARCHIVE_NAME = '2307_forms'
+ZIP32_MAX_BYTES = 0xFFFFFFFF
+ZIP32_MAX_ENTRIES = 0xFFFF
+
+class SinkSettings(TypedDict):
+    '''
+        kind: directory - one file per form at the drop path, zip - the forms are added to zip archives at the drop path
+        max_bytes: zip only, size of an archive before the next one is started, 0 for the zip format limit
+    '''
+    kind: Literal['directory', 'zip']
+    drop_path: str
+    max_bytes: int
+
+class OutputSink:
+    '''
+        Destination of the rendered forms, `save` stores the current state of a template handle
+        under the file name of the form path and returns the reference of the saved form
+    '''
+    def save(self, backend: Backend, template: TemplateHandle, file_path: str) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class DirectorySink(OutputSink):
+    def save(self, backend: Backend, template: TemplateHandle, file_path: str):
+        template.save(file_path)
+
+        return file_path
+
+class ZipSink(OutputSink):
+    '''
+        Adds every form to a zip archive at the drop path as soon as it's rendered, the forms are stored as is
+        since an xlsx package is already compressed. An archive is closed with its central directory once the next
+        form would exceed `max_bytes` and the next archive is started, e.g. `2307_forms_001.zip`, `2307_forms_002.zip`
+    '''
+    def __init__(self, drop_path: str, max_bytes: int = 0, archive_name: str = ARCHIVE_NAME) -> None:
+        self.drop_path = drop_path
+        self.max_bytes = min(max_bytes, ZIP32_MAX_BYTES) if max_bytes > 0 else ZIP32_MAX_BYTES
+        self.archive_name = archive_name
+        self.archive_paths: list[str] = []
+        self.__archive_file: BinaryIO | None = None
+        self.__zip_stream: ZipStreamWriter | None = None
+        self.__central_size = 0
+
+    def __open_archive(self):
+        archive_path = str((Path(self.drop_path) / f'{self.archive_name}_{len(self.archive_paths) + 1:03d}.zip').resolve())
+
+        self.__archive_file = open(archive_path, 'wb')
+        self.__zip_stream = ZipStreamWriter(self.__archive_file)
+        self.__central_size = 0
+        self.archive_paths.append(archive_path)
+
+        return self.__zip_stream
+
+    def __close_archive(self):
+        if self.__zip_stream is not None: self.__zip_stream.close()
+        if self.__archive_file is not None: self.__archive_file.close()
+
+        self.__zip_stream = None
+        self.__archive_file = None
+
+    def save(self, backend: Backend, template: TemplateHandle, file_path: str):
+        entry = stored_entry(Path(file_path).name, template.save_bytes(backend))
+        name_size = len(entry.name.encode('utf-8'))
+        central_size = CENTRAL_HEADER.size + name_size
+
+        zip_stream = self.__zip_stream
+        if zip_stream is not None and len(zip_stream) and (
+            zip_stream.size + LOCAL_HEADER.size + name_size + len(entry.data) + self.__central_size + central_size + END_RECORD.size > self.max_bytes or
+            len(zip_stream) >= ZIP32_MAX_ENTRIES
+        ):
+            self.__close_archive()
+            zip_stream = None
+
+        if zip_stream is None: zip_stream = self.__open_archive()
+
+        zip_stream.write_entry(entry)
+        self.__central_size += central_size
+
+        return f'{self.archive_paths[-1]}#{entry.name}'
+
+    def close(self):
+        self.__close_archive()
+
+def create_sink(settings: SinkSettings, archive_name: str = ARCHIVE_NAME) -> OutputSink:
+    if settings['kind'] == 'directory': return DirectorySink()
+    if settings['kind'] == 'zip': return ZipSink(settings['drop_path'], settings['max_bytes'], archive_name)
+
+    raise ValueError(f'Invalid output sink: \'{settings["kind"]}\'')
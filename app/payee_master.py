@@ -0,0 +1,200 @@
+from wtax_item import EntityItem, entity_form_units
+from utils import ConvertTo
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple
+import json
+import sqlite3
+
+PAYEE_MASTER_VERSION = 1
+PAYEE_DETAIL_COLUMNS = (1, 2, 3, 4, 5, 6)
+SIGNOR_COLUMNS = (12, 13, 14)
+
+class PayeeRecord(NamedTuple):
+    '''
+        validated payee fields as they're processed by EntityItem, the signor name and position are kept apart
+        so the row of an omitted payee can be filled again, together with the formatted strings of the form
+    '''
+    tin: str
+    org_name: str
+    last_name: str
+    first_name: str
+    mid_name: str
+    address: str
+    zip_code: str
+    signor_name: str
+    signor_position: str
+    signor_tin: str
+    indiv_name: str
+    prod_entity_name: str
+    signor_info: str
+    form_units: str
+
+    @property
+    def payee_fields(self):
+        return self[1:10]
+
+CREATE_PAYEES_SQL = f'''
+    CREATE TABLE IF NOT EXISTS payees (
+        {', '.join(f'{field} TEXT NOT NULL' + (' PRIMARY KEY' if field == 'tin' else '') for field in PayeeRecord._fields)},
+        updated_at TEXT NOT NULL
+    )
+'''
+UPSERT_PAYEE_SQL = f'''
+    INSERT OR REPLACE INTO payees ({', '.join(PayeeRecord._fields)}, updated_at)
+    VALUES ({', '.join('?' for _ in PayeeRecord._fields)}, ?)
+'''
+SELECT_PAYEES_SQL = f'SELECT {", ".join(PayeeRecord._fields)} FROM payees'
+
+def load_records(connection: sqlite3.Connection) -> dict[str, PayeeRecord]:
+    version = connection.execute('PRAGMA user_version').fetchone()[0]
+    if version not in (0, PAYEE_MASTER_VERSION):
+        raise ValueError(f'The payee master has an unsupported version: {version}')
+
+    has_payees = connection.execute(
+        'SELECT 1 FROM sqlite_master WHERE type = \'table\' AND name = \'payees\''
+    ).fetchone() is not None
+    if not has_payees: return {}
+
+    return {record.tin: record for record in map(PayeeRecord._make, connection.execute(SELECT_PAYEES_SQL))}
+
+def payee_fields(raw_item: list[Any]) -> tuple[str, ...]:
+    '''
+        returns the processed (org name, last name, first name, middle name, address, zip code,
+        signor name, signor position, signor tin) of the raw row values, compared with the fields of a record
+    '''
+    return (
+        ConvertTo.cap_str(raw_item[1]),
+        ConvertTo.cap_str(raw_item[2]),
+        ConvertTo.cap_str(raw_item[3]),
+        ConvertTo.cap_str(raw_item[4]),
+        ConvertTo.proper_str(raw_item[5]),
+        ConvertTo.integer_str(raw_item[6]),
+        ConvertTo.cap_str(raw_item[12]),
+        ConvertTo.cap_str(raw_item[13]),
+        ConvertTo.trimm_str(raw_item[14])
+    )
+
+class PayeeMaster:
+    '''
+        Local SQLite store of the validated payees keyed by tin, kept across the monthly runs.
+        A payee whose row has the same details as its record is rebuilt from the record without validating
+        or formatting it again, a changed or new payee is validated and only its record is written.
+        Every record is loaded once when the store is opened and the changed records are written in one transaction
+        when it's closed, so the books of parallel workers only lock the store briefly.
+            read_only: the records are looked up but never written and a missing store isn't created, used by a check
+    '''
+    def __init__(self, db_path: str, read_only: bool = False) -> None:
+        self.db_path = db_path
+        self.read_only = read_only
+        self.hits = 0
+        self.updates = 0
+        self.filled_rows = 0
+        self.__connection: sqlite3.Connection | None = None
+        self.__records: dict[str, PayeeRecord] = {}
+        self.__changed: dict[str, tuple[str, ...]] = {}
+
+        if read_only:
+            if Path(db_path).exists():
+                with closing(sqlite3.connect(f'{Path(db_path).resolve().as_uri()}?mode=ro', uri=True)) as connection:
+                    self.__records = load_records(connection)
+            return
+
+        self.__connection = sqlite3.connect(db_path, timeout=30)
+        self.__records = load_records(self.__connection)
+        with self.__connection:
+            self.__connection.execute(CREATE_PAYEES_SQL)
+            self.__connection.execute(f'PRAGMA user_version = {PAYEE_MASTER_VERSION}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.__records)
+
+    def close(self):
+        if self.__connection is None: return
+
+        with self.__connection:
+            self.__connection.executemany(UPSERT_PAYEE_SQL, self.__changed.values())
+
+        self.__connection.close()
+        self.__connection = None
+        self.__changed = {}
+
+    def lookup(self, raw_item: list[Any]) -> EntityItem | None:
+        '''
+            returns the payee of the record with the same details as the row, otherwise None
+        '''
+        record = self.__records.get(ConvertTo.trimm_str(raw_item[0]))
+        if record is None or record.payee_fields != payee_fields(raw_item): return None
+
+        self.hits += 1
+
+        return EntityItem.from_fields(
+            tin=record.tin,
+            org_name=record.org_name,
+            last_name=record.last_name,
+            first_name=record.first_name,
+            mid_name=record.mid_name,
+            address=record.address,
+            zip_code=record.zip_code,
+            indiv_name=record.indiv_name,
+            prod_entity_name=record.prod_entity_name,
+            signor_info=record.signor_info,
+            signor_tin=record.signor_tin,
+            form_units=tuple(json.loads(record.form_units))
+        )
+
+    def save(self, raw_item: list[Any], payee_item: EntityItem):
+        '''
+            writes the record of a validated payee when it's new or its details changed
+        '''
+        fields = payee_fields(raw_item)
+        record = self.__records.get(payee_item.tin)
+        if record is not None and record.payee_fields == fields: return
+
+        form_units = payee_item.form_units
+        if form_units is None:
+            form_units = entity_form_units(payee_item)
+            payee_item.set_form_units(form_units)
+
+        record = PayeeRecord(
+            payee_item.tin,
+            *fields,
+            payee_item.indiv_name,
+            payee_item.prod_entity_name,
+            payee_item.signor_info,
+            json.dumps(form_units)
+        )
+        self.__records[payee_item.tin] = record
+        self.updates += 1
+
+        if self.read_only: return
+
+        self.__changed[payee_item.tin] = (*record, datetime.now().isoformat(timespec='seconds'))
+
+    def fill_rows(self, src_rows: Iterable[tuple[str, list[Any]]]) -> Iterator[tuple[str, list[Any]]]:
+        '''
+            yields the source rows with the payee details (B-G) of a known tin filled from its record when the row
+            omits all of them, the signor columns (M-O) are filled too when they're all empty
+        '''
+        for current_ref, raw_item in src_rows:
+            record = self.__records.get(ConvertTo.trimm_str(raw_item[0]))
+
+            if record is not None and not any(ConvertTo.trimm_str(raw_item[col]) for col in PAYEE_DETAIL_COLUMNS):
+                raw_item = list(raw_item)
+                for col, value in zip(PAYEE_DETAIL_COLUMNS, record[1:7]):
+                    raw_item[col] = value
+
+                if not any(ConvertTo.trimm_str(raw_item[col]) for col in SIGNOR_COLUMNS):
+                    for col, value in zip(SIGNOR_COLUMNS, record[7:10]):
+                        raw_item[col] = value
+
+                self.filled_rows += 1
+
+            yield current_ref, raw_item
@@ -1,23 +1,31 @@
-import xlwings
+from session import ExcelSession
 from wtax_item import EntityItem
+from alphalist import PAYOR_FIELDS
+from row_source import RowSource
+from instrument import metrics
+from typing import Any, Mapping
 
-def generate_payor_info(book_path: str):
-    with xlwings.App() as xw_app:
-        xw_app = xw_app.books.open(book_path)
-        source_sheet = xw_app.sheets[0]
-        if not isinstance(source_sheet, xlwings.Sheet):
-            raise TypeError(f'First sheet at source book isn\'t a Sheet object')
-        
-        return EntityItem(
-            tin=source_sheet['PAYOR_TIN'].value,
-            org_name=source_sheet['PAYOR_ORG_NAME'].value,
-            last_name=source_sheet['PAYOR_LAST_NAME'].value,
-            first_name=source_sheet['PAYOR_FIRST_NAME'].value,
-            mid_name=source_sheet['PAYOR_MID_NAME'].value,
-            address=source_sheet['PAYOR_ADDRESS'].value,
-            zip_code=source_sheet['PAYOR_ZIP_CODE'].value
-        ).add_signor(
-            signor_name=source_sheet['SIGNOR_NAME'].value,
-            signor_position=source_sheet['SIGNOR_POSITION'].value,
-            signor_tin=source_sheet['SIGNOR_TIN'].value
-        )
\ No newline at end of file
+def payor_info_from_fields(payor_fields: Mapping[str, Any]):
+    return EntityItem(
+        tin=payor_fields['PAYOR_TIN'],
+        org_name=payor_fields['PAYOR_ORG_NAME'],
+        last_name=payor_fields['PAYOR_LAST_NAME'],
+        first_name=payor_fields['PAYOR_FIRST_NAME'],
+        mid_name=payor_fields['PAYOR_MID_NAME'],
+        address=payor_fields['PAYOR_ADDRESS'],
+        zip_code=payor_fields['PAYOR_ZIP_CODE']
+    ).add_signor(
+        signor_name=payor_fields['SIGNOR_NAME'],
+        signor_position=payor_fields['SIGNOR_POSITION'],
+        signor_tin=payor_fields['SIGNOR_TIN']
+    )
+
+def generate_payor_info(session: ExcelSession, book_path: str):
+    source_sheet = session.first_sheet(book_path)
+    payor_fields = [field for field in PAYOR_FIELDS if field != 'DROP_PATH']
+    metrics.count('range_reads', len(payor_fields))
+
+    return payor_info_from_fields({field: source_sheet[field].value for field in payor_fields})
+
+def generate_source_payor_info(source: RowSource):
+    return payor_info_from_fields(source.payor_fields)
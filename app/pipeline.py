@@ -0,0 +1,208 @@
+from retrieve import EntityItemCache, parse_raw_item, payee_master_summary
+from payee_master import PayeeMaster
+from output_sink import SinkSettings
+from process import PayeeWorkUnit, FormResult, generate_file_name, init_form_worker, render_form
+from wtax_item import EntityItem, WithholdingTaxItem
+from validation import validate_rows, row_errors_message
+from wtax_info import PayeeInfo, PayeeInfoDict, PERIOD_MONTHS, period_first_month
+from checkpoint import ErrorReport, FormJournal
+from instrument import metrics
+from utils import ConvertTo
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, ALL_COMPLETED, wait
+from pathlib import Path
+from typing import Any, Iterable, TypedDict
+import traceback
+
+PENDING_FORMS_PER_WORKER = 4
+
+class StreamAggregator:
+    '''
+        Groups the parsed rows into the payee infos of their payee period while the source is still read, the rows of an
+        atc code join the form already holding it and a new atc code starts another form once the last one is full,
+        so the forms are the same as the ones of `aggregate_columns`.
+        A payee period is complete at the end of the source, or when the source is sorted by tin and period,
+        once the rows of the next payee period start. A full form of an unsorted source isn't closed early,
+        a later row of one of its atc codes would still change its totals.
+            period: month or quarter, the months of a payee period
+    '''
+    def __init__(self, sorted_source: bool = False, period: str = 'month') -> None:
+        self.sorted_source = sorted_source
+        self.period_months = PERIOD_MONTHS[period]
+        self.__open_infos: dict[str, list[PayeeInfo]] = {}
+        self.__closed_keys: set[str] = set()
+        self.__last_key: str | None = None
+
+    def __close(self, payee_key: str) -> list[tuple[int, PayeeInfo]]:
+        self.__closed_keys.add(payee_key)
+
+        return list(enumerate(self.__open_infos.pop(payee_key, []), 1))
+
+    def add(self, payee_item: EntityItem, wtax_item: WithholdingTaxItem) -> list[tuple[int, PayeeInfo]]:
+        '''
+            returns the (form count, payee info) of the payee period completed by the row
+        '''
+        first_month = period_first_month(wtax_item.month, self.period_months)
+        payee_key = PayeeInfoDict.payee_key(payee_item.tin, first_month, wtax_item.year)
+        if payee_key in self.__closed_keys:
+            raise ValueError(f'The source isn\'t sorted by tin and period, the rows of \'{payee_key}\' aren\'t consecutive')
+
+        completed_infos: list[tuple[int, PayeeInfo]] = []
+        if self.sorted_source and payee_key != self.__last_key:
+            if self.__last_key is not None: completed_infos = self.__close(self.__last_key)
+            self.__last_key = payee_key
+
+        payee_infos = self.__open_infos.setdefault(payee_key, [])
+
+        payee_info = next((payee_info for payee_info in payee_infos if payee_info.wtax_dict[wtax_item.atc_code] is not None), None)
+        if payee_info is None and payee_infos and not payee_infos[-1].is_wtax_full:
+            payee_info = payee_infos[-1]
+        if payee_info is None:
+            payee_info = PayeeInfo(payee_item, wtax_item, self.period_months)
+            payee_infos.append(payee_info)
+
+        payee_info.add_wtax_info(wtax_item)
+
+        return completed_infos
+
+    def flush(self) -> list[tuple[int, PayeeInfo]]:
+        '''
+            returns the payee infos still open at the end of the source in the order of their first rows
+        '''
+        completed_infos: list[tuple[int, PayeeInfo]] = []
+        for payee_key in list(self.__open_infos):
+            completed_infos += self.__close(payee_key)
+
+        return completed_infos
+
+class SettingsRunPipeline(TypedDict):
+    '''
+        src_rows: (row reference, raw row values of the A-O source columns)
+        sorted_source: the source is sorted by tin and period, a payee period is rendered as soon as its rows end,
+            otherwise the forms are rendered once the whole source is read
+        error_report: the invalid rows are collected to it and the reading continues, otherwise the error is raised
+        payee_master: the rows omitting the payee details of a known tin are filled from it and the unchanged payees
+            are taken from it
+        period: month - a form per payee month, quarter - a form per payee quarter
+    '''
+    renderer: str
+    workers: int
+    drop_path: str
+    src_rows: Iterable[tuple[str, list[Any]]]
+    payor_item: EntityItem
+    sorted_source: bool
+    sink_settings: SinkSettings
+    error_report: ErrorReport | None
+    journal: FormJournal | None
+    payee_master: PayeeMaster | None
+    period: str
+
+def run_pipeline(settings: SettingsRunPipeline) -> list[FormResult]:
+    '''
+        reads and groups the source rows at this process while the completed payee infos are rendered and saved
+        at a pool of worker processes. At most `PENDING_FORMS_PER_WORKER` forms per worker wait for the pool,
+        the reading pauses until a form is saved. Only a sorted source overlaps the reading and the rendering
+        and keeps the memory bounded to its open payee period, an unsorted source is held until it's read
+        and its forms are rendered after.
+        The forms of a payee with an invalid row found after they were saved are deleted and reported as skipped,
+        the ones already added to an archive are only reported
+    '''
+    error_report = settings['error_report']
+    journal = settings['journal']
+    max_pending = settings['workers'] * PENDING_FORMS_PER_WORKER
+
+    aggregator = StreamAggregator(settings['sorted_source'], settings['period'])
+    payee_master = settings['payee_master']
+    entity_cache = EntityItemCache(payee_master)
+    src_rows = settings['src_rows'] if payee_master is None else payee_master.fill_rows(settings['src_rows'])
+    pending: dict[Future[FormResult], PayeeWorkUnit] = {}
+    results: list[tuple[FormResult, str]] = []
+
+    if journal is not None: journal.reset()
+    if not settings['sorted_source']:
+        print('Process Phase - the source isn\'t sorted by tin and period, its forms are rendered once it\'s read, see --sorted-source')
+
+    def collect(return_when: str):
+        with metrics.phase('render wait'):
+            done_futures, _ = wait(pending, return_when=return_when)
+
+        for future in done_futures:
+            work_unit = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception:
+                result = {'file_path': work_unit['file_path'], 'is_success': False, 'error': traceback.format_exc(), 'seconds': 0.0}
+
+            if not result['is_success']:
+                print(f'{result["error"]}\nProcess Phase - Error on: {result["file_path"]}')
+            elif journal is not None:
+                journal.record([Path(result['file_path']).name])
+
+            metrics.add_form(result['seconds'])
+            results.append((result, work_unit['payee_info'].info.tin))
+
+    def submit(executor: ProcessPoolExecutor, completed_infos: list[tuple[int, PayeeInfo]]):
+        for payee_count, payee_info in completed_infos:
+            if len(pending) >= max_pending: collect(FIRST_COMPLETED)
+
+            work_unit: PayeeWorkUnit = {
+                'file_path': str((Path(settings['drop_path']) / generate_file_name(payee_info, payee_count)).resolve()),
+                'payee_info': payee_info
+            }
+            pending[executor.submit(render_form, work_unit)] = work_unit
+
+    with metrics.phase('pipeline'), ProcessPoolExecutor(
+        max_workers=settings['workers'],
+        initializer=init_form_worker,
+        initargs=(settings['renderer'], settings['sink_settings'], settings['payor_item'])
+    ) as executor:
+        for current_ref, raw_item, row_errors in validate_rows(src_rows):
+            if row_errors:
+                if error_report is None:
+                    print(f'Retrieve Phase - Error on - {current_ref}')
+                    raise ValueError(row_errors_message(row_errors))
+
+                error_report.add_row_errors(current_ref, ConvertTo.trimm_str(raw_item[0]), row_errors)
+                continue
+
+            try:
+                payee_item, wtax_item = parse_raw_item(raw_item, entity_cache)
+            except Exception as e:
+                if error_report is None:
+                    print(f'{traceback.format_exc()}\nRetrieve Phase - Error on - {current_ref}')
+                    raise
+
+                error_report.add_row(current_ref, ConvertTo.trimm_str(raw_item[0]), e, traceback.format_exc())
+                continue
+
+            submit(executor, aggregator.add(payee_item, wtax_item))
+
+        submit(executor, aggregator.flush())
+        if pending: collect(ALL_COMPLETED)
+
+    print(f'Retrieve Phase - {len(entity_cache)} payees, cache hits: {entity_cache.hits}, misses: {entity_cache.misses}')
+    if payee_master is not None: print(payee_master_summary(payee_master))
+
+    form_results: list[FormResult] = []
+    for result, tin in results:
+        if error_report is not None and tin in error_report.failed_tins:
+            if not result['is_success'] or settings['sink_settings']['kind'] == 'directory':
+                Path(result['file_path']).unlink(missing_ok=True)
+                error_report.add('process', result['file_path'], 'Skipped: the payee has invalid source rows')
+            else:
+                error_report.add('process', result['file_path'], 'Invalid: the payee has invalid source rows, the form is left in its archive')
+            continue
+
+        form_results.append(result)
+
+    failed_results = [result for result in form_results if not result['is_success']]
+    if failed_results:
+        print(f'Process Phase - {len(failed_results)} of {len(form_results)} forms failed')
+
+    if error_report is not None:
+        if error_report.count('retrieve'):
+            print(f'Retrieve Phase - {error_report.count("retrieve")} invalid rows, their payees are skipped')
+
+        for result in failed_results:
+            error_report.add('process', result['file_path'], result['error'].strip().splitlines()[-1], result['error'])
+
+    return form_results
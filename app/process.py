@@ -1,122 +1,87 @@
-import xlwings
 from pathlib import Path
-from wtax_item import EntityItem
+from session import ExcelSession, create_backend
+from backend import Backend
+from xlsx_backend import XlsxBackend, XlsxSheet
+from xlsx_workbook import XlsxWorkbookWriter
+from wtax_item import EntityItem, PayeeFormatInput, entity_form_units
 from wtax_info import PayeeInfoDict, PayeeInfo, WithholdingTaxDict, WtaxCellRef
-from typing import TypedDict, Literal
+from write_plan import WritePlan
+from template_layout import TemplateLayout, load_layout, template_hash
+from manifest import OutputManifest, plan_hash
+from checkpoint import ErrorReport, FormJournal
+from instrument import metrics
+from output_sink import OutputSink, DirectorySink, SinkSettings, ARCHIVE_NAME, create_sink
+from typing import TypedDict, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
 import re
 from calendar import monthrange
+import os
+import time
 import traceback
-import sys
 
-def convert_to_double_digit(value: str):
-    return ('0' + value) if len(value) == 1 else value
-
-
-class PayeeFormatInput:
-    @staticmethod
-    def period_mmdd(month: str, day: int):
-        double_digit_month = convert_to_double_digit(month)
-        double_digit_day = convert_to_double_digit(str(day))
-        return f' {double_digit_month[0]}  {double_digit_month[1]}   {double_digit_day[0]}   {double_digit_day[1]}'
-    
-    @staticmethod
-    def period_yyyy(year: str):
-        return f' {year[0]}  {year[1]}   {year[2]}  {year[3]}'
-    
-    @staticmethod
-    def tin_unit(unit: str):
-        return f' {unit[0]}  {unit[1]}   {unit[2]}'
-    
-    @staticmethod
-    def branch_unit(unit: str):
-        return f'  {unit[0]}   {unit[1]}   {unit[2]}   {unit[3]}   {unit[4]}'
-    
-    @staticmethod
-    def zip_code(zip_code: str):
-        if len(zip_code) < 4: return ''
-        return f' {zip_code[0]}  {zip_code[1]}   {zip_code[2]}  {zip_code[3]}'
-    
-
-def perform_write(source_sheet: xlwings.Sheet, ref_name: str, value: str | int, sheet_type: Literal['range'] | Literal['shape']):
-    if sheet_type == 'range':
-        xw_range = source_sheet[ref_name]
-        if not isinstance(xw_range, xlwings.Range):
-            raise TypeError(f'This range name or reference {ref_name} doesn\'t return a Range object')
-        xw_range.value = value
-    elif sheet_type == 'shape':
-        xw_shape = source_sheet.shapes[ref_name]
-        if not isinstance(xw_shape, xlwings.Shape):
-            raise TypeError(f'This range name or reference {ref_name} doesn\'t return a Shape object')
-        xw_shape.text = value
+NON_WORD_PATTERN = re.compile('\\W')
 
 
 def to_2dec(value: float | int):
     return '{:.2f}'.format(value)
 
 
+def plan_clear_wtax_infos(write_plan: WritePlan):
+    for ref_name in WtaxCellRef.written_refs():
+        write_plan.add(ref_name, None, 'range')
+
+
 class SettingsProcessWTaxInfos(TypedDict):
-    source_sheet: xlwings.Sheet
+    write_plan: WritePlan
     wtax_dict: WithholdingTaxDict
 
 
 def process_wtax_infos(settings: SettingsProcessWTaxInfos):
-    source_sheet = settings['source_sheet']
+    write_plan = settings['write_plan']
     wtax_dict = settings['wtax_dict']
 
+    if not len(wtax_dict):
+        raise ValueError('The withholding tax lines shouldn\'t be empty')
+
     wtax_count = 0
-    period_month = None
     for wtax_info in wtax_dict:
         wtax_count += 1
-        period_month = wtax_info.quarter_month
 
         wtax_item = wtax_info.info
-        base = to_2dec(wtax_item.base)
-        tax = to_2dec(wtax_item.tax)
-
-        perform_write(source_sheet, WtaxCellRef.atc_description(wtax_count), wtax_item.atc_description, 'range')
-        perform_write(source_sheet, WtaxCellRef.atc_code(wtax_count), wtax_item.atc_code, 'range')
-        perform_write(source_sheet, WtaxCellRef.month_period(period_month, wtax_count), base, 'range')
-        perform_write(source_sheet, WtaxCellRef.total_base(wtax_count), base, 'range')
-        perform_write(source_sheet, WtaxCellRef.total_tax(wtax_count), tax, 'range')
-    
-    if not isinstance(period_month, int):
-        raise ValueError('Period Month shouldn\'t be \'None\'')
+        write_plan.add(WtaxCellRef.atc_description(wtax_count), wtax_item.atc_description, 'range')
+        write_plan.add(WtaxCellRef.atc_code(wtax_count), wtax_item.atc_code, 'range')
+        for period_month in sorted(wtax_info.month_bases):
+            write_plan.add(WtaxCellRef.month_period(period_month, wtax_count), to_2dec(wtax_info.month_bases[period_month]), 'range')
+        write_plan.add(WtaxCellRef.total_base(wtax_count), to_2dec(wtax_item.base), 'range')
+        write_plan.add(WtaxCellRef.total_tax(wtax_count), to_2dec(wtax_item.tax), 'range')
     
     total_base = to_2dec(wtax_dict.total_base)
     total_tax = to_2dec(wtax_dict.total_tax)
 
-    perform_write(source_sheet, WtaxCellRef.total_qtr_period(period_month), total_base, 'range')
-    perform_write(source_sheet, 'Total_Base', total_base, 'range')
-    perform_write(source_sheet, 'Total_Tax', total_tax, 'range')
+    for period_month, month_total in wtax_dict.month_totals.items():
+        write_plan.add(WtaxCellRef.total_qtr_period(period_month), to_2dec(month_total), 'range')
+    write_plan.add('Total_Base', total_base, 'range')
+    write_plan.add('Total_Tax', total_tax, 'range')
 
 
 class SettingsWriteSignor(TypedDict):
-    source_sheet: xlwings.Sheet
+    write_plan: WritePlan
     ref_signor_info: str
     ref_signor_tin: str
     signor_item: EntityItem
 
 
 def write_signor(settings: SettingsWriteSignor):
-    source_sheet = settings['source_sheet']
+    write_plan = settings['write_plan']
     signor_item = settings['signor_item']
     
-    perform_write(source_sheet, settings['ref_signor_info'], signor_item.signor_info, 'range')
-    perform_write(source_sheet, settings['ref_signor_tin'], signor_item.signor_tin, 'range')
-
-
-def write_tin_segments(source_sheet: xlwings.Sheet, tin_segments: list[str], tin_segment_refs: list[str]):
-    for segment_index in range(len(tin_segment_refs)):
-        perform_write(
-            source_sheet,
-            tin_segment_refs[segment_index],
-            PayeeFormatInput.tin_unit(tin_segments[segment_index]),
-            'shape'
-        )
+    write_plan.add(settings['ref_signor_info'], signor_item.signor_info, 'range')
+    write_plan.add(settings['ref_signor_tin'], signor_item.signor_tin, 'range')
 
 
 class SettingsWriteEntityInfo(TypedDict):
-    source_sheet: xlwings.Sheet
+    write_plan: WritePlan
     entity_item: EntityItem
     ref_tin_segments: list[str]
     ref_branch: str
@@ -126,123 +91,694 @@ class SettingsWriteEntityInfo(TypedDict):
 
 
 def write_entity_info(settings: SettingsWriteEntityInfo):
-    source_sheet = settings['source_sheet']
+    '''
+        the formatted units are computed once per entity item and kept on it, an item of the payee master already has them
+    '''
+    write_plan = settings['write_plan']
     entity_item = settings['entity_item']
-    tin_segments = entity_item.tin_segments
 
-    write_tin_segments(source_sheet, tin_segments, settings['ref_tin_segments'])
-    perform_write(source_sheet, settings['ref_branch'], PayeeFormatInput.branch_unit(tin_segments[3]), 'shape')
-    perform_write(source_sheet, settings['ref_entity_name'], entity_item.prod_entity_name, 'shape')
-    perform_write(source_sheet, settings['ref_entity_address'], entity_item.address, 'shape')
-    perform_write(source_sheet, settings['ref_zip_code'], PayeeFormatInput.zip_code(entity_item.zip_code), 'shape')
+    form_units = entity_item.form_units
+    if form_units is None:
+        form_units = entity_form_units(entity_item)
+        entity_item.set_form_units(form_units)
 
+    for unit_ref, tin_unit in zip(settings['ref_tin_segments'], form_units[:3]):
+        write_plan.add(unit_ref, tin_unit, 'shape')
+    write_plan.add(settings['ref_branch'], form_units[3], 'shape')
+    write_plan.add(settings['ref_entity_name'], entity_item.prod_entity_name, 'shape')
+    write_plan.add(settings['ref_entity_address'], entity_item.address, 'shape')
+    write_plan.add(settings['ref_zip_code'], form_units[4], 'shape')
 
-class SettingsWritePayee(TypedDict):
-    file_path: str
+
+def template_path():
+    source_path = str((Path(__file__) / '../../format/2307.xlsx').resolve())
+
+    if not Path(source_path).exists():
+        raise FileNotFoundError(f'The source 2307 form path: \'{source_path}\' doesn\'t exist')
+
+    return source_path
+
+
+class SettingsPlanPayee(TypedDict):
     payee_info: PayeeInfo
     payor_item: EntityItem
 
 
-def write_payee(settings: SettingsWritePayee):
-    payor_item = settings['payor_item']
+def plan_period(month: str, year: str, period_months: int = 1) -> WritePlan:
+    '''
+        returns the return period writes shared by the forms of the same period, from the first day of `month`
+        to the last day of the last of its `period_months` months
+    '''
+    last_month = str(int(month) + period_months - 1)
+    last_day = monthrange(int(year), int(last_month))[1]
+
+    write_plan = WritePlan()
+
+    write_plan.add('Return_Period_From_mmdd', PayeeFormatInput.period_mmdd(month, 1), 'shape')
+    write_plan.add('Return_Period_From_yyyy', PayeeFormatInput.period_yyyy(year), 'shape')
+    write_plan.add('Return_Period_To_mmdd', PayeeFormatInput.period_mmdd(last_month, last_day), 'shape')
+    write_plan.add('Return_Period_To_yyyy', PayeeFormatInput.period_yyyy(year), 'shape')
+
+    return write_plan
+
+
+def plan_payor(payor_item: EntityItem) -> WritePlan:
+    '''
+        returns the payor and payor signor writes shared by every form of the payor
+    '''
+    write_plan = WritePlan()
+
+    write_entity_info({
+        'write_plan': write_plan,
+        'entity_item': payor_item,
+        'ref_tin_segments': ['Payor_Tin_1', 'Payor_Tin_2', 'Payor_Tin_3'],
+        'ref_branch': 'Payor_Branch',
+        'ref_entity_name': 'Payor_Name',
+        'ref_entity_address': 'Payor_Address',
+        'ref_zip_code': 'Payor_Zip_Code'
+    })
+
+    write_signor({
+        'write_plan': write_plan,
+        'signor_item': payor_item,
+        'ref_signor_info': 'Signor_Payor_Info',
+        'ref_signor_tin': 'Signor_Payor_Tin'
+    })
+
+    return write_plan
+
+
+def plan_payee_fields(payee_info: PayeeInfo) -> WritePlan:
+    '''
+        returns the writes specific to a form, the withholding tax rows and totals left by a previous form are cleared first
+    '''
+    write_plan = WritePlan()
+
+    plan_clear_wtax_infos(write_plan)
+
+    write_entity_info({
+        'write_plan': write_plan,
+        'entity_item': payee_info.info,
+        'ref_tin_segments': ['Payee_Tin_1', 'Payee_Tin_2', 'Payee_Tin_3'],
+        'ref_branch': 'Payee_Branch',
+        'ref_entity_name': 'Payee_Name',
+        'ref_entity_address': 'Payee_Address',
+        'ref_zip_code': 'Payee_Zip_Code'
+    })
+
+    process_wtax_infos({
+        'write_plan': write_plan,
+        'wtax_dict': payee_info.wtax_dict
+    })
+
+    write_signor({
+        'write_plan': write_plan,
+        'signor_item': payee_info.info,
+        'ref_signor_info': 'Signor_Payee_Info',
+        'ref_signor_tin': 'Signor_Payee_Tin'
+    })
+
+    return write_plan
+
+
+def plan_payee(settings: SettingsPlanPayee) -> WritePlan:
+    '''
+        returns every write of a form: the payor and return period layers followed by the fields of the payee
+    '''
     payee_info = settings['payee_info']
-    payee_item = payee_info.info
-    month = payee_info.month
-    year = payee_info.year
-    last_day = monthrange(int(year), int(month))[1]
 
-    source_path = str((Path(__file__) / '../../format/2307.xlsx').resolve())
+    write_plan = WritePlan()
+    write_plan.extend(plan_payor(settings['payor_item']))
+    write_plan.extend(plan_period(payee_info.month, payee_info.year, payee_info.period_months))
+    write_plan.extend(plan_payee_fields(payee_info))
 
-    if not Path(source_path).exists():
-        raise FileNotFoundError(f'The source 2307 form path: \'{source_path}\' doesn\'t exist')
-    
-    with xlwings.App() as xw_app:
-        source_book = xw_app.books.open(source_path)
-        source_sheet = source_book.sheets[0]
-        if not isinstance(source_sheet, xlwings.Sheet):
-            raise TypeError(f'First sheet isn\'t at \'{source_path}\' a Sheet Type ')
-        
-        perform_write(source_sheet, 'Return_Period_From_mmdd', PayeeFormatInput.period_mmdd(month, 1), 'shape')
-        perform_write(source_sheet, 'Return_Period_From_yyyy', PayeeFormatInput.period_yyyy(year), 'shape')
-        perform_write(source_sheet, 'Return_Period_To_mmdd', PayeeFormatInput.period_mmdd(month, last_day), 'shape')
-        perform_write(source_sheet, 'Return_Period_To_yyyy', PayeeFormatInput.period_yyyy(year), 'shape')
-
-        write_entity_info({
-            'source_sheet': source_sheet,
-            'entity_item': payee_item,
-            'ref_tin_segments': ['Payee_Tin_1', 'Payee_Tin_2', 'Payee_Tin_3'],
-            'ref_branch': 'Payee_Branch',
-            'ref_entity_name': 'Payee_Name',
-            'ref_entity_address': 'Payee_Address',
-            'ref_zip_code': 'Payee_Zip_Code'
-        })
+    return write_plan
 
-        write_entity_info({
-            'source_sheet': source_sheet,
-            'entity_item': payor_item,
-            'ref_tin_segments': ['Payor_Tin_1', 'Payor_Tin_2', 'Payor_Tin_3'],
-            'ref_branch': 'Payor_Branch',
-            'ref_entity_name': 'Payor_Name',
-            'ref_entity_address': 'Payor_Address',
-            'ref_zip_code': 'Payor_Zip_Code'
-        })
 
-        process_wtax_infos({
-            'source_sheet': source_sheet,
-            'wtax_dict': payee_info.wtax_dict
-        })
+def payor_key(payor_item: EntityItem) -> tuple[str, ...]:
+    '''
+        returns the tin and the fields written by `plan_payor`, a copy of the payor unpickled at a worker has the same key
+    '''
+    return (
+        payor_item.tin, payor_item.prod_entity_name, payor_item.address, payor_item.zip_code,
+        payor_item.signor_info, payor_item.signor_tin
+    )
 
-        write_signor({
-            'source_sheet': source_sheet,
-            'signor_item': payor_item,
-            'ref_signor_info': 'Signor_Payor_Info',
-            'ref_signor_tin': 'Signor_Payor_Tin'
-        })
 
-        write_signor({
-            'source_sheet': source_sheet,
-            'signor_item': payee_item,
-            'ref_signor_info': 'Signor_Payee_Info',
-            'ref_signor_tin': 'Signor_Payee_Tin'
-        })
+class StampLayers:
+    '''
+        Resolved plans of the layers shared by many forms, the payor layer is built once per `payor_key` and
+        the return period layer once per (month, year, period months). A template handle keeps the keys of the layers
+        stamped on it so the next form only writes its payee fields
+    '''
+    def __init__(self, layout: TemplateLayout) -> None:
+        self.layout = layout
+        self.__payor_plans: dict[tuple[str, ...], WritePlan] = {}
+        self.__period_plans: dict[tuple[str, str, int], WritePlan] = {}
 
-        source_book.save(path=settings['file_path'])
+    def payor_plan(self, payor_item: EntityItem) -> WritePlan:
+        layer_key = payor_key(payor_item)
 
+        payor_plan = self.__payor_plans.get(layer_key)
+        if payor_plan is None:
+            payor_plan = self.layout.resolve_plan(plan_payor(payor_item))
+            self.__payor_plans[layer_key] = payor_plan
 
-class SettingsProcessPayee(TypedDict):
-    drop_path: str
-    payee_dict: PayeeInfoDict
+        return payor_plan
+
+    @property
+    def payor_plan_count(self):
+        return len(self.__payor_plans)
+
+    def period_plan(self, month: str, year: str, period_months: int = 1) -> WritePlan:
+        period_plan = self.__period_plans.get((month, year, period_months))
+        if period_plan is None:
+            period_plan = self.layout.resolve_plan(plan_period(month, year, period_months))
+            self.__period_plans[(month, year, period_months)] = period_plan
+
+        return period_plan
+
+    def form_layers(self, payee_info: PayeeInfo, payor_item: EntityItem) -> list[tuple[str, tuple[str, ...], WritePlan]]:
+        '''
+            returns (layer name, layer key, layer plan) of the payor and return period layers of a form
+        '''
+        period_key = (payee_info.month, payee_info.year, str(payee_info.period_months))
+
+        return [
+            ('payor', payor_key(payor_item), self.payor_plan(payor_item)),
+            ('period', period_key, self.period_plan(payee_info.month, payee_info.year, payee_info.period_months))
+        ]
+
+    def payee_plan(self, payee_info: PayeeInfo):
+        return self.layout.resolve_plan(plan_payee_fields(payee_info))
+
+
+class SettingsWritePayee(TypedDict):
+    session: ExcelSession
+    template_path: str
+    layers: StampLayers
+    sink: OutputSink
+    file_path: str
+    payee_info: PayeeInfo
     payor_item: EntityItem
 
 
+def write_payee(settings: SettingsWritePayee) -> str:
+    '''
+        writes the payor and period layers only when the template handle holds layers of other keys, then the payee fields.
+        A failed write forgets the stamped layers so the next form writes them again.
+        Returns the reference of the form saved to the sink
+    '''
+    session = settings['session']
+    layers = settings['layers']
+    payee_info = settings['payee_info']
+
+    payee_plan = layers.payee_plan(payee_info)
+
+    with session.lease_template(settings['template_path']) as template:
+        try:
+            for layer_name, layer_key, layer_plan in layers.form_layers(payee_info, settings['payor_item']):
+                if template.layers.get(layer_name) == layer_key: continue
+
+                session.render_backend.apply_plan(template.sheet, layer_plan)
+                template.layers[layer_name] = layer_key
+
+            session.render_backend.apply_plan(template.sheet, payee_plan)
+        except Exception:
+            template.layers.clear()
+            raise
+
+        return settings['sink'].save(session.render_backend, template, settings['file_path'])
+
+
 def generate_file_name(payee_info: PayeeInfo, count: int) -> str:
+    '''
+        the period of a quarter form is named after its quarter, e.g. `2023_Q1_...`
+    '''
     raw_entity_name = payee_info.info.raw_entity_name
 
-    proc_org_name = payee_info.info.tin + '-' + re.sub('\\W', '', raw_entity_name)
+    proc_org_name = payee_info.info.tin + '-' + NON_WORD_PATTERN.sub('', raw_entity_name)
+    period_name = payee_info.month if payee_info.period_months == 1 else f'Q{(int(payee_info.month) + 2) // 3}'
+
+    return '_'.join((payee_info.year, period_name, proc_org_name, str(count))) + '.xlsx'
 
-    return '_'.join((payee_info.year, payee_info.month, proc_org_name, str(count))) + '.xlsx'
+
+class FormWorkUnit(TypedDict):
+    file_path: str
+    payee_info: PayeeInfo
+    payor_item: EntityItem
+
+
+class PayeeWorkUnit(TypedDict):
+    '''
+        the payee part of a form work unit sent to a form worker, the payor is sent once to each worker by `init_form_worker`
+    '''
+    file_path: str
+    payee_info: PayeeInfo
+
+
+class FormResult(TypedDict):
+    '''
+        seconds: wall time of the form, measured at the process that rendered it
+    '''
+    file_path: str
+    is_success: bool
+    error: str
+    seconds: float
 
 
-def process_payees(settings: SettingsProcessPayee):
-    for payee_set in settings['payee_dict']:
-        payee_info = payee_set[1]
-        file_name = generate_file_name(payee_info, payee_set[0])
-        file_path = str((Path(settings['drop_path']) / file_name).resolve())
-        
+class SettingsProcessPayee(TypedDict):
+    session: ExcelSession
+    sink: OutputSink
+    work_units: Iterable[FormWorkUnit]
+    journal: FormJournal | None
+
+
+def generate_work_units(drop_path: str, payee_dict: PayeeInfoDict, payor_item: EntityItem) -> Iterator[FormWorkUnit]:
+    for payee_count, payee_info in payee_dict:
+        file_name = generate_file_name(payee_info, payee_count)
+
+        yield {
+            'file_path': str((Path(drop_path) / file_name).resolve()),
+            'payee_info': payee_info,
+            'payor_item': payor_item
+        }
+
+
+def process_payees(settings: SettingsProcessPayee) -> list[FormResult]:
+    source_path = template_path()
+    layers = StampLayers(load_layout(source_path))
+
+    results: list[FormResult] = []
+    for work_unit in settings['work_units']:
+        file_path = work_unit['file_path']
+        form_settings: SettingsWritePayee = {
+            'session': settings['session'],
+            'template_path': source_path,
+            'layers': layers,
+            'sink': settings['sink'],
+            'file_path': file_path,
+            'payee_info': work_unit['payee_info'],
+            'payor_item': work_unit['payor_item']
+        }
+
+        started = time.perf_counter()
         try:
-            write_payee({
-                'file_path': file_path,
-                'payee_info': payee_info,
-                'payor_item': settings['payor_item']
+            saved_path = metrics.profile_once(lambda: write_payee(form_settings))
+        except Exception:
+            result: FormResult = {
+                'file_path': file_path, 'is_success': False, 'error': traceback.format_exc(),
+                'seconds': time.perf_counter() - started
+            }
+            print(f'{result["error"]}\nProcess Phase - Error on: {file_path}')
+        else:
+            result = {'file_path': saved_path, 'is_success': True, 'error': '', 'seconds': time.perf_counter() - started}
+            if settings['journal'] is not None: settings['journal'].record([Path(file_path).name])
+
+        results.append(result)
+
+    return results
+
+
+worker_session: ExcelSession | None = None
+worker_template_path = ''
+worker_layers: StampLayers | None = None
+worker_sink: OutputSink | None = None
+worker_payor_item: EntityItem | None = None
+
+
+def init_form_worker(renderer: str, sink_settings: SinkSettings | None = None, payor_item: EntityItem | None = None):
+    '''
+        starts the session owned by a worker process, it's closed when the worker exits.
+        A zip sink of a worker writes its own archives named after the worker process.
+        payor_item: the payor of every form rendered by `render_form` at the worker
+    '''
+    global worker_session, worker_template_path, worker_layers, worker_sink, worker_payor_item
+
+    worker_session = ExcelSession(create_backend(renderer)).start()
+    worker_template_path = template_path()
+    worker_layers = StampLayers(load_layout(worker_template_path))
+    worker_sink = DirectorySink() if sink_settings is None else create_sink(sink_settings, f'{ARCHIVE_NAME}_{os.getpid()}')
+    worker_payor_item = payor_item
+    Finalize(None, worker_session.close, exitpriority=10)
+    Finalize(None, worker_sink.close, exitpriority=10)
+
+
+def render_form(work_unit: PayeeWorkUnit) -> FormResult:
+    if worker_session is None or worker_layers is None or worker_sink is None or worker_payor_item is None:
+        raise RuntimeError('The form worker isn\'t initialized')
+
+    started = time.perf_counter()
+    try:
+        saved_path = write_payee({
+            'session': worker_session,
+            'template_path': worker_template_path,
+            'layers': worker_layers,
+            'sink': worker_sink,
+            'file_path': work_unit['file_path'],
+            'payee_info': work_unit['payee_info'],
+            'payor_item': worker_payor_item
+        })
+    except Exception:
+        return {
+            'file_path': work_unit['file_path'], 'is_success': False, 'error': traceback.format_exc(),
+            'seconds': time.perf_counter() - started
+        }
+
+    return {'file_path': saved_path, 'is_success': True, 'error': '', 'seconds': time.perf_counter() - started}
+
+
+class SettingsProcessPayeeParallel(TypedDict):
+    '''
+        payor_item: the payor of every work unit, it's sent once to each worker instead of with every form
+    '''
+    renderer: str
+    workers: int
+    sink_settings: SinkSettings
+    payor_item: EntityItem
+    work_units: Iterable[FormWorkUnit]
+    journal: FormJournal | None
+
+
+def process_payees_parallel(settings: SettingsProcessPayeeParallel) -> list[FormResult]:
+    '''
+        renders the forms at a pool of worker processes, each worker owns its backend and template handle.
+        A failed form is reported on its result and doesn't stop the other forms
+    '''
+    load_layout(template_path())
+
+    results: list[FormResult] = []
+    with ProcessPoolExecutor(
+        max_workers=settings['workers'],
+        initializer=init_form_worker,
+        initargs=(settings['renderer'], settings['sink_settings'], settings['payor_item'])
+    ) as executor:
+        futures = {
+            executor.submit(render_form, {'file_path': work_unit['file_path'], 'payee_info': work_unit['payee_info']}): work_unit['file_path']
+            for work_unit in settings['work_units']
+        }
+
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception:
+                result = {'file_path': futures[future], 'is_success': False, 'error': traceback.format_exc(), 'seconds': 0.0}
+            results.append(result)
+
+            if not result['is_success']:
+                print(f'{result["error"]}\nProcess Phase - Error on: {result["file_path"]}')
+            elif settings['journal'] is not None:
+                settings['journal'].record([Path(result['file_path']).name])
+
+    return results
+
+
+class WorkbookUnit(TypedDict):
+    file_path: str
+    work_units: list[FormWorkUnit]
+
+
+def generate_workbook_units(drop_path: str, work_units: list[FormWorkUnit], sheets_per_workbook: int) -> list[WorkbookUnit]:
+    return [
+        {
+            'file_path': str((Path(drop_path) / f'2307_forms_{workbook_count:03d}.xlsx').resolve()),
+            'work_units': work_units[unit_start:unit_start + sheets_per_workbook]
+        }
+        for workbook_count, unit_start in enumerate(range(0, len(work_units), sheets_per_workbook), 1)
+    ]
+
+
+class SettingsWriteWorkbook(TypedDict):
+    backend: Backend
+    template_path: str
+    layers: StampLayers
+    workbook_unit: WorkbookUnit
+
+
+def write_workbook(settings: SettingsWriteWorkbook) -> list[FormResult]:
+    '''
+        renders the forms of the workbook unit as its sheets, the result of a form refers to `workbook path#sheet name`.
+        A failed form is left out of the workbook. Every sheet starts as a copy of the sheet stamped with its payor and period
+    '''
+    backend = settings['backend']
+    layers = settings['layers']
+    if not isinstance(backend, XlsxBackend):
+        raise ValueError(f'The workbook output needs the xlsx renderer, not \'{backend.name}\'')
+
+    template = backend.template(settings['template_path'])
+    file_path = settings['workbook_unit']['file_path']
+
+    stamped_sheets: dict[tuple[tuple[str, ...], ...], XlsxSheet] = {}
+    results: list[FormResult] = []
+    with open(file_path, 'wb') as workbook_file:
+        workbook_writer = XlsxWorkbookWriter(template, workbook_file)
+
+        for work_unit in settings['workbook_unit']['work_units']:
+            sheet_name = Path(work_unit['file_path']).stem
+
+            started = time.perf_counter()
+            try:
+                form_layers = layers.form_layers(work_unit['payee_info'], work_unit['payor_item'])
+                stamp_key = tuple(layer_key for _, layer_key, _ in form_layers)
+
+                stamped_sheet = stamped_sheets.get(stamp_key)
+                if stamped_sheet is None:
+                    stamped_sheet = XlsxSheet(template)
+                    for *_, layer_plan in form_layers:
+                        backend.apply_plan(stamped_sheet, layer_plan)
+                    stamped_sheets[stamp_key] = stamped_sheet
+
+                template_sheet = stamped_sheet.copy()
+                backend.apply_plan(template_sheet, layers.payee_plan(work_unit['payee_info']))
+                sheet_name = workbook_writer.add_sheet(sheet_name, template_sheet.cell_values, template_sheet.shape_texts)
+            except Exception:
+                result: FormResult = {
+                    'file_path': f'{file_path}#{sheet_name}', 'is_success': False, 'error': traceback.format_exc(),
+                    'seconds': time.perf_counter() - started
+                }
+                print(f'{result["error"]}\nProcess Phase - Error on: {result["file_path"]}')
+            else:
+                result = {
+                    'file_path': f'{file_path}#{sheet_name}', 'is_success': True, 'error': '',
+                    'seconds': time.perf_counter() - started
+                }
+
+            results.append(result)
+
+        if len(workbook_writer): workbook_writer.close()
+
+    if not len(workbook_writer): Path(file_path).unlink()
+
+    return results
+
+
+def render_workbook(workbook_unit: WorkbookUnit) -> list[FormResult]:
+    if worker_session is None or worker_layers is None:
+        raise RuntimeError('The form worker isn\'t initialized')
+
+    return write_workbook({
+        'backend': worker_session.render_backend,
+        'template_path': worker_template_path,
+        'layers': worker_layers,
+        'workbook_unit': workbook_unit
+    })
+
+
+class SettingsProcessWorkbooks(TypedDict):
+    session: ExcelSession
+    workers: int
+    workbook_units: list[WorkbookUnit]
+
+
+def process_workbooks(settings: SettingsProcessWorkbooks) -> list[FormResult]:
+    '''
+        writes the workbooks one after another, or at a pool of worker processes with one workbook per task
+    '''
+    source_path = template_path()
+    layers = StampLayers(load_layout(source_path))
+
+    if settings['workers'] <= 1:
+        results: list[FormResult] = []
+        for workbook_unit in settings['workbook_units']:
+            results += write_workbook({
+                'backend': settings['session'].render_backend,
+                'template_path': source_path,
+                'layers': layers,
+                'workbook_unit': workbook_unit
             })
-        except Exception as e:
-            print(f'{traceback.format_exc()}\nProcess Phase - Error on: {file_path}')
-            sys.exit()
-
 
-def generate_forms(drop_path: str, payee_dict: PayeeInfoDict, payor_item: EntityItem):
-    process_payees({
-        'drop_path': drop_path,
-        'payee_dict': payee_dict,
-        'payor_item': payor_item
-    })
\ No newline at end of file
+        return results
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=settings['workers'],
+        initializer=init_form_worker,
+        initargs=(settings['session'].render_backend.name,)
+    ) as executor:
+        for workbook_results in executor.map(render_workbook, settings['workbook_units']):
+            results += workbook_results
+
+    return results
+
+
+def select_changed_units(manifest: OutputManifest, work_units: list[FormWorkUnit], renderer: str) -> tuple[list[FormWorkUnit], dict[str, str]]:
+    '''
+        returns the work units whose form hash differs from the manifest and {file name: form hash} of every work unit,
+        the forms of the previous run that aren't produced anymore are deleted.
+        renderer: name of the render backend, the forms of another renderer are rendered again
+    '''
+    content_hash = template_hash(template_path())
+
+    form_hashes: dict[str, str] = {}
+    changed_units: list[FormWorkUnit] = []
+    for work_unit in work_units:
+        file_name = Path(work_unit['file_path']).name
+        form_hash = plan_hash(plan_payee({
+            'payee_info': work_unit['payee_info'],
+            'payor_item': work_unit['payor_item']
+        }), content_hash, renderer)
+
+        form_hashes[file_name] = form_hash
+        if not manifest.is_current(file_name, form_hash): changed_units.append(work_unit)
+
+    removed_names = manifest.remove_stale(form_hashes)
+
+    print(
+        f'Process Phase - {len(changed_units)} changed, {len(work_units) - len(changed_units)} unchanged, '
+        f'{len(removed_names)} removed forms'
+    )
+
+    return changed_units, form_hashes
+
+
+def select_resumed_units(journal: FormJournal, work_units: list[FormWorkUnit]) -> tuple[list[FormWorkUnit], list[FormWorkUnit]]:
+    '''
+        returns (pending work units, work units already saved according to the journal)
+    '''
+    completed_names = journal.completed()
+
+    pending_units: list[FormWorkUnit] = []
+    resumed_units: list[FormWorkUnit] = []
+    for work_unit in work_units:
+        file_path = Path(work_unit['file_path'])
+        if file_path.name in completed_names and file_path.exists():
+            resumed_units.append(work_unit)
+        else:
+            pending_units.append(work_unit)
+
+    print(f'Process Phase - resuming, {len(resumed_units)} forms already saved')
+
+    return pending_units, resumed_units
+
+
+def skip_failed_payees(error_report: ErrorReport, work_units: list[FormWorkUnit]) -> list[FormWorkUnit]:
+    '''
+        forms of the payees with an invalid source row aren't rendered, their totals would be incomplete
+    '''
+    if not error_report.failed_tins: return work_units
+
+    valid_units: list[FormWorkUnit] = []
+    for work_unit in work_units:
+        if work_unit['payee_info'].info.tin in error_report.failed_tins:
+            error_report.add('process', work_unit['file_path'], 'Skipped: the payee has invalid source rows')
+        else:
+            valid_units.append(work_unit)
+
+    return valid_units
+
+
+def generate_forms(
+        session: ExcelSession,
+        drop_path: str,
+        payee_dict: PayeeInfoDict,
+        payor_item: EntityItem,
+        workers: int = 1,
+        incremental: bool = False,
+        resume: bool = False,
+        error_report: ErrorReport | None = None,
+        sheets_per_workbook: int = 0,
+        output: str = 'directory',
+        archive_max_bytes: int = 0
+    ):
+    '''
+        incremental: renders only the forms whose inputs or template changed since the manifest of the drop path
+        resume: skips the forms saved by the previous run according to the journal of the drop path
+        error_report: collects the failed and skipped forms
+        sheets_per_workbook: writes the forms as the sheets of workbooks holding up to this number of sheets
+            instead of one file per form, it can't be combined with `incremental` and `resume`
+        output: directory - one file per form, zip - the forms are added to zip archives of up to `archive_max_bytes`,
+            it can't be combined with `incremental`, `resume` and `sheets_per_workbook`
+    '''
+    if sheets_per_workbook and (incremental or resume):
+        raise ValueError('The workbook output can\'t be used with the incremental or resume run')
+    if output != 'directory' and (incremental or resume or sheets_per_workbook):
+        raise ValueError(f'The {output} output can\'t be used with the incremental, resume or workbook run')
+
+    sink_settings: SinkSettings = {'kind': 'zip' if output == 'zip' else 'directory', 'drop_path': drop_path, 'max_bytes': archive_max_bytes}
+
+    work_units = list(generate_work_units(drop_path, payee_dict, payor_item))
+    if error_report is not None: work_units = skip_failed_payees(error_report, work_units)
+
+    manifest = None
+    form_hashes: dict[str, str] = {}
+    if incremental:
+        manifest = OutputManifest.load(drop_path)
+        work_units, form_hashes = select_changed_units(manifest, work_units, session.render_backend.name)
+
+    journal = FormJournal(drop_path)
+    resumed_units: list[FormWorkUnit] = []
+    if resume:
+        work_units, resumed_units = select_resumed_units(journal, work_units)
+    else:
+        journal.reset()
+
+    form_journal = journal if sink_settings['kind'] == 'directory' else None
+
+    with metrics.phase('rendering'):
+        if sheets_per_workbook:
+            results = process_workbooks({
+                'session': session,
+                'workers': workers,
+                'workbook_units': generate_workbook_units(drop_path, work_units, sheets_per_workbook)
+            })
+        elif workers > 1:
+            results = process_payees_parallel({
+                'renderer': session.render_backend.name,
+                'workers': workers,
+                'sink_settings': sink_settings,
+                'payor_item': payor_item,
+                'work_units': work_units,
+                'journal': form_journal
+            })
+        else:
+            with create_sink(sink_settings) as sink:
+                results = process_payees({
+                    'session': session,
+                    'sink': sink,
+                    'work_units': work_units,
+                    'journal': form_journal
+                })
+
+    for result in results:
+        metrics.add_form(result['seconds'])
+
+    failed_results = [result for result in results if not result['is_success']]
+    if failed_results:
+        print(f'Process Phase - {len(failed_results)} of {len(results)} forms failed')
+
+    if error_report is not None:
+        for result in failed_results:
+            error_report.add('process', result['file_path'], result['error'].strip().splitlines()[-1], result['error'])
+
+    if manifest is not None:
+        saved_names = [Path(work_unit['file_path']).name for work_unit in resumed_units]
+        saved_names += [Path(result['file_path']).name for result in results if result['is_success']]
+
+        for file_name in saved_names:
+            manifest.record(file_name, form_hashes[file_name])
+        for result in failed_results:
+            manifest.discard(Path(result['file_path']).name)
+
+        manifest.save()
+
+    return results
@@ -1,65 +1,247 @@
 from wtax_info import PayeeInfoDict
-from wtax_item import InCompletePayeeInfo, EntityItem, WithholdingTaxItem
-import xlwings as xw
-from xlwings import Sheet, Range
+from aggregate import WtaxColumns, aggregate_columns
+from wtax_item import EntityItem, WithholdingTaxItem
+from validation import validate_rows, row_errors_message
+from payee_master import PayeeMaster
+from session import ExcelSession
+from row_source import RowSource
+from checkpoint import ErrorReport
+from instrument import metrics
+from utils import ConvertTo
+from typing import Any, Iterable, Iterator, TYPE_CHECKING
 import traceback
-import sys
-
-def process_src_sheet(source_sheet: Sheet) -> PayeeInfoDict:
-    payee_info_dict = PayeeInfoDict()
-    
-    current_row = 14
-    while True:
-        current_row += 1
-
-        current_ref = f'A{current_row}:O{current_row}'
-        current_item = source_sheet[current_ref]
-        if not isinstance(current_item, Range):
-            raise ValueError(f'This {current_ref} row isn\'t found')
-        
-        raw_item = current_item.value
-        if not isinstance(raw_item, list):
-            raise ValueError(f'This {current_ref} row doesn\'t return a list')
-        
-        try:
-            payee_item = EntityItem(
-                tin=raw_item[0],
-                org_name=raw_item[1],
-                last_name=raw_item[2],
-                first_name=raw_item[3],
-                mid_name=raw_item[4],
-                address=raw_item[5],
-                zip_code=raw_item[6],
-            )
-            wtax_item = WithholdingTaxItem(
-                date=raw_item[7],
-                atc_code=raw_item[8],
-                atc_description=raw_item[9],
-                base=raw_item[10],
-                tax=raw_item[11]
-            )
-            payee_item.add_signor(
-                signor_name=raw_item[12],
-                signor_position=raw_item[13],
-                signor_tin=raw_item[14]
-            )
-
-            payee_info_dict.process_item(payee_item=payee_item, wtax_item=wtax_item)
-        except InCompletePayeeInfo:
-            break
-        except Exception as e:
-            print(f'{traceback.format_exc()}\nRetrieve Phase - Error on - {current_ref}')
-            sys.exit()
+
+if TYPE_CHECKING:
+    from xlwings import Sheet
+
+class SourceRowRef:
+    first_row = 15
+    first_col = 'A'
+    last_col = 'O'
+    chunk_size = 5000
+
+    @staticmethod
+    def row(row: int):
+        return f'{SourceRowRef.first_col}{row}:{SourceRowRef.last_col}{row}'
+
+    @staticmethod
+    def block(first_row: int, last_row: int):
+        return f'{SourceRowRef.first_col}{first_row}:{SourceRowRef.last_col}{last_row}'
+
+def find_last_src_row(source_sheet: 'Sheet', range_type: Any) -> int:
+    '''
+        returns the last row of the contiguous TIN block starting at the first data row,
+        or the row before it when the block is empty. A block of a single row is checked first,
+        `end('down')` from it would jump to the last row of the sheet
+    '''
+    first_row = SourceRowRef.first_row
+    first_tin = source_sheet[f'{SourceRowRef.first_col}{first_row}']
+    if not isinstance(first_tin, range_type):
+        raise ValueError(f'This {SourceRowRef.first_col}{first_row} cell isn\'t found')
+
+    if not ConvertTo.trimm_str(first_tin.value): return first_row - 1
+
+    second_tin = source_sheet[f'{SourceRowRef.first_col}{first_row + 1}']
+    if isinstance(second_tin, range_type) and not ConvertTo.trimm_str(second_tin.value): return first_row
+
+    return first_tin.end('down').row
+
+def read_src_rows(source_sheet: 'Sheet', range_type: Any, chunk_size: int = SourceRowRef.chunk_size) -> Iterator[tuple[str, list[Any]]]:
+    '''
+        yields (row reference, raw row values) reading the data block in chunks of `chunk_size` rows,
+        `range_type` is the Range type of the backend that opened the sheet
+    '''
+    last_row = find_last_src_row(source_sheet, range_type)
+
+    for chunk_start in range(SourceRowRef.first_row, last_row + 1, chunk_size):
+        chunk_end = min(chunk_start + chunk_size - 1, last_row)
+
+        chunk_ref = SourceRowRef.block(chunk_start, chunk_end)
+        chunk_range = source_sheet[chunk_ref]
+        if not isinstance(chunk_range, range_type):
+            raise ValueError(f'This {chunk_ref} block isn\'t found')
+
+        raw_rows = chunk_range.options(ndim=2).value
+        metrics.count('range_reads')
+        if not isinstance(raw_rows, list):
+            raise ValueError(f'This {chunk_ref} block doesn\'t return a list')
+
+        for row_offset, raw_item in enumerate(raw_rows):
+            yield SourceRowRef.row(chunk_start + row_offset), raw_item
+
+class EntityItemCache:
+    '''
+        Interns the payee of every source row by its raw payee columns (A-G) and signor columns (M-O),
+        identical rows share the first validated EntityItem instead of validating it again.
+        Rows that fail validation aren't cached, so they fail again on every occurrence.
+            payee_master: a payee missing from the cache is rebuilt from its record when its details didn't change,
+                otherwise the validated payee is saved to it
+    '''
+    def __init__(self, payee_master: PayeeMaster | None = None) -> None:
+        self.__items: dict[tuple[Any, ...], EntityItem] = {}
+        self.payee_master = payee_master
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def item_key(raw_item: list[Any]) -> tuple[Any, ...]:
+        return (*raw_item[0:7], *raw_item[12:15])
+
+    def get_item(self, raw_item: list[Any]) -> EntityItem:
+        item_key = EntityItemCache.item_key(raw_item)
+
+        payee_item = self.__items.get(item_key)
+        if payee_item is not None:
+            self.hits += 1
+            return payee_item
+
+        payee_item = None if self.payee_master is None else self.payee_master.lookup(raw_item)
+        if payee_item is None:
+            payee_item = create_payee_item(raw_item)
+            if self.payee_master is not None: self.payee_master.save(raw_item, payee_item)
+
+        self.__items[item_key] = payee_item
+        self.misses += 1
+
+        return payee_item
+
+    def __len__(self):
+        return len(self.__items)
+
+def create_payee_item(raw_item: list[Any]) -> EntityItem:
+    return EntityItem(
+        tin=raw_item[0],
+        org_name=raw_item[1],
+        last_name=raw_item[2],
+        first_name=raw_item[3],
+        mid_name=raw_item[4],
+        address=raw_item[5],
+        zip_code=raw_item[6],
+    ).add_signor(
+        signor_name=raw_item[12],
+        signor_position=raw_item[13],
+        signor_tin=raw_item[14]
+    )
+
+def parse_raw_item(raw_item: list[Any], entity_cache: EntityItemCache | None = None) -> tuple[EntityItem, WithholdingTaxItem]:
+    payee_item = create_payee_item(raw_item) if entity_cache is None else entity_cache.get_item(raw_item)
+    wtax_item = WithholdingTaxItem(
+        date=raw_item[7],
+        atc_code=raw_item[8],
+        atc_description=raw_item[9],
+        base=raw_item[10],
+        tax=raw_item[11]
+    )
+
+    return payee_item, wtax_item
+
+def process_raw_item(wtax_columns: WtaxColumns, raw_item: list[Any], entity_cache: EntityItemCache | None = None):
+    wtax_columns.append(*parse_raw_item(raw_item, entity_cache))
+
+def parse_src_rows(
+        src_rows: Iterable[tuple[str, list[Any]]],
+        entity_cache: EntityItemCache | None = None,
+        error_report: ErrorReport | None = None
+    ) -> WtaxColumns:
+    '''
+        validates the source rows and returns the columns of their parsed items, not grouped yet.
+        src_rows: (row reference, raw row values of the A-O source columns), reading stops at the first row without a tin
+        error_report: the invalid rows are collected to it with every invalid column and the reading continues,
+            otherwise a ValueError listing every invalid column of the first invalid row is raised
+    '''
+    wtax_columns = WtaxColumns()
+    entity_cache = EntityItemCache() if entity_cache is None else entity_cache
+
+    with metrics.phase('payee retrieval'):
+        for current_ref, raw_item, row_errors in validate_rows(src_rows):
+            if row_errors:
+                if error_report is None:
+                    print(f'Retrieve Phase - Error on - {current_ref}')
+                    raise ValueError(row_errors_message(row_errors))
+
+                error_report.add_row_errors(current_ref, ConvertTo.trimm_str(raw_item[0]), row_errors)
+                continue
+
+            try:
+                process_raw_item(wtax_columns, raw_item, entity_cache)
+            except Exception as e:
+                if error_report is None:
+                    print(f'{traceback.format_exc()}\nRetrieve Phase - Error on - {current_ref}')
+                    raise
+
+                error_report.add_row(current_ref, ConvertTo.trimm_str(raw_item[0]), e, traceback.format_exc())
+
+    return wtax_columns
+
+def process_src_rows(
+        src_rows: Iterable[tuple[str, list[Any]]],
+        entity_cache: EntityItemCache | None = None,
+        error_report: ErrorReport | None = None,
+        period: str = 'month'
+    ) -> PayeeInfoDict:
+    '''
+        parses the source rows with `parse_src_rows` then groups them into the payee infos.
+        period: month - a form per payee month, quarter - a form per payee quarter
+    '''
+    wtax_columns = parse_src_rows(src_rows, entity_cache, error_report)
+
+    with metrics.phase('aggregation'):
+        return aggregate_columns(wtax_columns, period=period)
+
+def process_src_sheet(
+        source_sheet: 'Sheet',
+        range_type: Any,
+        chunk_size: int = SourceRowRef.chunk_size,
+        entity_cache: EntityItemCache | None = None,
+        error_report: ErrorReport | None = None,
+        period: str = 'month'
+    ) -> PayeeInfoDict:
+    return process_src_rows(read_src_rows(source_sheet, range_type, chunk_size), entity_cache, error_report, period)
+
+def payee_master_summary(payee_master: PayeeMaster):
+    return (
+        f'Retrieve Phase - payee master: {len(payee_master)} payees, {payee_master.hits} reused, '
+        f'{payee_master.updates} new or changed, {payee_master.filled_rows} rows filled'
+    )
+
+def retrieve_payees_infos(
+        src_rows: Iterable[tuple[str, list[Any]]],
+        error_report: ErrorReport | None = None,
+        payee_master: PayeeMaster | None = None,
+        period: str = 'month'
+    ) -> PayeeInfoDict:
+    '''
+        payee_master: the rows omitting the payee details of a known tin are filled from it and the unchanged payees
+            are taken from it
+        period: month - a form per payee month, quarter - a form per payee quarter
+    '''
+    entity_cache = EntityItemCache(payee_master)
+    if payee_master is not None: src_rows = payee_master.fill_rows(src_rows)
+
+    payee_info_dict = process_src_rows(src_rows, entity_cache, error_report, period)
+
+    print(f'Retrieve Phase - {len(entity_cache)} payees, cache hits: {entity_cache.hits}, misses: {entity_cache.misses}')
+    if payee_master is not None: print(payee_master_summary(payee_master))
+    if error_report is not None and error_report.count('retrieve'):
+        print(f'Retrieve Phase - {error_report.count("retrieve")} invalid rows, their payees are skipped')
 
     return payee_info_dict
 
-def generate_payees_infos(src_path: str) -> PayeeInfoDict:
-    with xw.App() as xw_app:
-        source_book = xw_app.books.open(src_path)
-        source_sheet = source_book.sheets[0]
-        if not isinstance(source_sheet, Sheet):
-            raise ValueError(f'First sheet isn\'t found at {src_path} or not a Sheet Object')
-        
-        payee_info_dict = process_src_sheet(source_sheet)
+def generate_payees_infos(
+        session: ExcelSession,
+        src_path: str,
+        error_report: ErrorReport | None = None,
+        payee_master: PayeeMaster | None = None,
+        period: str = 'month'
+    ) -> PayeeInfoDict:
+    source_sheet = session.first_sheet(src_path)
+
+    return retrieve_payees_infos(read_src_rows(source_sheet, session.backend.Range), error_report, payee_master, period)
 
-        return payee_info_dict
\ No newline at end of file
+def generate_source_payees_infos(
+        source: RowSource,
+        error_report: ErrorReport | None = None,
+        payee_master: PayeeMaster | None = None,
+        period: str = 'month'
+    ) -> PayeeInfoDict:
+    return retrieve_payees_infos(source.rows(), error_report, payee_master, period)
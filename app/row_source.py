@@ -0,0 +1,25 @@
+from typing import Any, Iterator
+
+class RowSource:
+    '''
+        Source book read without the session backend, e.g. a BIR alphalist export or a streamed xlsx book
+            payor_fields: {payor field: value} of the PAYOR_FIELDS
+            rows: yields (row reference, raw row values of the A-O source columns)
+    '''
+    source_path: str
+
+    @property
+    def payor_fields(self) -> dict[str, Any]:
+        raise NotImplementedError
+
+    def rows(self) -> Iterator[tuple[str, list[Any]]]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
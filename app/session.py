@@ -0,0 +1,184 @@
+from backend import Backend, XlwingsBackend
+from xlsx_backend import XlsxBackend
+from instrument import metrics
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Queue
+from threading import RLock
+from typing import Any, Iterator
+
+def create_backend(renderer: str) -> Backend:
+    '''
+        renderer: str - excel: xlwings backend, xlsx: template package backend
+    '''
+    if renderer == 'excel': return XlwingsBackend()
+    if renderer == 'xlsx': return XlsxBackend()
+
+    raise ValueError(f'Invalid renderer: \'{renderer}\'')
+
+class TemplateHandle:
+    '''
+        An opened template book reused across forms, every save writes a copy of the
+        current state of the book to the given path.
+            layers: {layer name: layer key} of the shared writes already on the sheet, e.g. the payor block
+    '''
+    def __init__(self, book: Any, sheet: Any) -> None:
+        self.book = book
+        self.sheet = sheet
+        self.form_count = 0
+        self.layers: dict[str, Any] = {}
+
+    def save(self, file_path: str):
+        self.book.save(path=file_path)
+        self.form_count += 1
+        metrics.count('book_saves')
+
+    def save_bytes(self, backend: Backend) -> bytes:
+        '''
+            returns the current state of the book as an xlsx package instead of saving it to a path
+        '''
+        book_bytes = backend.book_bytes(self.book)
+        self.form_count += 1
+        metrics.count('book_saves')
+
+        return book_bytes
+
+class ExcelSession:
+    '''
+        Shares one started app, the opened source books and the opened template books for the whole run.
+            backend: Backend - spreadsheet engine of the source books, defaults to xlwings
+            pool_size: int - number of app instances started and kept warm for template handles
+            render_backend: Backend - spreadsheet engine of the template books, defaults to `backend`
+        The default xlwings backend is only created, and xlwings imported, once a source book or template needs it
+    '''
+    def __init__(self, backend: Backend | None = None, pool_size: int = 1, render_backend: Backend | None = None) -> None:
+        if pool_size < 1:
+            raise ValueError(f'Invalid pool size: it should be at least 1 not {pool_size}')
+
+        self.__backend = backend
+        self.__render_backend = render_backend
+        self.__pool_size = pool_size
+        self.__source_app: Any = None
+        self.__apps: list[Any] = []
+        self.__books: dict[str, Any] = {}
+        self.__template_pools: dict[str, tuple[Queue[TemplateHandle], list[TemplateHandle]]] = {}
+        self.__lock = RLock()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        with self.__lock, metrics.phase('app startup'):
+            while len(self.__apps) < self.__pool_size:
+                self.__apps.append(self.render_backend.start_app())
+                metrics.count('app_starts')
+
+        return self
+
+    def close(self):
+        with self.__lock:
+            for xw_app in self.__apps:
+                self.render_backend.quit_app(xw_app)
+
+            if self.__source_app is not None and self.render_backend is not self.backend:
+                self.backend.quit_app(self.__source_app)
+
+            self.__source_app = None
+            self.__apps = []
+            self.__books = {}
+            self.__template_pools = {}
+
+    @property
+    def app(self):
+        '''
+            app of the source books, shared with the first template handle when both use the same backend
+        '''
+        with self.__lock:
+            if self.__source_app is None:
+                if self.render_backend is self.backend:
+                    self.start()
+                    self.__source_app = self.__apps[0]
+                else:
+                    with metrics.phase('app startup'):
+                        self.__source_app = self.backend.start_app()
+                    metrics.count('app_starts')
+
+        return self.__source_app
+
+    @property
+    def backend(self) -> Backend:
+        if self.__backend is None:
+            self.__backend = XlwingsBackend()
+
+        return self.__backend
+
+    @property
+    def render_backend(self) -> Backend:
+        return self.backend if self.__render_backend is None else self.__render_backend
+
+    @property
+    def pool_size(self):
+        return self.__pool_size
+
+    def open_book(self, book_path: str):
+        book_key = str(Path(book_path).resolve())
+
+        with self.__lock:
+            book = self.__books.get(book_key)
+            if book is None:
+                book = self.backend.open_book(self.app, book_path)
+                self.__books[book_key] = book
+                metrics.count('book_opens')
+
+        return book
+
+    def first_sheet(self, book_path: str):
+        source_sheet = self.open_book(book_path).sheets[0]
+        if not isinstance(source_sheet, self.backend.Sheet):
+            raise TypeError(f'The first sheet of this \'{book_path}\' doesn\'t return a Sheet Object')
+
+        return source_sheet
+
+    def __create_template(self, template_path: str, created: list[TemplateHandle]):
+        if not self.__apps: self.start()
+
+        xw_app = self.__apps[len(created) % len(self.__apps)]
+        template_book = self.render_backend.open_book(xw_app, template_path)
+        metrics.count('book_opens')
+        template_sheet = template_book.sheets[0]
+        if not isinstance(template_sheet, self.render_backend.Sheet):
+            raise TypeError(f'First sheet isn\'t at \'{template_path}\' a Sheet Type ')
+
+        template = TemplateHandle(template_book, template_sheet)
+        created.append(template)
+
+        return template
+
+    @contextmanager
+    def lease_template(self, template_path: str) -> Iterator[TemplateHandle]:
+        '''
+            lends an idle template handle, a new one is opened on the next warm app while the pool isn't full,
+            otherwise waits until a handle is returned
+        '''
+        template_key = str(Path(template_path).resolve())
+
+        with self.__lock:
+            template_pool = self.__template_pools.get(template_key)
+            if template_pool is None:
+                template_pool = (Queue(), [])
+                self.__template_pools[template_key] = template_pool
+
+            idle_templates, created = template_pool
+            template = None
+            if idle_templates.empty() and len(created) < self.__pool_size:
+                template = self.__create_template(template_path, created)
+
+        if template is None: template = idle_templates.get()
+
+        try:
+            yield template
+        finally:
+            idle_templates.put(template)
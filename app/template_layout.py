@@ -0,0 +1,141 @@
+from xlsx_template import locate_template_parts, parse_defined_names, parse_shape_ids
+from write_plan import WritePlan
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any
+import hashlib
+import json
+import zipfile
+
+LAYOUT_VERSION = 1
+LAYOUT_SUFFIX = '.layout.json'
+
+class TemplateLayout:
+    '''
+        Frozen map of the template references to their concrete locations.
+            cells: {defined name: A1 style reference at the first sheet}
+            shapes: {shape name: shape id at the drawing of the first sheet}
+    '''
+    def __init__(self, content_hash: str, sheet_name: str, cells: dict[str, str], shapes: dict[str, str]) -> None:
+        self.__content_hash = content_hash
+        self.__sheet_name = sheet_name
+        self.__cells = MappingProxyType(dict(cells))
+        self.__shapes = MappingProxyType(dict(shapes))
+
+    @property
+    def content_hash(self):
+        return self.__content_hash
+
+    @property
+    def sheet_name(self):
+        return self.__sheet_name
+
+    @property
+    def cells(self):
+        return self.__cells
+
+    @property
+    def shapes(self):
+        return self.__shapes
+
+    def cell(self, ref: str) -> str:
+        return self.__cells.get(ref, ref)
+
+    def resolve_plan(self, write_plan: WritePlan) -> WritePlan:
+        '''
+            returns a copy of the plan with the defined names replaced by their cell references
+        '''
+        resolved_plan = WritePlan()
+
+        for entry in write_plan:
+            if entry.kind == 'shape':
+                if entry.target not in self.__shapes:
+                    raise ValueError(f'This shape \'{entry.target}\' isn\'t found at the template layout')
+                resolved_plan.add(entry.target, entry.value, entry.kind)
+            else:
+                resolved_plan.add(self.cell(entry.target), entry.value, entry.kind)
+
+        return resolved_plan
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'version': LAYOUT_VERSION,
+            'content_hash': self.__content_hash,
+            'sheet_name': self.__sheet_name,
+            'cells': dict(self.__cells),
+            'shapes': dict(self.__shapes)
+        }
+
+    @staticmethod
+    def from_dict(layout_dict: dict[str, Any]):
+        return TemplateLayout(
+            content_hash=layout_dict['content_hash'],
+            sheet_name=layout_dict['sheet_name'],
+            cells=layout_dict['cells'],
+            shapes=layout_dict['shapes']
+        )
+
+def template_hash(template_path: str):
+    with open(template_path, 'rb') as template_file:
+        return hashlib.sha256(template_file.read()).hexdigest()
+
+def layout_path(template_path: str):
+    template = Path(template_path)
+    return str(template.with_name(template.stem + LAYOUT_SUFFIX))
+
+def compile_layout(template_path: str, content_hash: str | None = None) -> TemplateLayout:
+    with zipfile.ZipFile(template_path) as template_zip:
+        part_names = set(template_zip.namelist())
+
+        def read_part(part_name: str):
+            return template_zip.read(part_name).decode('utf-8')
+
+        template_parts = locate_template_parts(read_part, lambda part_name: part_name in part_names)
+        defined_names = parse_defined_names(read_part('xl/workbook.xml'), template_parts.sheet_name)
+        shape_ids = {} if template_parts.drawing_part is None else parse_shape_ids(read_part(template_parts.drawing_part))
+
+    return TemplateLayout(
+        content_hash=template_hash(template_path) if content_hash is None else content_hash,
+        sheet_name=template_parts.sheet_name,
+        cells=defined_names,
+        shapes=shape_ids
+    )
+
+def read_cached_layout(cache_path: str, content_hash: str) -> TemplateLayout | None:
+    try:
+        with open(cache_path, encoding='utf-8') as cache_file:
+            layout_dict = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    if layout_dict.get('version') != LAYOUT_VERSION or layout_dict.get('content_hash') != content_hash: return
+
+    return TemplateLayout.from_dict(layout_dict)
+
+loaded_layouts: dict[tuple[str, str], TemplateLayout] = {}
+
+def load_layout(template_path: str) -> TemplateLayout:
+    '''
+        returns the layout cached next to the template when it was compiled from the same template content,
+        otherwise compiles the layout again and replaces the cached one
+    '''
+    content_hash = template_hash(template_path)
+    layout_key = (str(Path(template_path).resolve()), content_hash)
+
+    layout = loaded_layouts.get(layout_key)
+    if layout is not None: return layout
+
+    cache_path = layout_path(template_path)
+    layout = read_cached_layout(cache_path, content_hash)
+
+    if layout is None:
+        layout = compile_layout(template_path, content_hash)
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(layout.to_dict(), cache_file, indent=2)
+        except OSError:
+            pass
+
+    loaded_layouts[layout_key] = layout
+
+    return layout
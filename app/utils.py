@@ -55,4 +55,40 @@ class ConvertTo:
         try:
             return process_string(int(value))
         except:
-            return ''
\ No newline at end of file
+            return ''
+
+def column_index(column: str) -> int:
+    index = 0
+    for letter in column.upper():
+        index = index * 26 + (ord(letter) - 64)
+
+    return index
+
+def column_letter(index: int) -> str:
+    letters = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+
+    return letters
+
+def split_cell_ref(cell_ref: str) -> tuple[int, int]:
+    '''
+        returns (row, column index) of an A1 style cell reference, `$` signs are ignored
+    '''
+    processed_ref = cell_ref.replace('$', '').upper()
+    column = processed_ref.rstrip('0123456789')
+    row = processed_ref[len(column):]
+
+    if not column or not row or not column.isalpha():
+        raise ValueError(f'Invalid cell reference: \'{cell_ref}\'')
+
+    return int(row), column_index(column)
+
+def split_range_ref(range_ref: str) -> tuple[tuple[int, int], tuple[int, int]]:
+    '''
+        returns ((first row, first column), (last row, last column)) of an A1 style range reference
+    '''
+    first_ref, _, last_ref = range_ref.partition(':')
+
+    return split_cell_ref(first_ref), split_cell_ref(last_ref or first_ref)
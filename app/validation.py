@@ -0,0 +1,195 @@
+from wtax_item import (
+    TIN_SPLIT_PATTERN, get_invalid, invalid_msg, validate_tin_format, validate_value_len,
+    compose_indiv_name, compose_entity_name, entity_name_msg_invalid, address_msg_invalid, zip_code_msg_invalid
+)
+from utils import ConvertTo, check_instance, column_letter
+from datetime import datetime
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+import re
+
+VALIDATION_CHUNK_SIZE = 1000
+TIN_PATTERN = re.compile(r'\d{3}-\d{3}-\d{3}-\d{5}')
+SIGNOR_TIN_PATTERN = re.compile(r'\d{3}-\d{3}-\d{3}(-\d{5})?')
+
+class RowError(NamedTuple):
+    '''
+        column: A1 style columns of the checked values, e.g. `B:E` for the payee names
+    '''
+    reference: str
+    column: str
+    value: Any
+    message: str
+
+class ColumnCheck(NamedTuple):
+    '''
+        columns: indexes of the A-O source columns given to the check
+        check: callable - returns the error message of the column values or None when they're valid
+    '''
+    columns: tuple[int, ...]
+    check: Callable[..., str | None]
+
+    @property
+    def column_ref(self):
+        first_col = column_letter(self.columns[0] + 1)
+        last_col = column_letter(self.columns[-1] + 1)
+
+        return first_col if first_col == last_col else f'{first_col}:{last_col}'
+
+def row_errors_message(row_errors: list[RowError]) -> str:
+    '''
+        every invalid column of a row in one message, e.g. `B:E: Empty : ...; K: Invalid Number : ...`
+    '''
+    return '; '.join(f'{row_error.column}: {row_error.message}' for row_error in row_errors)
+
+def tin_message(tin: Any, pattern: re.Pattern[str], branch_optional: bool = False) -> str | None:
+    processed_tin = ConvertTo.trimm_str(tin)
+    if pattern.fullmatch(processed_tin): return None
+
+    try:
+        validate_tin_format(processed_tin, TIN_SPLIT_PATTERN, branch_optional)
+    except ValueError as e:
+        return str(e)
+
+    return None
+
+def check_tin(tin: Any):
+    return tin_message(tin, TIN_PATTERN)
+
+def check_signor_tin(signor_tin: Any):
+    if not ConvertTo.trimm_str(signor_tin): return None
+
+    return tin_message(signor_tin, SIGNOR_TIN_PATTERN, True)
+
+def check_names(org_name: Any, last_name: Any, first_name: Any, mid_name: Any):
+    processed_org_name = ConvertTo.cap_str(org_name)
+    processed_last_name = ConvertTo.cap_str(last_name)
+    processed_first_name = ConvertTo.cap_str(first_name)
+    processed_mid_name = ConvertTo.cap_str(mid_name)
+
+    org_result = get_invalid(('Organization Name', processed_org_name, 'is_empty'))
+    name_result = get_invalid(
+        ('Last Name', processed_last_name, 'is_empty'),
+        ('First Name', processed_first_name, 'is_empty')
+    )
+    if org_result and name_result:
+        return invalid_msg((f'{org_result[0]} and {name_result[0]}', 'None or empty string', 'Empty'))
+
+    entity_name = compose_entity_name(
+        processed_org_name,
+        compose_indiv_name(processed_last_name, processed_first_name, processed_mid_name)
+    )
+    try:
+        validate_value_len(entity_name, 91, entity_name_msg_invalid, True)
+    except ValueError as e:
+        return str(e)
+
+    return None
+
+def check_address(address: Any):
+    try:
+        validate_value_len(ConvertTo.proper_str(address), 95, address_msg_invalid, True)
+    except ValueError as e:
+        return str(e)
+
+    return None
+
+def check_zip_code(zip_code: Any):
+    processed_zip = ConvertTo.integer_str(zip_code)
+    if not processed_zip: return None
+
+    try:
+        validate_value_len(processed_zip, 4, zip_code_msg_invalid)
+    except ValueError as e:
+        return str(e)
+
+    return None
+
+def check_date(date: Any):
+    try:
+        check_instance(('Date', datetime, date))
+    except TypeError as e:
+        return str(e)
+
+    return None
+
+def check_text(header: str, convert: Callable[[Any], str]):
+    def check(value: Any):
+        invalid_result = get_invalid((header, convert(value), 'is_empty'))
+        return invalid_msg(invalid_result) if invalid_result else None
+    return check
+
+def check_amount(header: str):
+    def check(value: Any):
+        try:
+            invalid_result = get_invalid((header, float(value), 'is_positive'))
+        except (TypeError, ValueError):
+            invalid_result = (header, value, 'Invalid Number')
+
+        return invalid_msg(invalid_result) if invalid_result else None
+    return check
+
+SOURCE_CHECKS = (
+    ColumnCheck((0,), check_tin),
+    ColumnCheck((1, 2, 3, 4), check_names),
+    ColumnCheck((5,), check_address),
+    ColumnCheck((6,), check_zip_code),
+    ColumnCheck((7,), check_date),
+    ColumnCheck((8,), check_text('ATC Code', ConvertTo.cap_str)),
+    ColumnCheck((9,), check_text('ATC Description', ConvertTo.trimm_str)),
+    ColumnCheck((10,), check_amount('Tax Base')),
+    ColumnCheck((11,), check_amount('Tax Amount')),
+    ColumnCheck((14,), check_signor_tin)
+)
+
+def validate_chunk(chunk: list[tuple[str, list[Any]]]) -> list[list[RowError]]:
+    '''
+        returns the errors of every row of the chunk, the rows are split to columns and each check
+        runs only once per distinct value of its columns, the rows are only visited by a check with an invalid value
+    '''
+    chunk_errors: list[list[RowError]] = [[] for _ in chunk]
+    if not chunk: return chunk_errors
+
+    columns = list(zip(*(raw_item for _, raw_item in chunk)))
+
+    for column_check in SOURCE_CHECKS:
+        if len(column_check.columns) == 1:
+            column_values = columns[column_check.columns[0]]
+            messages = {value: column_check.check(value) for value in set(column_values)}
+        else:
+            column_values = list(zip(*(columns[col] for col in column_check.columns)))
+            messages = {values: column_check.check(*values) for values in set(column_values)}
+
+        invalid_messages = {value: message for value, message in messages.items() if message is not None}
+        if not invalid_messages: continue
+
+        column_ref = column_check.column_ref
+        for row_index, value in enumerate(column_values):
+            message = invalid_messages.get(value)
+            if message is None: continue
+
+            chunk_errors[row_index].append(RowError(chunk[row_index][0], column_ref, value, message))
+
+    return chunk_errors
+
+def validate_rows(
+        src_rows: Iterable[tuple[str, list[Any]]],
+        chunk_size: int = VALIDATION_CHUNK_SIZE
+    ) -> Iterator[tuple[str, list[Any], list[RowError]]]:
+    '''
+        yields (row reference, raw row values, errors of the row) validating every column of the rows
+        in chunks of `chunk_size` rows, the reading stops at the first row without a tin
+    '''
+    chunk: list[tuple[str, list[Any]]] = []
+
+    def flush():
+        for (current_ref, raw_item), row_errors in zip(chunk, validate_chunk(chunk)):
+            yield current_ref, raw_item, row_errors
+        chunk.clear()
+
+    for current_ref, raw_item in src_rows:
+        if not ConvertTo.trimm_str(raw_item[0]): break
+
+        chunk.append((current_ref, raw_item))
+        if len(chunk) >= chunk_size: yield from flush()
+
+    yield from flush()
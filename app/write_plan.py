@@ -0,0 +1,78 @@
+from typing import Any, Iterator, Literal, NamedTuple
+import re
+
+CELL_REF_PATTERN = re.compile(r'([A-Z]+)(\d+)')
+
+class WriteEntry(NamedTuple):
+    target: str
+    kind: Literal['range', 'shape']
+    value: Any
+
+class WritePlan:
+    '''
+        Every cell and shape write of a form, collected before anything is written to the sheet.
+        A later write to the same target replaces the earlier value but keeps its position
+    '''
+    def __init__(self) -> None:
+        self.__entries: dict[tuple[str, str], WriteEntry] = {}
+
+    def add(self, target: str, value: Any, kind: Literal['range', 'shape']):
+        self.__entries[(kind, target)] = WriteEntry(target, kind, value)
+
+    def extend(self, write_plan: 'WritePlan'):
+        for entry in write_plan:
+            self.add(entry.target, entry.value, entry.kind)
+
+    def __iter__(self) -> Iterator[WriteEntry]:
+        return iter(self.__entries.values())
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __getitem__(self, key: tuple[str, str]) -> Any:
+        '''
+            key: (kind, target)
+        '''
+        return self.__entries[key].value
+
+    def shape_texts(self) -> list[tuple[str, Any]]:
+        return [(entry.target, entry.value) for entry in self if entry.kind == 'shape']
+
+    def range_blocks(self) -> list[tuple[str, Any]]:
+        '''
+            returns (range reference, value) of the range writes, single cell references on consecutive rows
+            of the same column are merged into one column block with a 2 dimensional value.
+            Defined names are returned as is
+        '''
+        named_writes: list[tuple[str, Any]] = []
+        column_cells: dict[str, dict[int, Any]] = {}
+
+        for entry in self:
+            if entry.kind != 'range': continue
+
+            cell_match = CELL_REF_PATTERN.fullmatch(entry.target)
+            if cell_match is None:
+                named_writes.append((entry.target, entry.value))
+                continue
+
+            column_cells.setdefault(cell_match.group(1), {})[int(cell_match.group(2))] = entry.value
+
+        blocks: list[tuple[str, Any]] = []
+        for column, cells in column_cells.items():
+            rows = sorted(cells)
+
+            block_start = 0
+            for row_index in range(1, len(rows) + 1):
+                if row_index < len(rows) and rows[row_index] == rows[row_index - 1] + 1: continue
+
+                block_rows = rows[block_start:row_index]
+                if len(block_rows) == 1:
+                    blocks.append((f'{column}{block_rows[0]}', cells[block_rows[0]]))
+                else:
+                    blocks.append((
+                        f'{column}{block_rows[0]}:{column}{block_rows[-1]}',
+                        [[cells[row]] for row in block_rows]
+                    ))
+                block_start = row_index
+
+        return [*blocks, *named_writes]
@@ -1,50 +1,91 @@
 import math
 from utils import check_instance
 from wtax_item import WithholdingTaxItem, EntityItem
-from typing import Any, Iterator
+from typing import Any, Iterable, Iterator
+from functools import cache
+
+PERIOD_MONTHS = {'month': 1, 'quarter': 3}
+
+def period_first_month(month: int, period_months: int) -> int:
+    '''
+        returns the first month of the period of `period_months` months holding the month, e.g. 4 for May by quarter
+    '''
+    return month - (month - 1) % period_months
 
 class WtaxCellRef:
     default_row = 37
+    max_rows = 10
     qtr_periods = ['O%s', 'T%s', 'Y%s']
     total_qtr_periods = ['Total_1M', 'Total_2M', 'Total_3M']
 
     @staticmethod
+    @cache
     def atc_description(row_inc: int):
         return f'A{WtaxCellRef.default_row + row_inc}'
     
     @staticmethod
+    @cache
     def atc_code(row_inc: int):
         return f'L{WtaxCellRef.default_row + row_inc}'
     
     @staticmethod
+    @cache
     def month_period(period: int, row_inc: int):
         return WtaxCellRef.qtr_periods[period - 1] % (WtaxCellRef.default_row + row_inc)
     
     @staticmethod
+    @cache
     def total_base(row_inc: int):
         return f'AD{WtaxCellRef.default_row + row_inc}'
     
     @staticmethod
+    @cache
     def total_tax(row_inc: int):
         return f'AI{WtaxCellRef.default_row + row_inc}'
     
     @staticmethod
+    @cache
     def total_qtr_period(period: int):
         return WtaxCellRef.total_qtr_periods[period - 1]
+    
+    @staticmethod
+    @cache
+    def written_refs():
+        '''
+            every cell reference written by the withholding tax lines and their totals
+        '''
+        refs: list[str] = []
+        for row_inc in range(1, WtaxCellRef.max_rows + 1):
+            refs.append(WtaxCellRef.atc_description(row_inc))
+            refs.append(WtaxCellRef.atc_code(row_inc))
+            refs += [WtaxCellRef.month_period(period, row_inc) for period in range(1, len(WtaxCellRef.qtr_periods) + 1)]
+            refs.append(WtaxCellRef.total_base(row_inc))
+            refs.append(WtaxCellRef.total_tax(row_inc))
+
+        return (*refs, *WtaxCellRef.total_qtr_periods, 'Total_Base', 'Total_Tax')
+
+def quarter_month(month: int) -> int:
+    quarter = math.ceil(month / 3)
+    return month - ((quarter * 3) - 3)
 
 class WithholdingTaxInfo:
+    '''
+        One atc code line of a form, the base is also kept per month of the quarter for the month columns
+    '''
+    __slots__ = ('__info', '__quarter_month', '__month_bases')
+
     def __init__(self, wtax_item: WithholdingTaxItem) -> None:
         self.__info = wtax_item
-
-        month = self.info.month
-
-        quarter = math.ceil(month / 3)
-        self.__quarter_month: int = month - ((quarter * 3) - 3)
+        self.__quarter_month: int = quarter_month(self.info.month)
+        self.__month_bases: dict[int, float] = {self.__quarter_month: wtax_item.base}
 
     def add_info(self, wtax_item: WithholdingTaxItem):
         self.info.base = self.info.base + wtax_item.base
         self.info.tax = self.info.tax + wtax_item.tax
 
+        item_quarter_month = quarter_month(wtax_item.month)
+        self.__month_bases[item_quarter_month] = self.__month_bases.get(item_quarter_month, 0) + wtax_item.base
+
     @property
     def info(self):
         return self.__info
@@ -52,10 +93,19 @@ class WithholdingTaxInfo:
     @property
     def quarter_month(self) -> int:
         return self.__quarter_month
+
+    @property
+    def month_bases(self) -> dict[int, float]:
+        '''
+            {month of the quarter: base}, only the months of the line's items
+        '''
+        return self.__month_bases
     
 class WithholdingTaxDict:
     def __init__(self) -> None:
         self.__withholding_taxes: dict[str, WithholdingTaxInfo] = {}
+        self.__totals: tuple[float, float] | None = None
+        self.__month_totals: dict[int, float] | None = None
 
     def __getitem__(self, key: str) -> WithholdingTaxInfo | None:
         return self.__withholding_taxes.get(key)
@@ -63,6 +113,8 @@ class WithholdingTaxDict:
     def add_info(self, wt_item: WithholdingTaxItem):
         atc_code = wt_item.atc_code
         wtax_info = self[atc_code]
+        self.__totals = None
+        self.__month_totals = None
 
         if wtax_info is None:
             wtax_info = WithholdingTaxInfo(wt_item)
@@ -78,30 +130,58 @@ class WithholdingTaxDict:
     
     @property
     def is_full(self) -> bool:
-        limit = 10
+        limit = WtaxCellRef.max_rows
         return len(self.__withholding_taxes) >= limit
     
     @property
-    def total_base(self):
-        total = 0
-        for wtax_info in self:
-            total += wtax_info.info.base
+    def totals(self) -> tuple[float, float]:
+        '''
+            (total base, total tax), computed once until another item is added
+        '''
+        if self.__totals is None:
+            total_base = 0
+            total_tax = 0
+            for wtax_info in self:
+                total_base += wtax_info.info.base
+                total_tax += wtax_info.info.tax
+
+            self.__totals = (total_base, total_tax)
+
+        return self.__totals
 
-        return total
+    @property
+    def month_totals(self) -> dict[int, float]:
+        '''
+            {month of the quarter: total base of the month column} in month order, computed once until another item is added
+        '''
+        if self.__month_totals is None:
+            month_totals: dict[int, float] = {}
+            for wtax_info in self:
+                for period_month, base in wtax_info.month_bases.items():
+                    month_totals[period_month] = month_totals.get(period_month, 0) + base
+
+            self.__month_totals = dict(sorted(month_totals.items()))
+
+        return self.__month_totals
+
+    @property
+    def total_base(self):
+        return self.totals[0]
     
     @property
     def total_tax(self):
-        total = 0
-        for wtax_info in self:
-            total += wtax_info.info.tax
-
-        return total
+        return self.totals[1]
 
 class PayeeInfo:
-    def __init__(self, payee_item: EntityItem, wtax_item: WithholdingTaxItem) -> None:
+    '''
+        One form of a payee period, month is the first month of the period.
+            period_months: 1 - a form per month, 3 - a form per quarter with the items of every month of the quarter
+    '''
+    def __init__(self, payee_item: EntityItem, wtax_item: WithholdingTaxItem, period_months: int = 1) -> None:
         self.__info = payee_item
-        self.__month = str(wtax_item.month)
+        self.__month = str(period_first_month(wtax_item.month, period_months))
         self.__year = str(wtax_item.year)
+        self.__period_months = period_months
         self.__wtax_dict = WithholdingTaxDict()
 
     def add_wtax_info(self, w_raw: WithholdingTaxItem):
@@ -122,6 +202,10 @@ class PayeeInfo:
     def year(self):
         return self.__year
 
+    @property
+    def period_months(self) -> int:
+        return self.__period_months
+
     @property
     def wtax_dict(self):
         return self.__wtax_dict
@@ -131,38 +215,102 @@ class PayeeInfo:
         return self.__wtax_dict.is_full
 
 class PayeeInfoDict:
-    def __init__(self) -> None:
+    '''
+        Forms of the payee periods keyed by tin and the first month of the period.
+            period: month - a payee period is a month, quarter - a payee period is a quarter
+    '''
+    def __init__(self, period: str = 'month') -> None:
+        self.period_months = PERIOD_MONTHS[period]
         self.__payees_info: dict[str, list[PayeeInfo]] = {}
+        self.__key_infos: dict[str, tuple[str, int, int]] = {}
+        self.__tin_keys: dict[str, list[str]] = {}
+        self.__period_keys: dict[tuple[int, int], list[str]] = {}
 
     def get_recent_info(self, payee_str: str):
         payee_list = self.__payees_info.get(payee_str)
         if payee_list is None or payee_list[-1].is_wtax_full: return
 
         return payee_list[-1]
+
+    def __index_key(self, payee_key: str, tin: str, year: int, month: int):
+        if payee_key in self.__key_infos: return
+
+        self.__key_infos[payee_key] = (tin, year, month)
+        self.__tin_keys.setdefault(tin, []).append(payee_key)
+        self.__period_keys.setdefault((year, month), []).append(payee_key)
     
+    @staticmethod
+    def payee_key(tin: str, month: int | str, year: int | str):
+        return tin + '--' + str(month) + '-' + str(year)
+
+    def append_info(self, payee_info: PayeeInfo):
+        '''
+            adds an already aggregated payee info as the latest form of its payee period
+        '''
+        payee_key = PayeeInfoDict.payee_key(payee_info.info.tin, payee_info.month, payee_info.year)
+
+        self.__index_key(payee_key, payee_info.info.tin, int(payee_info.year), int(payee_info.month))
+        self[payee_key].append(payee_info)
+
     def process_item(
             self,
             payee_item: EntityItem,
             wtax_item: WithholdingTaxItem
         ):
-        payee_key = payee_item.tin + '--' + str(wtax_item.month) + '-' + str(wtax_item.year)
+        first_month = period_first_month(wtax_item.month, self.period_months)
+        payee_key = PayeeInfoDict.payee_key(payee_item.tin, first_month, wtax_item.year)
         payee_info = self.get_recent_info(payee_key)
 
         if payee_info is None:
-            payee_info = PayeeInfo(payee_item, wtax_item)
+            payee_info = PayeeInfo(payee_item, wtax_item, self.period_months)
+            self.__index_key(payee_key, payee_item.tin, wtax_item.year, first_month)
             self[payee_key].append(payee_info)
 
         payee_info.add_wtax_info(wtax_item)
 
+    def __iter_keys(self, payee_keys: Iterable[str]) -> Iterator[tuple[int, PayeeInfo]]:
+        for payee_key in payee_keys:
+            for payee_count, payee_info in enumerate(self.__payees_info.get(payee_key, []), 1):
+                yield payee_count, payee_info
+
     def __iter__(self) -> Iterator[tuple[int, PayeeInfo]]:
-        payee_infos_with_count: list[tuple[int, PayeeInfo]] = []
+        return self.__iter_keys(list(self.__payees_info))
+
+    def __len__(self):
+        return sum(len(payee_list) for payee_list in self.__payees_info.values())
+
+    @property
+    def tins(self) -> list[str]:
+        return list(self.__tin_keys)
+
+    @property
+    def periods(self) -> list[tuple[int, int]]:
+        '''
+            returns the sorted (year, first month) periods
+        '''
+        return sorted(self.__period_keys)
+
+    def by_tin(self, tin: str) -> Iterator[tuple[int, PayeeInfo]]:
+        return self.__iter_keys(list(self.__tin_keys.get(tin, [])))
+
+    def by_period(self, year: int, month: int) -> Iterator[tuple[int, PayeeInfo]]:
+        return self.__iter_keys(list(self.__period_keys.get((year, month), [])))
 
-        for payee_list in self.__payees_info.values():
-            payee_info_holder = tuple((payee_count + 1, payee_list[payee_count]) for payee_count in range(len(payee_list)))
+    def sorted_by_tin(self) -> Iterator[tuple[int, PayeeInfo]]:
+        '''
+            yields the payee infos ordered by TIN then period, only the keys are sorted
+        '''
+        return self.__iter_keys(sorted(self.__key_infos, key=lambda payee_key: self.__key_infos[payee_key]))
 
-            payee_infos_with_count = [*payee_infos_with_count, *payee_info_holder]
+    def sorted_by_period(self) -> Iterator[tuple[int, PayeeInfo]]:
+        '''
+            yields the payee infos ordered by period then TIN, only the keys are sorted
+        '''
+        def period_order(payee_key: str):
+            tin, year, month = self.__key_infos[payee_key]
+            return (year, month, tin)
 
-        return iter(payee_infos_with_count)
+        return self.__iter_keys(sorted(self.__key_infos, key=period_order))
     
     def __getitem__(self, key: str):
         payee_info_list = self.__payees_info.get(key)
@@ -3,6 +3,8 @@ from datetime import datetime
 from utils import check_instance, merge_str_if, merge_str_if_not_empty, ConvertTo
 import re
 
+TIN_SPLIT_PATTERN = re.compile('\\s*-\\s*|\\s+|\\D')
+
 class InCompletePayeeInfo(Exception):
     pass
 
@@ -20,12 +22,17 @@ def get_invalid(*values: tuple[str, Any, Literal['is_empty', 'is_positive']]):
             ): return (header, value, 'Invalid Number')
 
         
+def invalid_msg(arg: tuple[str, Any, str]):
+    return f'{arg[2]} : {arg[0]} has a value of \'{arg[1]}\''
+
 def throw_error(arg: tuple[str, Any, str] | None):
     if not arg: return
 
-    raise ValueError(f'{arg[2]} : {arg[0]} has a value of \'{arg[1]}\'')
+    raise ValueError(invalid_msg(arg))
 
 class WithholdingTaxItem:
+    __slots__ = ('atc_code', 'atc_description', 'month', 'year', 'base', 'tax')
+
     def __init__(
         self,
         atc_code: Any,
@@ -61,6 +68,48 @@ class WithholdingTaxItem:
         self.base: float = processed_base
         self.tax: float = processed_tax
 
+    @staticmethod
+    def from_totals(atc_code: str, atc_description: str, month: int, year: int, base: float, tax: float):
+        '''
+            returns an item of already validated and aggregated values, the validation of the constructor is skipped
+        '''
+        wtax_item: WithholdingTaxItem = object.__new__(WithholdingTaxItem)
+        wtax_item.atc_code = atc_code
+        wtax_item.atc_description = atc_description
+        wtax_item.month = month
+        wtax_item.year = year
+        wtax_item.base = base
+        wtax_item.tax = tax
+
+        return wtax_item
+
+def convert_to_double_digit(value: str):
+    return ('0' + value) if len(value) == 1 else value
+
+class PayeeFormatInput:
+    @staticmethod
+    def period_mmdd(month: str, day: int):
+        double_digit_month = convert_to_double_digit(month)
+        double_digit_day = convert_to_double_digit(str(day))
+        return f' {double_digit_month[0]}  {double_digit_month[1]}   {double_digit_day[0]}   {double_digit_day[1]}'
+    
+    @staticmethod
+    def period_yyyy(year: str):
+        return f' {year[0]}  {year[1]}   {year[2]}  {year[3]}'
+    
+    @staticmethod
+    def tin_unit(unit: str):
+        return f' {unit[0]}  {unit[1]}   {unit[2]}'
+    
+    @staticmethod
+    def branch_unit(unit: str):
+        return f'  {unit[0]}   {unit[1]}   {unit[2]}   {unit[3]}   {unit[4]}'
+    
+    @staticmethod
+    def zip_code(zip_code: str):
+        if len(zip_code) < 4: return ''
+        return f' {zip_code[0]}  {zip_code[1]}   {zip_code[2]}  {zip_code[3]}'
+
 def validate_value_len(value: str, fixed_len: int, msg_func: Callable[[str, int, int], str], is_limit_mode: bool = False):
     '''
         args:
@@ -96,8 +145,8 @@ def validate_tin_units(tin_units: list[str]):
             tin_segment_msg_invalid(unit_count + 1)
         )
 
-def validate_tin_format(tin: str, pattern: str, branch_optional: bool = False):
-    tin_list = re.split(pattern, tin)
+def validate_tin_format(tin: str, pattern: re.Pattern[str], branch_optional: bool = False):
+    tin_list = pattern.split(tin)
 
     not_length_four = len(tin_list) != 4
 
@@ -120,8 +169,38 @@ def address_msg_invalid(value: str, fixed_len: int, value_len: int):
 def zip_code_msg_invalid(value: str, fixed_len: int, value_len: int):
     return f'Invalid length of zip codes digits with a value of \'{value}\': it should be only {fixed_len} not {value_len}'
 
+def compose_indiv_name(last_name: str, first_name: str, mid_name: str):
+    has_last_name = bool(last_name)
+
+    given_name = first_name + (' ' if bool(mid_name.strip()) else '') + mid_name
+    has_given_name = bool(given_name)
+
+    return merge_str_if(
+        (last_name, has_last_name),
+        (', ', has_last_name and has_given_name),
+        (given_name, has_given_name)
+    )
+
+def compose_entity_name(org_name: str, indiv_name: str):
+    has_org_name = bool(org_name)
+    has_indiv_name = bool(indiv_name)
+
+    return merge_str_if(
+        (org_name, has_org_name),
+        (' - ', has_org_name and has_indiv_name),
+        (indiv_name, has_indiv_name)
+    )
+
 class EntityItem:
-    __tin_reg_ex = '\\s*-\\s*|\\s+|\\D'
+    '''
+        Validated payee or payor record, the derived names and tin segments are computed once on creation
+    '''
+    __slots__ = (
+        'tin', 'org_name', 'last_name', 'first_name', 'mid_name', 'address', 'zip_code',
+        '__signor_info', '__signor_tin', '__raw_entity_name', '__indiv_name', '__prod_entity_name', '__tin_segments',
+        '__form_units'
+    )
+    __tin_reg_ex = TIN_SPLIT_PATTERN
 
     def __init__(
         self,
@@ -180,8 +259,13 @@ class EntityItem:
         self.mid_name: str = processed_mid_name
         self.address: str = processed_address
         self.zip_code: str = processed_zip
-        self.__signor_info: None | str = None
-        self.__signor_tin: None | str = None
+        self.__signor_info: str = ''
+        self.__signor_tin: str = ''
+        self.__raw_entity_name = processed_org_name + processed_last_name + processed_first_name + processed_mid_name
+        self.__indiv_name = compose_indiv_name(processed_last_name, processed_first_name, processed_mid_name)
+        self.__prod_entity_name = compose_entity_name(processed_org_name, self.__indiv_name)
+        self.__tin_segments = tuple(EntityItem.__tin_reg_ex.split(processed_tin))
+        self.__form_units: tuple[str, ...] | None = None
 
         validate_value_len(
             self.prod_entity_name,
@@ -190,6 +274,43 @@ class EntityItem:
             True
         )
 
+    @staticmethod
+    def from_fields(
+        tin: str,
+        org_name: str,
+        last_name: str,
+        first_name: str,
+        mid_name: str,
+        address: str,
+        zip_code: str,
+        indiv_name: str,
+        prod_entity_name: str,
+        signor_info: str,
+        signor_tin: str,
+        form_units: tuple[str, ...] | None = None
+    ):
+        '''
+            returns an item of already validated and processed fields, e.g. of the payee master,
+            the validation of the constructor is skipped
+        '''
+        entity_item: EntityItem = object.__new__(EntityItem)
+        entity_item.tin = tin
+        entity_item.org_name = org_name
+        entity_item.last_name = last_name
+        entity_item.first_name = first_name
+        entity_item.mid_name = mid_name
+        entity_item.address = address
+        entity_item.zip_code = zip_code
+        entity_item.__signor_info = signor_info
+        entity_item.__signor_tin = signor_tin
+        entity_item.__raw_entity_name = org_name + last_name + first_name + mid_name
+        entity_item.__indiv_name = indiv_name
+        entity_item.__prod_entity_name = prod_entity_name
+        entity_item.__tin_segments = tuple(EntityItem.__tin_reg_ex.split(tin))
+        entity_item.__form_units = form_units
+
+        return entity_item
+
     def add_signor(self, signor_name, signor_tin, signor_position):
         proc_signor_name = ConvertTo.cap_str(signor_name)
         proc_signor_position = ConvertTo.cap_str(signor_position)
@@ -200,55 +321,57 @@ class EntityItem:
         proc_signor_tin = ConvertTo.trimm_str(signor_tin)
         if proc_signor_tin: validate_tin_format(proc_signor_tin, EntityItem.__tin_reg_ex, True)
 
-        self.__signor_info = merge_str_if(
+        self.__signor_info = ConvertTo.cap_str(merge_str_if(
             (proc_signor_name, has_signor_name),
             (' - ', has_signor_name and has_signor_position),
             (proc_signor_position, has_signor_position)
-        )
+        ))
         self.__signor_tin = proc_signor_tin
 
         return self
 
     @property
-    def signor_info(self):
-        return ConvertTo.cap_str(self.__signor_info)
+    def signor_info(self) -> str:
+        return self.__signor_info
     
     @property
-    def signor_tin(self):
-        return ConvertTo.trimm_str(self.__signor_tin)
+    def signor_tin(self) -> str:
+        return self.__signor_tin
 
     @property
-    def raw_entity_name(self):
-        return self.org_name + self.last_name + self.first_name + self.mid_name
+    def raw_entity_name(self) -> str:
+        return self.__raw_entity_name
     
     @property
-    def indiv_name(self):
-        last_name = self.last_name
-        has_last_name = bool(last_name)
-
-        given_name = self.first_name + (' ' if bool(self.mid_name.strip()) else '') + self.mid_name
-        has_given_name = bool(given_name)
-
-        return merge_str_if(
-            (last_name, has_last_name),
-            (', ', has_last_name and has_given_name),
-            (given_name, has_given_name)
-        )
+    def indiv_name(self) -> str:
+        return self.__indiv_name
     
     @property
-    def prod_entity_name(self):
-        org_name = self.org_name
-        has_org_name = bool(org_name)
-
-        indiv_name = self.indiv_name
-        has_indiv_name = bool(indiv_name)
-
-        return merge_str_if(
-            (org_name, has_org_name),
-            (' - ', has_org_name and has_indiv_name),
-            (indiv_name, has_indiv_name)
-        )
+    def prod_entity_name(self) -> str:
+        return self.__prod_entity_name
     
     @property
-    def tin_segments(self):
-        return re.split(EntityItem.__tin_reg_ex, self.tin)
\ No newline at end of file
+    def tin_segments(self) -> tuple[str, ...]:
+        return self.__tin_segments
+
+    @property
+    def form_units(self) -> tuple[str, ...] | None:
+        '''
+            formatted tin, branch and zip code units of the form, set once the entity is first written
+        '''
+        return self.__form_units
+
+    def set_form_units(self, form_units: tuple[str, ...]):
+        self.__form_units = form_units
+
+def entity_form_units(entity_item: EntityItem) -> tuple[str, ...]:
+    '''
+        returns the formatted (tin unit 1, tin unit 2, tin unit 3, branch unit, zip code unit) of an entity
+    '''
+    tin_segments = entity_item.tin_segments
+
+    return (
+        *[PayeeFormatInput.tin_unit(tin_segment) for tin_segment in tin_segments[:3]],
+        PayeeFormatInput.branch_unit(tin_segments[3]),
+        PayeeFormatInput.zip_code(entity_item.zip_code)
+    )
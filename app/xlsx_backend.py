@@ -0,0 +1,144 @@
+from backend import Backend, value_rows, range_value
+from xlsx_template import XlsxTemplate
+from utils import split_range_ref
+from pathlib import Path
+from typing import Any, BinaryIO
+import io
+
+class XlsxRange:
+    def __init__(self, sheet: 'XlsxSheet', range_ref: str, ndim: int | None = None) -> None:
+        (first_row, first_col), (last_row, last_col) = split_range_ref(range_ref)
+
+        self.sheet = sheet
+        self.address = range_ref
+        self.row = first_row
+        self.column = first_col
+        self.last_row = last_row
+        self.last_column = last_col
+        self.__ndim = ndim
+
+    def options(self, ndim: int | None = None):
+        return XlsxRange(self.sheet, self.address, ndim)
+
+    @property
+    def value(self) -> Any:
+        '''
+            returns the values written through this book, the template's own cell values aren't decoded
+        '''
+        cell_values = self.sheet.cell_values
+        rows = [
+            [cell_values.get((row, col)) for col in range(self.column, self.last_column + 1)]
+            for row in range(self.row, self.last_row + 1)
+        ]
+
+        return range_value(rows, self.__ndim)
+
+    @value.setter
+    def value(self, value: Any):
+        for row_offset, row_values in enumerate(value_rows(value)):
+            for col_offset, cell_value in enumerate(row_values):
+                self.sheet.cell_values[(self.row + row_offset, self.column + col_offset)] = cell_value
+
+class XlsxShape:
+    def __init__(self, sheet: 'XlsxSheet', name: str) -> None:
+        self.sheet = sheet
+        self.name = name
+
+    @property
+    def text(self) -> str:
+        return self.sheet.shape_texts.get(self.name, '')
+
+    @text.setter
+    def text(self, value: str):
+        self.sheet.shape_texts[self.name] = value
+
+class XlsxShapes:
+    def __init__(self, sheet: 'XlsxSheet') -> None:
+        self.__sheet = sheet
+
+    def __getitem__(self, name: str):
+        if name not in self.__sheet.template.shape_slots:
+            raise KeyError(f'The shape \'{name}\' doesn\'t exist')
+
+        return XlsxShape(self.__sheet, name)
+
+class XlsxSheet:
+    '''
+        Collects the cell values and shape texts written to the first sheet of a template,
+        they're patched into the template package on save
+    '''
+    def __init__(self, template: XlsxTemplate) -> None:
+        self.template = template
+        self.name = template.sheet_name
+        self.cell_values: dict[tuple[int, int], Any] = {}
+        self.shape_texts: dict[str, str] = {}
+        self.shapes = XlsxShapes(self)
+
+    def __getitem__(self, ref: str):
+        return XlsxRange(self, self.template.resolve(ref))
+
+    def copy(self):
+        sheet = XlsxSheet(self.template)
+        sheet.cell_values = dict(self.cell_values)
+        sheet.shape_texts = dict(self.shape_texts)
+
+        return sheet
+
+class XlsxBook:
+    def __init__(self, template: XlsxTemplate) -> None:
+        self.template = template
+        self.sheets = [XlsxSheet(template)]
+
+    def save(self, path: str):
+        sheet = self.sheets[0]
+        self.template.save(path, sheet.cell_values, sheet.shape_texts)
+
+    def write(self, stream: BinaryIO):
+        sheet = self.sheets[0]
+        self.template.write(stream, sheet.cell_values, sheet.shape_texts)
+
+    def close(self):
+        pass
+
+class XlsxApp:
+    def quit(self):
+        pass
+
+class XlsxBackend(Backend):
+    '''
+        Excel-free backend rendering forms by patching the template package directly,
+        each template is loaded once per backend
+    '''
+    name = 'xlsx'
+    Sheet = XlsxSheet
+    Range = XlsxRange
+    Shape = XlsxShape
+
+    def __init__(self, compresslevel: int = 6) -> None:
+        self.__compresslevel = compresslevel
+        self.__templates: dict[str, XlsxTemplate] = {}
+
+    def template(self, book_path: str):
+        template_key = str(Path(book_path).resolve())
+
+        template = self.__templates.get(template_key)
+        if template is None:
+            template = XlsxTemplate(book_path, self.__compresslevel)
+            self.__templates[template_key] = template
+
+        return template
+
+    def start_app(self):
+        return XlsxApp()
+
+    def quit_app(self, app: XlsxApp):
+        app.quit()
+
+    def open_book(self, app: XlsxApp, book_path: str):
+        return XlsxBook(self.template(book_path))
+
+    def book_bytes(self, book: XlsxBook):
+        book_stream = io.BytesIO()
+        book.write(book_stream)
+
+        return book_stream.getvalue()
@@ -0,0 +1,245 @@
+from xlsx_template import locate_template_parts, parse_attrs, parse_defined_names, parse_relationships, rels_part, resolve_part
+from alphalist import PAYOR_FIELDS
+from row_source import RowSource
+from utils import ConvertTo, column_index, split_cell_ref
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterator
+from xml.etree.ElementTree import Element, iterparse
+from xml.sax.saxutils import unescape
+import re
+import zipfile
+
+XLSX_SUFFIXES = ('.xlsx', '.xlsm')
+SPREADSHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+ROW_TAG = f'{SPREADSHEET_NS}row'
+CELL_TAG = f'{SPREADSHEET_NS}c'
+VALUE_TAG = f'{SPREADSHEET_NS}v'
+INLINE_STRING_TAG = f'{SPREADSHEET_NS}is'
+SHARED_STRING_TAG = f'{SPREADSHEET_NS}si'
+TEXT_TAG = f'{SPREADSHEET_NS}t'
+RUN_TAG = f'{SPREADSHEET_NS}r'
+SHEET_DATA_TAG = f'{SPREADSHEET_NS}sheetData'
+WORKBOOK_PROPS_PATTERN = re.compile(r'<workbookPr\b([^>]*)>')
+NUM_FMT_PATTERN = re.compile(r'<numFmt\b([^>]*)/>')
+CELL_XFS_PATTERN = re.compile(r'<cellXfs\b[^>]*>(.*?)</cellXfs>', re.S)
+XF_TAG_PATTERN = re.compile(r'<xf\b([^>]*)>')
+FORMAT_LITERAL_PATTERN = re.compile(r'"[^"]*"|\\.|\[[^\]]*\]')
+DATE_TOKEN_PATTERN = re.compile(r'[dmyhs]', re.I)
+BUILTIN_DATE_FORMAT_IDS = {14, 15, 16, 17, 18, 19, 20, 21, 22, 45, 46, 47}
+EPOCH_1900 = datetime(1899, 12, 30)
+EPOCH_1904 = datetime(1904, 1, 1)
+SOURCE_FIRST_ROW = 15
+SOURCE_COLUMN_COUNT = 15
+
+def is_xlsx_path(source_path: str):
+    return Path(source_path).suffix.lower() in XLSX_SUFFIXES
+
+def is_date_format(format_code: str):
+    '''
+        a number format showing a day, month, year or time part, the quoted texts, escaped characters
+        and bracketed colors or conditions of the format aren't parts
+    '''
+    return bool(DATE_TOKEN_PATTERN.search(FORMAT_LITERAL_PATTERN.sub('', format_code)))
+
+def parse_date_styles(styles_xml: str) -> set[int]:
+    '''
+        returns the indexes of the cell styles with a date number format
+    '''
+    date_format_ids = set(BUILTIN_DATE_FORMAT_IDS)
+    for fmt_attrs in NUM_FMT_PATTERN.findall(styles_xml):
+        attrs = parse_attrs(fmt_attrs)
+        if is_date_format(unescape(attrs.get('formatCode', ''), {'&quot;': '"', '&apos;': '\''})):
+            date_format_ids.add(int(attrs['numFmtId']))
+
+    cell_xfs = CELL_XFS_PATTERN.search(styles_xml)
+    if cell_xfs is None: return set()
+
+    return {
+        style_index for style_index, xf_attrs in enumerate(XF_TAG_PATTERN.findall(cell_xfs.group(1)))
+        if int(parse_attrs(xf_attrs).get('numFmtId', '0')) in date_format_ids
+    }
+
+def element_text(element: Element):
+    '''
+        text of a shared or inline string, the phonetic runs are skipped
+    '''
+    text = ''
+    for child in element:
+        if child.tag == TEXT_TAG:
+            text += child.text or ''
+        elif child.tag == RUN_TAG:
+            text += ''.join(run_text.text or '' for run_text in child.iter(TEXT_TAG))
+
+    return text
+
+class XlsxSource(RowSource):
+    '''
+        Source rows streamed from the first sheet of a source template xlsx without Excel.
+        The sheet xml is parsed incrementally and every row is dropped once read, only the shared strings are kept.
+        The cell values are the ones xlwings returns:
+            numbers - float, date styled numbers - datetime, texts - str, booleans - bool, empty and error cells - None
+        The payor fields are the cells of their defined names at the first sheet
+    '''
+    def __init__(self, source_path: str) -> None:
+        self.source_path = source_path
+        self.__package: zipfile.ZipFile | None = None
+        self.__sheet_part = ''
+        self.__defined_names: dict[str, str] = {}
+        self.__shared_strings: list[str] | None = None
+        self.__date_styles: set[int] = set()
+        self.__epoch = EPOCH_1900
+        self.__payor_fields: dict[str, Any] | None = None
+
+    def __read_part(self, part_name: str):
+        return self.package.read(part_name).decode('utf-8')
+
+    def __has_part(self, part_name: str):
+        return part_name in self.package.NameToInfo
+
+    @property
+    def package(self) -> zipfile.ZipFile:
+        '''
+            the opened xlsx package, its first sheet, defined names, date styles and shared strings are read on first use
+        '''
+        if self.__package is not None: return self.__package
+
+        self.__package = zipfile.ZipFile(self.source_path)
+
+        workbook_xml = self.__read_part('xl/workbook.xml')
+        sheet_name, self.__sheet_part, _ = locate_template_parts(self.__read_part, self.__has_part)
+        self.__defined_names = parse_defined_names(workbook_xml, sheet_name)
+        workbook_props = WORKBOOK_PROPS_PATTERN.search(workbook_xml)
+        if workbook_props is not None and parse_attrs(workbook_props.group(1)).get('date1904') in ('1', 'true'):
+            self.__epoch = EPOCH_1904
+
+        workbook_rels = rels_part('xl/workbook.xml')
+        relationships = parse_relationships(self.__read_part(workbook_rels)) if self.__has_part(workbook_rels) else {}
+        for rel_type, target in relationships.values():
+            part_name = resolve_part('xl/workbook.xml', target)
+            if rel_type.endswith('/styles') and self.__has_part(part_name):
+                self.__date_styles = parse_date_styles(self.__read_part(part_name))
+            elif rel_type.endswith('/sharedStrings') and self.__has_part(part_name):
+                self.__shared_strings = self.__read_shared_strings(part_name)
+
+        return self.__package
+
+    @property
+    def defined_names(self) -> dict[str, str]:
+        '''
+            {defined name: A1 style reference} of the names referring to the first sheet
+        '''
+        self.package
+
+        return self.__defined_names
+
+    def close(self):
+        if self.__package is not None: self.__package.close()
+        self.__package = None
+
+    def __read_shared_strings(self, part_name: str) -> list[str]:
+        shared_strings: list[str] = []
+        with self.package.open(part_name) as part_file:
+            for _, element in iterparse(part_file):
+                if element.tag != SHARED_STRING_TAG: continue
+
+                shared_strings.append(element_text(element))
+                element.clear()
+
+        return shared_strings
+
+    def __cell_value(self, cell: Element) -> Any:
+        cell_type = cell.get('t', 'n')
+
+        if cell_type == 'inlineStr':
+            inline_string = cell.find(INLINE_STRING_TAG)
+            return None if inline_string is None else element_text(inline_string)
+
+        value_element = cell.find(VALUE_TAG)
+        value = None if value_element is None else value_element.text
+        if value is None or cell_type == 'e': return None
+
+        if cell_type == 's':
+            if self.__shared_strings is None:
+                raise ValueError(f'The shared strings of this \'{self.source_path}\' book aren\'t found')
+            return self.__shared_strings[int(value)]
+        if cell_type == 'str': return value
+        if cell_type == 'b': return value == '1'
+        if cell_type == 'd': return datetime.fromisoformat(value)
+
+        number = float(value)
+        if int(cell.get('s', '0')) in self.__date_styles:
+            return self.__epoch + timedelta(days=number)
+
+        return number
+
+    def iter_rows(self) -> Iterator[tuple[int, dict[int, Any]]]:
+        '''
+            yields (row, {column index: value}) of the rows with a value, a row is cleared once yielded
+        '''
+        sheet_data: Element | None = None
+        current_row = 0
+        column_indexes: dict[str, int] = {}
+
+        with self.package.open(self.__sheet_part) as sheet_file:
+            for event, element in iterparse(sheet_file, events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == SHEET_DATA_TAG: sheet_data = element
+                    continue
+                if element.tag != ROW_TAG: continue
+
+                current_row = int(element.get('r', current_row + 1))
+                row_values: dict[int, Any] = {}
+                current_col = 0
+                for cell in element.iter(CELL_TAG):
+                    cell_ref = cell.get('r')
+                    if cell_ref is None:
+                        current_col += 1
+                    else:
+                        column = cell_ref.rstrip('0123456789')
+                        current_col = column_indexes.get(column) or column_indexes.setdefault(column, column_index(column))
+
+                    value = self.__cell_value(cell)
+                    if value is not None: row_values[current_col] = value
+
+                if sheet_data is not None: sheet_data.clear()
+                else: element.clear()
+
+                if row_values: yield current_row, row_values
+
+    @property
+    def payor_fields(self) -> dict[str, Any]:
+        '''
+            {payor field: value} of the PAYOR_FIELDS, the sheet is only read until the last payor cell
+        '''
+        if self.__payor_fields is not None: return self.__payor_fields
+
+        defined_names = self.defined_names
+        field_cells: dict[str, tuple[int, int]] = {}
+        for field in PAYOR_FIELDS:
+            if field not in defined_names:
+                raise ValueError(f'The defined name \'{field}\' isn\'t found at this \'{self.source_path}\' book')
+            field_cells[field] = split_cell_ref(defined_names[field].partition(':')[0])
+
+        last_row = max(row for row, _ in field_cells.values())
+        cell_values: dict[tuple[int, int], Any] = {}
+        for row, row_values in self.iter_rows():
+            if row > last_row: break
+            cell_values.update(((row, col), value) for col, value in row_values.items())
+
+        self.__payor_fields = {field: cell_values.get(cell) for field, cell in field_cells.items()}
+
+        return self.__payor_fields
+
+    def rows(self) -> Iterator[tuple[str, list[Any]]]:
+        '''
+            yields (row reference, raw row values of the A-O source columns) of the contiguous rows with a tin
+            starting at the first data row, only one row is kept at a time
+        '''
+        expected_row = SOURCE_FIRST_ROW
+        for row, row_values in self.iter_rows():
+            if row < SOURCE_FIRST_ROW: continue
+            if row != expected_row or not ConvertTo.trimm_str(row_values.get(1)): break
+
+            yield f'A{row}:O{row}', [row_values.get(col) for col in range(1, SOURCE_COLUMN_COUNT + 1)]
+            expected_row += 1
@@ -0,0 +1,360 @@
+from zip_stream import ZipEntry, ZipStreamWriter, compress_entry
+from utils import split_cell_ref, split_range_ref, column_letter
+from xml.sax.saxutils import escape
+from typing import Any, BinaryIO, Callable, NamedTuple
+import hashlib
+import posixpath
+import re
+import zipfile
+
+ATTR_PATTERN = re.compile(r'([\w:]+)="([^"]*)"')
+SHEET_TAG_PATTERN = re.compile(r'<sheet\b[^>]*>')
+RELATIONSHIP_TAG_PATTERN = re.compile(r'<Relationship\b[^>]*>')
+DEFINED_NAME_PATTERN = re.compile(r'<definedName\b([^>]*)>([^<]*)</definedName>')
+ROW_PATTERN = re.compile(r'<row\b([^>]*?)(/?)>')
+CELL_PATTERN = re.compile(r'<c\b([^>]*?)(?:/>|>.*?</c>)', re.S)
+SHAPE_NAME_PATTERN = re.compile(r'<xdr:nvSpPr><xdr:cNvPr\b([^>]*)>')
+PARAGRAPH_PROPS_PATTERN = re.compile(r'<a:pPr\b[^>]*?/>|<a:pPr\b.*?</a:pPr>', re.S)
+RUN_PROPS_PATTERN = re.compile(r'<a:rPr\b[^>]*?/>|<a:rPr\b.*?</a:rPr>', re.S)
+END_RUN_PROPS_PATTERN = re.compile(r'<a:endParaRPr\b[^>]*?/>|<a:endParaRPr\b.*?</a:endParaRPr>', re.S)
+NUMBER_PATTERN = re.compile(r'-?\d+(\.\d+)?')
+
+def parse_attrs(tag_attrs: str) -> dict[str, str]:
+    return dict(ATTR_PATTERN.findall(tag_attrs))
+
+def resolve_part(base_part: str, target: str):
+    if target.startswith('/'): return target[1:]
+
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base_part), target))
+
+def rels_part(part: str):
+    return posixpath.join(posixpath.dirname(part), '_rels', posixpath.basename(part) + '.rels')
+
+def parse_relationships(rels_xml: str) -> dict[str, tuple[str, str]]:
+    '''
+        returns {relationship id: (relationship type, target)}
+    '''
+    relationships: dict[str, tuple[str, str]] = {}
+    for tag in RELATIONSHIP_TAG_PATTERN.findall(rels_xml):
+        attrs = parse_attrs(tag)
+        relationships[attrs['Id']] = (attrs.get('Type', ''), attrs.get('Target', ''))
+
+    return relationships
+
+def parse_defined_names(workbook_xml: str, sheet_name: str) -> dict[str, str]:
+    '''
+        returns {defined name: A1 style reference} of the names referring to `sheet_name`, built-in names are skipped
+    '''
+    defined_names: dict[str, str] = {}
+
+    for name_attrs, name_ref in DEFINED_NAME_PATTERN.findall(workbook_xml):
+        name = parse_attrs(name_attrs)['name']
+        ref_sheet_name, _, range_ref = name_ref.rpartition('!')
+        if name.startswith('_xlnm.') or ref_sheet_name.strip('\'') != sheet_name: continue
+
+        defined_names[name] = range_ref.replace('$', '')
+
+    return defined_names
+
+def parse_shape_ids(drawing_xml: str) -> dict[str, str]:
+    '''
+        returns {shape name: shape id} of the shapes with a text body, the first shape of a repeated name is kept
+    '''
+    shape_ids: dict[str, str] = {}
+
+    for shape_match in SHAPE_NAME_PATTERN.finditer(drawing_xml):
+        shape_attrs = parse_attrs(shape_match.group(1))
+        shape_name = shape_attrs.get('name', '')
+        if shape_name in shape_ids: continue
+
+        shape_end = drawing_xml.find('</xdr:sp>', shape_match.end())
+        if drawing_xml.find('<xdr:txBody>', shape_match.end(), shape_end) < 0: continue
+
+        shape_ids[shape_name] = shape_attrs.get('id', '')
+
+    return shape_ids
+
+class TemplateParts(NamedTuple):
+    sheet_name: str
+    sheet_part: str
+    drawing_part: str | None
+
+def locate_template_parts(read_part: Callable[[str], str], has_part: Callable[[str], bool]) -> TemplateParts:
+    '''
+        returns the name and part of the first sheet and the part of its drawing
+            read_part: callable - returns the decoded xml of a package part
+            has_part: callable - returns whether a package part exists
+    '''
+    def relationships(part_name: str):
+        rels_name = rels_part(part_name)
+        return parse_relationships(read_part(rels_name)) if has_part(rels_name) else {}
+
+    first_sheet_attrs = parse_attrs(SHEET_TAG_PATTERN.findall(read_part('xl/workbook.xml'))[0])
+    sheet_part = resolve_part('xl/workbook.xml', relationships('xl/workbook.xml')[first_sheet_attrs['r:id']][1])
+
+    drawing_targets = [
+        target for rel_type, target in relationships(sheet_part).values()
+        if rel_type.endswith('/drawing')
+    ]
+
+    return TemplateParts(
+        sheet_name=first_sheet_attrs['name'],
+        sheet_part=sheet_part,
+        drawing_part=resolve_part(sheet_part, drawing_targets[0]) if drawing_targets else None
+    )
+
+class CellSlot(NamedTuple):
+    start: int
+    end: int
+    style: str
+
+class RowSlot(NamedTuple):
+    start: int
+    end: int
+    content_end: int
+    is_empty_tag: bool
+
+class ShapeSlot(NamedTuple):
+    shape_id: str
+    start: int
+    end: int
+    body_head: str
+    paragraph_props: str
+    run_props: str
+
+def cell_xml(row: int, col: int, style: str, value: Any):
+    cell_ref = f'{column_letter(col)}{row}'
+    style_attr = f' s="{style}"' if style else ''
+
+    if value is None or value == '':
+        return f'<c r="{cell_ref}"{style_attr}/>'
+    if isinstance(value, bool):
+        return f'<c r="{cell_ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{cell_ref}"{style_attr}><v>{value}</v></c>'
+
+    text = str(value)
+    if NUMBER_PATTERN.fullmatch(text.strip()):
+        return f'<c r="{cell_ref}"{style_attr}><v>{float(text)}</v></c>'
+
+    return f'<c r="{cell_ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+def shape_body_xml(slot: ShapeSlot, text: str):
+    paragraphs = ''.join(
+        f'<a:p>{slot.paragraph_props}<a:r>{slot.run_props}<a:t>{escape(line)}</a:t></a:r></a:p>' if line
+        else f'<a:p>{slot.paragraph_props}</a:p>'
+        for line in text.split('\n')
+    )
+
+    return f'<xdr:txBody>{slot.body_head}{paragraphs}</xdr:txBody>'
+
+class XlsxTemplate:
+    '''
+        A template package loaded into memory once. Only the first sheet and its drawing are patched on render,
+        every other part is compressed once and copied as is to each output.
+    '''
+    def __init__(self, template_path: str, compresslevel: int = 6) -> None:
+        with open(template_path, 'rb') as template_file:
+            template_bytes = template_file.read()
+
+        self.template_path = template_path
+        self.content_hash = hashlib.sha256(template_bytes).hexdigest()
+        self.__compresslevel = compresslevel
+
+        with zipfile.ZipFile(template_path) as template_zip:
+            self.__parts: dict[str, tuple[bytes, tuple[int, int, int, int, int, int]]] = {
+                info.filename: (template_zip.read(info), info.date_time)
+                for info in template_zip.infolist()
+            }
+
+        template_parts = locate_template_parts(self.read_part, lambda part_name: part_name in self.__parts)
+        self.sheet_name = template_parts.sheet_name
+        self.sheet_part = template_parts.sheet_part
+        self.drawing_part = template_parts.drawing_part
+
+        self.defined_names = parse_defined_names(self.read_part('xl/workbook.xml'), self.sheet_name)
+
+        self.__sheet_xml = self.read_part(self.sheet_part)
+        self.cell_slots: dict[tuple[int, int], CellSlot] = {}
+        self.row_slots: dict[int, RowSlot] = {}
+        self.__load_sheet_slots()
+
+        self.__drawing_xml = '' if self.drawing_part is None else self.read_part(self.drawing_part)
+        self.shape_slots: dict[str, ShapeSlot] = {}
+        self.__load_shape_slots()
+
+        self.__compressed_parts: dict[str, ZipEntry] = {
+            part_name: compress_entry(part_name, data, date_time, compresslevel)
+            for part_name, (data, date_time) in self.__parts.items()
+            if part_name not in (self.sheet_part, self.drawing_part)
+        }
+        self.__static_entries: list[ZipEntry | str] = [
+            self.__compressed_parts.get(part_name, part_name) for part_name in self.__parts
+        ]
+
+    @property
+    def compresslevel(self):
+        return self.__compresslevel
+
+    @property
+    def part_names(self) -> list[str]:
+        return list(self.__parts)
+
+    def read_part(self, part_name: str) -> str:
+        return self.__parts[part_name][0].decode('utf-8')
+
+    def compressed_part(self, part_name: str) -> ZipEntry:
+        '''
+            returns the part compressed on load, the first sheet and its drawing aren't included
+        '''
+        return self.__compressed_parts[part_name]
+
+    def __load_sheet_slots(self):
+        sheet_xml = self.__sheet_xml
+
+        for row_match in ROW_PATTERN.finditer(sheet_xml):
+            row = int(parse_attrs(row_match.group(1))['r'])
+            is_empty_tag = row_match.group(2) == '/'
+            content_end = row_match.end() if is_empty_tag else sheet_xml.index('</row>', row_match.end())
+            self.row_slots[row] = RowSlot(row_match.start(), row_match.end(), content_end, is_empty_tag)
+
+            if is_empty_tag: continue
+
+            for cell_match in CELL_PATTERN.finditer(sheet_xml, row_match.end(), content_end):
+                cell_attrs = parse_attrs(cell_match.group(1))
+                self.cell_slots[split_cell_ref(cell_attrs['r'])] = CellSlot(
+                    cell_match.start(),
+                    cell_match.end(),
+                    cell_attrs.get('s', '')
+                )
+
+    def __load_shape_slots(self):
+        drawing_xml = self.__drawing_xml
+
+        for shape_match in SHAPE_NAME_PATTERN.finditer(drawing_xml):
+            shape_attrs = parse_attrs(shape_match.group(1))
+            shape_name = shape_attrs.get('name', '')
+            if shape_name in self.shape_slots: continue
+
+            shape_end = drawing_xml.find('</xdr:sp>', shape_match.end())
+            body_start = drawing_xml.find('<xdr:txBody>', shape_match.end(), shape_end)
+            if body_start < 0: continue
+
+            body_end = drawing_xml.index('</xdr:txBody>', body_start) + len('</xdr:txBody>')
+            body_xml = drawing_xml[body_start:body_end]
+            head_end = body_xml.find('<a:p>')
+            head_end = body_xml.find('<a:p ') if head_end < 0 else head_end
+
+            paragraph_props = PARAGRAPH_PROPS_PATTERN.search(body_xml)
+            run_props = RUN_PROPS_PATTERN.search(body_xml)
+            end_run_props = END_RUN_PROPS_PATTERN.search(body_xml)
+
+            if run_props:
+                run_props_xml = run_props.group(0)
+            elif end_run_props:
+                run_props_xml = end_run_props.group(0).replace('a:endParaRPr', 'a:rPr')
+            else:
+                run_props_xml = ''
+
+            self.shape_slots[shape_name] = ShapeSlot(
+                shape_id=shape_attrs.get('id', ''),
+                start=body_start,
+                end=body_end,
+                body_head=body_xml[len('<xdr:txBody>'):head_end],
+                paragraph_props=paragraph_props.group(0) if paragraph_props else '',
+                run_props=run_props_xml
+            )
+
+    def resolve(self, ref: str):
+        '''
+            returns the A1 style range reference of a defined name or a cell/range reference
+        '''
+        range_ref = self.defined_names.get(ref, ref)
+        split_range_ref(range_ref)
+
+        return range_ref
+
+    def render_sheet(self, cell_values: dict[tuple[int, int], Any]) -> bytes:
+        sheet_xml = self.__sheet_xml
+        edits: list[tuple[int, int, int, str]] = []
+        new_rows: dict[int, list[tuple[int, str]]] = {}
+
+        for (row, col), value in cell_values.items():
+            cell_slot = self.cell_slots.get((row, col))
+            if cell_slot is not None:
+                edits.append((cell_slot.start, col, cell_slot.end, cell_xml(row, col, cell_slot.style, value)))
+                continue
+
+            if row not in self.row_slots:
+                raise ValueError(f'This cell {column_letter(col)}{row} isn\'t found at the template sheet rows')
+
+            new_rows.setdefault(row, []).append((col, cell_xml(row, col, '', value)))
+
+        for row, new_cells in new_rows.items():
+            row_slot = self.row_slots[row]
+            new_cells.sort()
+
+            if row_slot.is_empty_tag:
+                row_tag = sheet_xml[row_slot.start:row_slot.end]
+                cells_xml = ''.join(xml for _, xml in new_cells)
+                edits.append((row_slot.start, 0, row_slot.end, f'{row_tag[:-2]}>{cells_xml}</row>'))
+                continue
+
+            for col, xml in new_cells:
+                insert_at = row_slot.content_end
+                for (slot_row, slot_col), cell_slot in self.cell_slots.items():
+                    if slot_row == row and slot_col > col and cell_slot.start < insert_at:
+                        insert_at = cell_slot.start
+                edits.append((insert_at, col, insert_at, xml))
+
+        edits.sort()
+
+        pieces: list[str] = []
+        position = 0
+        for start, _, end, xml in edits:
+            pieces.append(sheet_xml[position:start])
+            pieces.append(xml)
+            position = end
+        pieces.append(sheet_xml[position:])
+
+        return ''.join(pieces).encode('utf-8')
+
+    def render_drawing(self, shape_texts: dict[str, str]) -> bytes:
+        '''
+            an emptied shape keeps a single empty paragraph, its template text is cleared as Excel does
+        '''
+        drawing_xml = self.__drawing_xml
+        edits: list[tuple[int, int, str]] = []
+
+        for shape_name, text in shape_texts.items():
+            shape_slot = self.shape_slots.get(shape_name)
+            if shape_slot is None:
+                raise ValueError(f'This shape \'{shape_name}\' isn\'t found at the template drawing')
+
+            edits.append((shape_slot.start, shape_slot.end, shape_body_xml(shape_slot, text)))
+
+        edits.sort()
+
+        pieces: list[str] = []
+        position = 0
+        for start, end, xml in edits:
+            pieces.append(drawing_xml[position:start])
+            pieces.append(xml)
+            position = end
+        pieces.append(drawing_xml[position:])
+
+        return ''.join(pieces).encode('utf-8')
+
+    def write(self, stream: BinaryIO, cell_values: dict[tuple[int, int], Any], shape_texts: dict[str, str]):
+        with ZipStreamWriter(stream, self.__compresslevel) as zip_stream:
+            for entry in self.__static_entries:
+                if isinstance(entry, ZipEntry):
+                    zip_stream.write_entry(entry)
+                elif entry == self.sheet_part:
+                    zip_stream.write(entry, self.render_sheet(cell_values))
+                else:
+                    zip_stream.write(entry, self.render_drawing(shape_texts))
+
+    def save(self, file_path: str, cell_values: dict[tuple[int, int], Any], shape_texts: dict[str, str]):
+        with open(file_path, 'wb') as output_file:
+            self.write(output_file, cell_values, shape_texts)
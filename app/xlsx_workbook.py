@@ -0,0 +1,217 @@
+from xlsx_template import (
+    XlsxTemplate, DEFINED_NAME_PATTERN, RELATIONSHIP_TAG_PATTERN,
+    parse_attrs, rels_part
+)
+from zip_stream import ZipStreamWriter
+from xml.sax.saxutils import escape, quoteattr
+from typing import Any, BinaryIO
+import posixpath
+import re
+
+CONTENT_TYPES_PART = '[Content_Types].xml'
+WORKBOOK_PART = 'xl/workbook.xml'
+APP_PROPS_PART = 'docProps/app.xml'
+SHEETS_PATTERN = re.compile(r'<sheets>.*?</sheets>', re.S)
+DEFINED_NAMES_PATTERN = re.compile(r'<definedNames>.*?</definedNames>', re.S)
+OVERRIDE_TAG_PATTERN = re.compile(r'<Override\b[^>]*/>')
+TARGET_ATTR_PATTERN = re.compile(r'\bTarget="[^"]*"')
+SHEET_TITLE_INVALID_PATTERN = re.compile(r'[\[\]:*?/\\]')
+SHEET_TITLE_MAX_LEN = 31
+FORM_NAME_PATTERN = re.compile(r'(\d{4}_(?:\d{1,2}|Q\d)_)(.+)(_\d+)$')
+WORKSHEET_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+DRAWING_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.drawing+xml'
+WORKSHEET_REL_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet'
+APP_PROPS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties" '
+    'xmlns:vt="http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes">'
+    '<Application>Microsoft Excel</Application></Properties>'
+)
+
+def sheet_title(name: str, used_titles: set[str]):
+    '''
+        returns a valid and unique sheet name, long names are cut to the 31 characters limit of Excel
+        and repeated names get a `~N` suffix. Only the payee part of a form name is cut,
+        its leading period and trailing count are kept, e.g. `2023_1_123-456-789-00000-Payee_2`
+    '''
+    title = SHEET_TITLE_INVALID_PATTERN.sub('_', name).strip('\'') or 'Sheet'
+
+    form_name = FORM_NAME_PATTERN.match(title)
+    head, body, tail = form_name.groups() if form_name is not None else ('', title, '')
+    body_max_len = max(1, SHEET_TITLE_MAX_LEN - len(head) - len(tail))
+
+    suffix_count = 1
+    unique_title = head + body[:body_max_len] + tail
+    while unique_title.lower() in used_titles:
+        suffix_count += 1
+        suffix = f'~{suffix_count}'
+        unique_title = head + body[:max(0, body_max_len - len(suffix))] + suffix + tail
+
+    used_titles.add(unique_title.lower())
+
+    return unique_title
+
+def quote_sheet_title(title: str):
+    return "'" + title.replace("'", "''") + "'"
+
+class XlsxWorkbookWriter:
+    '''
+        Writes the forms of one template as the sheets of a single workbook. The styles, shared strings, theme,
+        media and printer settings of the template are written once and shared by every sheet,
+        each sheet only adds its own sheet and drawing parts.
+        The defined names of the template become local names of every sheet
+    '''
+    def __init__(self, template: XlsxTemplate, stream: BinaryIO) -> None:
+        if template.drawing_part is None:
+            raise ValueError(f'The template \'{template.template_path}\' doesn\'t have a drawing')
+
+        self.template = template
+        self.sheet_titles: list[str] = []
+        self.__used_titles: set[str] = set()
+        self.__zip_stream: ZipStreamWriter | None = ZipStreamWriter(stream, template.compresslevel)
+
+        self.__sheet_dir = posixpath.dirname(template.sheet_part)
+        self.__drawing_dir = posixpath.dirname(template.drawing_part)
+        self.__per_sheet_parts = {
+            CONTENT_TYPES_PART,
+            WORKBOOK_PART,
+            rels_part(WORKBOOK_PART),
+            APP_PROPS_PART,
+            template.sheet_part,
+            rels_part(template.sheet_part),
+            template.drawing_part,
+            rels_part(template.drawing_part)
+        }
+
+        for part_name in template.part_names:
+            if part_name in self.__per_sheet_parts: continue
+            self.zip_stream.write_entry(template.compressed_part(part_name))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.sheet_titles)
+
+    def sheet_part(self, sheet_index: int):
+        return posixpath.join(self.__sheet_dir, f'sheet{sheet_index}.xml')
+
+    def drawing_part(self, sheet_index: int):
+        return posixpath.join(self.__drawing_dir, f'drawing{sheet_index}.xml')
+
+    def __sheet_rels_xml(self, sheet_index: int):
+        sheet_rels_xml = self.template.read_part(rels_part(self.template.sheet_part))
+        drawing_target = posixpath.relpath(self.drawing_part(sheet_index), self.__sheet_dir)
+
+        def replace_target(tag_match: re.Match[str]):
+            tag = tag_match.group(0)
+            if not parse_attrs(tag).get('Type', '').endswith('/drawing'): return tag
+
+            return TARGET_ATTR_PATTERN.sub(f'Target="{drawing_target}"', tag)
+
+        return RELATIONSHIP_TAG_PATTERN.sub(replace_target, sheet_rels_xml)
+
+    @property
+    def zip_stream(self):
+        if self.__zip_stream is None:
+            raise ValueError('The workbook is already closed')
+
+        return self.__zip_stream
+
+    def add_sheet(self, name: str, cell_values: dict[tuple[int, int], Any], shape_texts: dict[str, str]) -> str:
+        '''
+            renders a form as the next sheet, returns the sheet name used
+        '''
+        sheet_xml = self.template.render_sheet(cell_values)
+        drawing_xml = self.template.render_drawing(shape_texts)
+
+        title = sheet_title(name, self.__used_titles)
+        self.sheet_titles.append(title)
+        sheet_index = len(self.sheet_titles)
+
+        if sheet_index > 1: sheet_xml = sheet_xml.replace(b' tabSelected="1"', b'')
+
+        sheet_part = self.sheet_part(sheet_index)
+        drawing_part = self.drawing_part(sheet_index)
+        drawing_rels_part = rels_part(self.template.drawing_part)
+
+        self.zip_stream.write(sheet_part, sheet_xml)
+        self.zip_stream.write(rels_part(sheet_part), self.__sheet_rels_xml(sheet_index).encode('utf-8'))
+        self.zip_stream.write(drawing_part, drawing_xml)
+        if drawing_rels_part in self.template.part_names:
+            self.zip_stream.write(rels_part(drawing_part), self.template.read_part(drawing_rels_part).encode('utf-8'))
+
+        return title
+
+    def __workbook_xml(self):
+        workbook_xml = self.template.read_part(WORKBOOK_PART)
+
+        sheets_xml = ''.join(
+            f'<sheet name={quoteattr(title)} sheetId="{sheet_index}" r:id="rIdSheet{sheet_index}"/>'
+            for sheet_index, title in enumerate(self.sheet_titles, 1)
+        )
+        workbook_xml = SHEETS_PATTERN.sub(lambda _: f'<sheets>{sheets_xml}</sheets>', workbook_xml, count=1)
+
+        template_names = DEFINED_NAME_PATTERN.findall(workbook_xml)
+        if not template_names: return workbook_xml
+
+        names_xml = ''
+        for sheet_index, title in enumerate(self.sheet_titles):
+            for name_attrs, name_ref in template_names:
+                attrs = parse_attrs(name_attrs)
+                _, _, range_ref = name_ref.rpartition('!')
+                attrs['localSheetId'] = str(sheet_index)
+
+                attrs_xml = ''.join(f' {attr}={quoteattr(value)}' for attr, value in attrs.items())
+                names_xml += f'<definedName{attrs_xml}>{escape(quote_sheet_title(title))}!{range_ref}</definedName>'
+
+        return DEFINED_NAMES_PATTERN.sub(lambda _: f'<definedNames>{names_xml}</definedNames>', workbook_xml, count=1)
+
+    def __workbook_rels_xml(self):
+        workbook_rels_xml = self.template.read_part(rels_part(WORKBOOK_PART))
+        workbook_rels_xml = RELATIONSHIP_TAG_PATTERN.sub(
+            lambda tag_match: '' if parse_attrs(tag_match.group(0)).get('Type') == WORKSHEET_REL_TYPE else tag_match.group(0),
+            workbook_rels_xml
+        )
+
+        sheet_rels_xml = ''.join(
+            f'<Relationship Id="rIdSheet{sheet_index}" Type="{WORKSHEET_REL_TYPE}" '
+            f'Target="{posixpath.relpath(self.sheet_part(sheet_index), posixpath.dirname(WORKBOOK_PART))}"/>'
+            for sheet_index in range(1, len(self.sheet_titles) + 1)
+        )
+
+        return workbook_rels_xml.replace('</Relationships>', sheet_rels_xml + '</Relationships>')
+
+    def __content_types_xml(self):
+        content_types_xml = self.template.read_part(CONTENT_TYPES_PART)
+        template_parts = ('/' + self.template.sheet_part, '/' + self.template.drawing_part)
+        content_types_xml = OVERRIDE_TAG_PATTERN.sub(
+            lambda tag_match: '' if parse_attrs(tag_match.group(0)).get('PartName') in template_parts else tag_match.group(0),
+            content_types_xml
+        )
+
+        overrides_xml = ''.join(
+            f'<Override PartName="/{self.sheet_part(sheet_index)}" ContentType="{WORKSHEET_CONTENT_TYPE}"/>'
+            f'<Override PartName="/{self.drawing_part(sheet_index)}" ContentType="{DRAWING_CONTENT_TYPE}"/>'
+            for sheet_index in range(1, len(self.sheet_titles) + 1)
+        )
+
+        return content_types_xml.replace('</Types>', overrides_xml + '</Types>')
+
+    def close(self):
+        '''
+            writes the workbook parts listing every added sheet and the zip directory
+        '''
+        if self.__zip_stream is None: return
+        if not self.sheet_titles:
+            raise ValueError('The workbook doesn\'t have any sheet')
+
+        self.__zip_stream.write(WORKBOOK_PART, self.__workbook_xml().encode('utf-8'))
+        self.__zip_stream.write(rels_part(WORKBOOK_PART), self.__workbook_rels_xml().encode('utf-8'))
+        self.__zip_stream.write(CONTENT_TYPES_PART, self.__content_types_xml().encode('utf-8'))
+        self.__zip_stream.write(APP_PROPS_PART, APP_PROPS_XML.encode('utf-8'))
+        self.__zip_stream.close()
+        self.__zip_stream = None
@@ -0,0 +1,126 @@
+from typing import BinaryIO, NamedTuple
+from time import localtime
+import struct
+import zlib
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+STORED = 0
+DEFLATED = 8
+
+class ZipEntry(NamedTuple):
+    name: str
+    data: bytes
+    crc: int
+    size: int
+    method: int
+    date_time: tuple[int, int, int, int, int, int]
+
+def dos_date_time(date_time: tuple[int, int, int, int, int, int]):
+    year, month, day, hour, minute, second = date_time
+    dos_date = (max(year, 1980) - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | (second // 2)
+
+    return dos_date, dos_time
+
+def compress_entry(
+    name: str,
+    data: bytes,
+    date_time: tuple[int, int, int, int, int, int] | None = None,
+    compresslevel: int = 6
+) -> ZipEntry:
+    '''
+        compresses `data` once so the entry can be written to any number of zip streams as is
+    '''
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+
+    return ZipEntry(
+        name=name,
+        data=compressed,
+        crc=zlib.crc32(data),
+        size=len(data),
+        method=DEFLATED,
+        date_time=tuple(localtime()[:6]) if date_time is None else date_time
+    )
+
+def stored_entry(name: str, data: bytes, date_time: tuple[int, int, int, int, int, int] | None = None) -> ZipEntry:
+    '''
+        entry written without compression, used for data that is already compressed like a whole xlsx package
+    '''
+    return ZipEntry(
+        name=name,
+        data=data,
+        crc=zlib.crc32(data),
+        size=len(data),
+        method=STORED,
+        date_time=tuple(localtime()[:6]) if date_time is None else date_time
+    )
+
+class ZipStreamWriter:
+    '''
+        Writes a zip archive sequentially to a binary stream, entries are written as soon as they're added
+        and the central directory is written on close
+    '''
+    def __init__(self, stream: BinaryIO, compresslevel: int = 6) -> None:
+        self.__stream = stream
+        self.__compresslevel = compresslevel
+        self.__offset = 0
+        self.__central_records: list[bytes] | None = []
+        self.__names: set[str] = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def size(self):
+        return self.__offset
+
+    def __len__(self):
+        return len(self.__names)
+
+    def write(self, name: str, data: bytes):
+        self.write_entry(compress_entry(name, data, compresslevel=self.__compresslevel))
+
+    def write_entry(self, entry: ZipEntry):
+        if self.__central_records is None:
+            raise ValueError('The zip stream is already closed')
+        if entry.name in self.__names:
+            raise ValueError(f'Duplicate zip entry: \'{entry.name}\'')
+        self.__names.add(entry.name)
+
+        encoded_name = entry.name.encode('utf-8')
+        dos_date, dos_time = dos_date_time(entry.date_time)
+        flags = 0x800
+
+        local_header = LOCAL_HEADER.pack(
+            0x04034b50, 20, flags, entry.method, dos_time, dos_date,
+            entry.crc, len(entry.data), entry.size, len(encoded_name), 0
+        )
+        self.__central_records.append(CENTRAL_HEADER.pack(
+            0x02014b50, 20, 20, flags, entry.method, dos_time, dos_date,
+            entry.crc, len(entry.data), entry.size, len(encoded_name), 0, 0, 0, 0, 0, self.__offset
+        ) + encoded_name)
+
+        self.__stream.write(local_header)
+        self.__stream.write(encoded_name)
+        self.__stream.write(entry.data)
+        self.__offset += len(local_header) + len(encoded_name) + len(entry.data)
+
+    def close(self):
+        if self.__central_records is None: return
+
+        central_offset = self.__offset
+        central_size = 0
+        for record in self.__central_records:
+            self.__stream.write(record)
+            central_size += len(record)
+
+        entry_count = len(self.__central_records)
+        self.__stream.write(END_RECORD.pack(0x06054b50, 0, 0, entry_count, entry_count, central_size, central_offset, 0))
+        self.__offset += central_size + END_RECORD.size
+        self.__central_records = None
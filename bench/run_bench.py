@@ -0,0 +1,198 @@
+'''
+    Times the phases of the generation pipeline on synthetic rows and saves the results as json.
+        parse: raw rows validated and parsed into EntityItem/WithholdingTaxItem columns, as the source retrieval does
+        aggregate: columns into the PayeeInfoDict
+        iterate: PayeeInfoDict into the form work units
+        render: the first `--max-forms` forms through the memory or xlsx renderer
+
+    python bench/run_bench.py --rows 1000 10000 100000 --output bench_results.json
+    python bench/run_bench.py --rows 1000 10000 100000 --baseline bench_results.json
+'''
+from pathlib import Path
+from typing import Any, Callable
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'app'))
+sys.path.insert(0, str(BENCH_DIR))
+
+from synthetic import synthetic_rows
+from aggregate import aggregate_columns
+import aggregate
+from retrieve import SourceRowRef, parse_src_rows
+from process import generate_work_units, process_payees, template_path
+from payor_info import payor_info_from_fields
+from template_layout import load_layout
+from memory_backend import MemoryBackend, MemoryBook, MemorySheet
+from xlsx_backend import XlsxBackend
+from session import ExcelSession
+from output_sink import DirectorySink
+
+RESULTS_VERSION = 1
+PAYOR_FIELDS = {
+    'PAYOR_TIN': '999-888-777-00000',
+    'PAYOR_ORG_NAME': 'Synthetic Payor Inc.',
+    'PAYOR_LAST_NAME': '',
+    'PAYOR_FIRST_NAME': '',
+    'PAYOR_MID_NAME': '',
+    'PAYOR_ADDRESS': 'Makati City',
+    'PAYOR_ZIP_CODE': 1200,
+    'SIGNOR_NAME': 'Juan Dela Cruz',
+    'SIGNOR_POSITION': 'President',
+    'SIGNOR_TIN': ''
+}
+
+def measure(phase: Callable[[], Any], trace_memory: bool) -> tuple[Any, dict[str, Any]]:
+    '''
+        returns (phase result, {seconds, peak_bytes}), peak_bytes is None when the memory isn't traced
+    '''
+    if trace_memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    result = phase()
+    seconds = time.perf_counter() - started
+
+    peak_bytes = None
+    if trace_memory:
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result, {'seconds': round(seconds, 6), 'peak_bytes': peak_bytes}
+
+def memory_render_backend():
+    '''
+        memory backend holding a stand-in of the 2307 template built from its compiled layout
+    '''
+    source_path = template_path()
+    layout = load_layout(source_path)
+    template_sheet = MemorySheet(layout.sheet_name, names=dict(layout.cells), shape_texts={shape: '' for shape in layout.shapes})
+
+    return MemoryBackend({source_path: MemoryBook([template_sheet])})
+
+def bench_rows(row_count: int, renderer: str, max_forms: int, trace_memory: bool, seed: int) -> dict[str, Any]:
+    src_rows = [
+        (SourceRowRef.row(SourceRowRef.first_row + row_offset), raw_item)
+        for row_offset, raw_item in enumerate(synthetic_rows(row_count, seed))
+    ]
+    phases: dict[str, Any] = {}
+
+    wtax_columns, phases['parse'] = measure(lambda: parse_src_rows(src_rows), trace_memory)
+    phases['parse']['items'] = row_count
+
+    payee_dict, phases['aggregate'] = measure(lambda: aggregate_columns(wtax_columns), trace_memory)
+    phases['aggregate']['items'] = len(payee_dict)
+
+    payor_item = payor_info_from_fields(PAYOR_FIELDS)
+    with tempfile.TemporaryDirectory() as drop_path:
+        work_units, phases['iterate'] = measure(lambda: list(generate_work_units(drop_path, payee_dict, payor_item)), trace_memory)
+        phases['iterate']['items'] = len(work_units)
+
+        render_backend = memory_render_backend() if renderer == 'memory' else XlsxBackend()
+        with ExcelSession(render_backend) as session:
+            _, phases['render'] = measure(
+                lambda: process_payees({'session': session, 'work_units': work_units[:max_forms], 'journal': None, 'sink': DirectorySink()}),
+                trace_memory
+            )
+        phases['render']['items'] = min(max_forms, len(work_units))
+
+    for phase in phases.values():
+        phase['per_item_us'] = round(phase['seconds'] / phase['items'] * 1e6, 3) if phase['items'] else None
+
+    return {'rows': row_count, 'phases': phases}
+
+COMPARED_SETTINGS = ('renderer', 'trace_memory', 'numpy')
+
+def mismatched_settings(settings: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    '''
+        returns the settings of the run that differ from the baseline, their timings aren't comparable
+    '''
+    return [
+        f'{setting}={baseline.get(setting)} (current {settings[setting]})'
+        for setting in COMPARED_SETTINGS if baseline.get(setting) != settings[setting]
+    ]
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    '''
+        returns the phases slower than the baseline by more than `tolerance`, compared per item.
+        The baseline should be measured with the same settings, see `mismatched_settings`
+    '''
+    regressions: list[str] = []
+    baseline_runs = {run['rows']: run for run in baseline.get('runs', [])}
+
+    print(f'{"rows":>9} {"phase":<10} {"baseline us":>12} {"current us":>12} {"ratio":>7}')
+    for run in results['runs']:
+        baseline_run = baseline_runs.get(run['rows'])
+        if baseline_run is None: continue
+
+        for phase_name, phase in run['phases'].items():
+            baseline_phase = baseline_run['phases'].get(phase_name)
+            if not baseline_phase or not baseline_phase.get('per_item_us') or phase['per_item_us'] is None: continue
+
+            ratio = phase['per_item_us'] / baseline_phase['per_item_us']
+            flag = ' *' if ratio > 1 + tolerance else ''
+            print(f'{run["rows"]:>9} {phase_name:<10} {baseline_phase["per_item_us"]:>12.3f} {phase["per_item_us"]:>12.3f} {ratio:>7.2f}{flag}')
+
+            if flag: regressions.append(f'{run["rows"]} rows - {phase_name}: {ratio:.2f}x')
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='row counts, e.g. 1000 10000 100000 1000000')
+    parser.add_argument('--renderer', choices=['memory', 'xlsx'], default='memory')
+    parser.add_argument('--max-forms', type=int, default=500, help='number of forms rendered per row count')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory tracing, it slows every phase')
+    parser.add_argument('--seed', type=int, default=2307)
+    parser.add_argument('--output', help='json file of the results')
+    parser.add_argument('--baseline', help='json results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown per item before a phase is reported')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results: dict[str, Any] = {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': aggregate.numpy is not None,
+        'renderer': args.renderer,
+        'trace_memory': not args.no_memory,
+        'runs': []
+    }
+
+    if baseline is not None:
+        mismatches = mismatched_settings(results, baseline)
+        if mismatches:
+            parser.error('the baseline was measured with other settings, its timings aren\'t comparable: ' + ', '.join(mismatches))
+
+    for row_count in args.rows:
+        run = bench_rows(row_count, args.renderer, args.max_forms, not args.no_memory, args.seed)
+        results['runs'].append(run)
+
+        for phase_name, phase in run['phases'].items():
+            peak = '' if phase['peak_bytes'] is None else f'{phase["peak_bytes"] / 2 ** 20:10.1f} MiB'
+            print(f'{row_count:>9} {phase_name:<10} {phase["items"]:>9} items {phase["seconds"]:10.3f} s {peak}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+
+        if regressions:
+            print('Slower than the baseline: ' + ', '.join(regressions))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
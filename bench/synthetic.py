@@ -0,0 +1,103 @@
+'''
+    Synthetic source rows shaped like the A-O columns of `format/source_template.xlsx`.
+    A few payees carry most of the rows the way a real month-end source does, payees are mostly
+    organizations, the atc codes follow a weighted mix of common expanded withholding tax codes
+    and the dates are spread over the three months of one quarter.
+
+    python bench/synthetic.py 10000 synthetic_10k.csv
+'''
+from datetime import datetime
+from typing import Any, Iterator
+import csv
+import itertools
+import random
+import sys
+
+ATC_CODES = (
+    ('WC158', 'Income payment made by top withholding agents to their local/resident supplier of goods', 0.01, 30),
+    ('WC160', 'Income payment made by top withholding agents to their local/resident supplier of services', 0.02, 25),
+    ('WI158', 'Income payment made by top withholding agents to their local/resident supplier of goods', 0.01, 12),
+    ('WI160', 'Income payment made by top withholding agents to their local/resident supplier of services', 0.02, 10),
+    ('WC100', 'Gross rental of real property', 0.05, 6),
+    ('WI100', 'Gross rental of real property', 0.05, 5),
+    ('WI010', 'Professional fees - individual, gross income of 3M and below', 0.05, 4),
+    ('WI011', 'Professional fees - individual, gross income above 3M', 0.10, 3),
+    ('WC010', 'Professional fees - juridical, gross income of 720K and below', 0.10, 2),
+    ('WI120', 'Income payments to certain contractors', 0.02, 2),
+    ('WC120', 'Income payments to certain contractors', 0.02, 1)
+)
+NAME_SYLLABLES = ('ma', 'ri', 'san', 'to', 'de', 'la', 'cruz', 're', 'yes', 'gar', 'ci', 'a', 'lo', 'pez', 'ba', 'u', 'tis', 'ta')
+ORG_SUFFIXES = ('Trading', 'Corporation', 'Enterprises', 'Inc.', 'Construction Corp.', 'Marketing', 'Services Co.')
+CITIES = (('Makati City', 1200), ('Pasig City', 1600), ('Quezon City', 1100), ('Cebu City', 6000), ('Davao City', 8000), ('Taguig City', 1630))
+COLUMN_HEADERS = (
+    'TIN', 'ORG', 'LAST', 'FIRST', 'MID', 'ADDRESS', 'ZIP', 'MONTH', 'ATC CODE', 'ATC DESC',
+    'BASE', 'TAX', 'SIGNOR_NAME', 'SIGNOR_POSITION', 'SIGNOR_TIN'
+)
+
+def random_name(rnd: random.Random, min_syllables: int = 2, max_syllables: int = 3):
+    return ''.join(rnd.choice(NAME_SYLLABLES) for _ in range(rnd.randint(min_syllables, max_syllables))).title()
+
+def random_tin(rnd: random.Random, branch: bool = True):
+    digits = f'{rnd.randrange(10 ** 9):09d}'
+    tin = f'{digits[0:3]}-{digits[3:6]}-{digits[6:9]}'
+
+    return f'{tin}-{rnd.choice(("00000", "00000", "00000", "00001", "00002"))}' if branch else tin
+
+def payee_pool(payee_count: int, rnd: random.Random) -> list[list[Any]]:
+    '''
+        returns the A-G and M-O columns of the payees, 70% organizations and 30% individuals
+    '''
+    payees: list[list[Any]] = []
+    for _ in range(payee_count):
+        city, zip_code = rnd.choice(CITIES)
+        address = f'{rnd.randint(1, 999)} {random_name(rnd)} St., {city}'
+        signor = [random_name(rnd) + ' ' + random_name(rnd), rnd.choice(('President', 'Owner', 'Treasurer', '')), '']
+
+        if rnd.random() < 0.7:
+            payees.append([random_tin(rnd), f'{random_name(rnd)} {rnd.choice(ORG_SUFFIXES)}', '', '', '', address, zip_code, *signor])
+        else:
+            payees.append([random_tin(rnd), '', random_name(rnd), random_name(rnd), random_name(rnd, 1, 2), address, zip_code, *signor])
+
+    return payees
+
+def synthetic_rows(row_count: int, seed: int = 2307, year: int = 2023, quarter: int = 1) -> Iterator[list[Any]]:
+    '''
+        yields the raw A-O rows, about one payee for every 20 rows with a long tail of payees having a single row
+    '''
+    rnd = random.Random(seed)
+    payees = payee_pool(max(1, row_count // 20), rnd)
+    payee_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(payees))))
+    atc_weights = list(itertools.accumulate(weight for *_, weight in ATC_CODES))
+    first_month = quarter * 3 - 2
+
+    for _ in range(row_count):
+        tin, org_name, last_name, first_name, mid_name, address, zip_code, signor_name, signor_position, signor_tin = rnd.choices(payees, cum_weights=payee_weights)[0]
+        atc_code, atc_description, rate, _ = rnd.choices(ATC_CODES, cum_weights=atc_weights)[0]
+        base = round(rnd.lognormvariate(9, 1.2), 2) + 1
+        date = datetime(year, first_month + rnd.randrange(3), rnd.randint(1, 28))
+
+        yield [
+            tin, org_name, last_name, first_name, mid_name, address, zip_code, date,
+            atc_code, atc_description, base, round(base * rate, 2),
+            signor_name, signor_position, signor_tin
+        ]
+
+def write_csv(csv_path: str, row_count: int, seed: int = 2307, drop_path: str = ''):
+    '''
+        writes the rows as a source csv readable by the alphalist reader of the app
+    '''
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(('DROP_PATH', drop_path or f'{csv_path}.forms'))
+        csv_writer.writerow(('PAYOR_TIN', '999-888-777-00000'))
+        csv_writer.writerow(('PAYOR_ORG_NAME', 'Synthetic Payor Inc.'))
+        csv_writer.writerow(('PAYOR_ADDRESS', 'Makati City'))
+        csv_writer.writerow(('PAYOR_ZIP_CODE', '1200'))
+        csv_writer.writerow(COLUMN_HEADERS)
+
+        for row in synthetic_rows(row_count, seed):
+            row[7] = row[7].strftime('%Y-%m-%d')
+            csv_writer.writerow(row)
+
+if __name__ == '__main__':
+    write_csv(sys.argv[2], int(sys.argv[1]))
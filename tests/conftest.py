@@ -0,0 +1,34 @@
+from memory_backend import MemoryBackend, MemoryBook, MemorySheet
+from payor_info import payor_info_from_fields
+from process import template_path
+from template_layout import load_layout
+import pytest
+
+PAYOR_FIELDS = {
+    'PAYOR_TIN': '999-888-777-00000',
+    'PAYOR_ORG_NAME': 'Synthetic Payor Inc.',
+    'PAYOR_LAST_NAME': '',
+    'PAYOR_FIRST_NAME': '',
+    'PAYOR_MID_NAME': '',
+    'PAYOR_ADDRESS': 'Makati City',
+    'PAYOR_ZIP_CODE': 1200,
+    'SIGNOR_NAME': 'Juan Dela Cruz',
+    'SIGNOR_POSITION': 'President',
+    'SIGNOR_TIN': ''
+}
+
+@pytest.fixture
+def payor_item():
+    return payor_info_from_fields(PAYOR_FIELDS)
+
+@pytest.fixture
+def memory_backend():
+    '''
+        memory backend holding a stand-in of the 2307 template built from its compiled layout,
+        registered at the real template path
+    '''
+    source_path = template_path()
+    layout = load_layout(source_path)
+    template_sheet = MemorySheet(layout.sheet_name, names=dict(layout.cells), shape_texts={shape: '' for shape in layout.shapes})
+
+    return MemoryBackend({source_path: MemoryBook([template_sheet])})
@@ -0,0 +1,60 @@
+from synthetic import synthetic_rows
+from aggregate import WtaxColumns, aggregate_columns, group_rows, group_rows_numpy
+from retrieve import EntityItemCache, parse_raw_item
+from process import generate_file_name, plan_payee
+from wtax_item import EntityItem
+from typing import Any
+import pytest
+
+pytest.importorskip('numpy')
+
+ROW_COUNT = 3000
+
+def source_rows() -> list[list[Any]]:
+    '''
+        rows of the same payees at the last quarter of 2022 and the first quarter of 2023, the years are interleaved
+    '''
+    current_rows = list(synthetic_rows(ROW_COUNT // 2, seed=2307, year=2023, quarter=1))
+    previous_rows = list(synthetic_rows(ROW_COUNT // 2, seed=2307, year=2022, quarter=4))
+
+    return [raw_item for row_pair in zip(current_rows, previous_rows) for raw_item in row_pair]
+
+def wtax_columns_of(raw_rows: list[list[Any]]):
+    '''
+        columns parsed on their own rows since the payee info grows its first item in place
+    '''
+    entity_cache = EntityItemCache()
+    wtax_columns = WtaxColumns()
+    for raw_item in raw_rows:
+        wtax_columns.append(*parse_raw_item(raw_item, entity_cache))
+
+    return wtax_columns
+
+def aggregated_forms(raw_rows: list[list[Any]], payor_item: EntityItem, period: str, use_numpy: bool) -> dict[str, list[Any]]:
+    '''
+        {file name: every write of the form}
+    '''
+    return {
+        generate_file_name(payee_info, payee_count): list(plan_payee({'payee_info': payee_info, 'payor_item': payor_item}))
+        for payee_count, payee_info in aggregate_columns(wtax_columns_of(raw_rows), use_numpy=use_numpy, period=period)
+    }
+
+def test_both_group_by_give_the_same_groups():
+    wtax_columns = wtax_columns_of(source_rows())
+
+    python_groups = group_rows(wtax_columns)
+    numpy_groups = group_rows_numpy(wtax_columns)
+
+    assert {wtax_columns.year[group.first_row] for group in python_groups} == {2022, 2023}
+    assert [(group.first_row, group.base, group.tax) for group in numpy_groups] == [
+        (group.first_row, group.base, group.tax) for group in python_groups
+    ]
+
+@pytest.mark.parametrize('period', ['month', 'quarter'])
+def test_both_group_by_give_the_same_forms(payor_item, period):
+    raw_rows = source_rows()
+
+    python_forms = aggregated_forms(raw_rows, payor_item, period, use_numpy=False)
+
+    assert any('2022' in file_name for file_name in python_forms) and any('2023' in file_name for file_name in python_forms)
+    assert aggregated_forms(raw_rows, payor_item, period, use_numpy=True) == python_forms
@@ -0,0 +1,57 @@
+from alphalist import AlphalistSource, PAYOR_FIELDS
+from checkpoint import ErrorReport
+from retrieve import retrieve_payees_infos
+from datetime import datetime
+from pathlib import Path
+
+FIXTURES_PATH = Path(__file__).parent / 'fixtures'
+GOODS_DESCRIPTION = 'Income payment made by top withholding agents to their local/resident supplier of goods'
+
+def test_dat_payor_header_and_sidecar():
+    source = AlphalistSource(str(FIXTURES_PATH / 'alphalist.dat'))
+
+    assert source.payor_fields == {
+        **{field: None for field in PAYOR_FIELDS},
+        'DROP_PATH': 'forms',
+        'PAYOR_TIN': '999-888-777-00000',
+        'PAYOR_ORG_NAME': 'Synthetic Payor Incorporated',
+        'PAYOR_ADDRESS': 'Makati City',
+        'PAYOR_ZIP_CODE': '1200',
+        'SIGNOR_NAME': 'Maria Santos'
+    }
+
+def test_dat_detail_rows():
+    rows = list(AlphalistSource(str(FIXTURES_PATH / 'alphalist.dat')).rows())
+
+    assert [row_ref for row_ref, _ in rows] == ['alphalist.dat:2', 'alphalist.dat:4', 'alphalist.dat:5']
+    assert rows[0][1] == [
+        '123-456-789-00000', 'PAYEE ONE INC.', '', '', '', '', '', datetime(2023, 2, 1),
+        'WC158', GOODS_DESCRIPTION, '12500.00', '125.00', '', '', ''
+    ]
+    assert rows[1][1][:10] == ['987-654-321-00003', '', 'DELA CRUZ', 'JUAN', 'SANTOS', '', '', datetime(2023, 3, 1), 'WI010', 'WI010']
+
+def test_csv_payor_lines_and_rows():
+    source = AlphalistSource(str(FIXTURES_PATH / 'source.csv'))
+    rows = list(source.rows())
+
+    assert source.payor_fields == {
+        **{field: None for field in PAYOR_FIELDS},
+        'DROP_PATH': 'forms', 'PAYOR_TIN': '999-888-777-00000', 'PAYOR_ORG_NAME': 'Synthetic Payor Inc.'
+    }
+    assert [row_ref for row_ref, _ in rows] == ['source.csv:5', 'source.csv:6', 'source.csv:7']
+    assert rows[0][1] == [
+        '123-456-789-00000', 'Payee One Inc.', '', '', '', 'Makati City', '1200', datetime(2023, 2, 15),
+        'WC158', 'Goods', '1000.50', '10.01', '', '', ''
+    ]
+    assert rows[1][1][7] == datetime(2023, 3, 1)
+
+def test_errors_refer_to_the_source_lines():
+    dat_report = ErrorReport()
+    dat_payees = retrieve_payees_infos(AlphalistSource(str(FIXTURES_PATH / 'alphalist.dat')).rows(), dat_report)
+    csv_report = ErrorReport()
+    retrieve_payees_infos(AlphalistSource(str(FIXTURES_PATH / 'source.csv')).rows(), csv_report)
+
+    assert [(payee_info.info.tin, payee_info.month) for _, payee_info in dat_payees] == [('123-456-789-00000', '2'), ('987-654-321-00003', '3')]
+    assert [(error.reference, error.message) for error in dat_report] == [('alphalist.dat:5', 'Invalid Tin: 12345678')]
+    assert [error.reference for error in csv_report] == ['source.csv:7']
+    assert csv_report.errors[0].detail.startswith('K: ')
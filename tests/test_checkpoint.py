@@ -0,0 +1,75 @@
+from session import ExcelSession
+from xlsx_backend import XlsxBackend, XlsxBook
+from checkpoint import ErrorReport, FormJournal, ERROR_REPORT_NAME
+from process import generate_forms
+from wtax_info import PayeeInfoDict
+from wtax_item import EntityItem, WithholdingTaxItem
+from datetime import datetime
+from pathlib import Path
+import csv
+import pytest
+
+PAYEE_TINS = [f'123-456-789-0000{branch}' for branch in range(4)]
+
+def payee_dict_of(tins: list[str]):
+    payee_dict = PayeeInfoDict()
+    for tin in tins:
+        payee_item = EntityItem(tin, f'Payee {tin[-1]} Inc.', '', '', '', 'Makati City', '1200')
+        payee_dict.process_item(payee_item, WithholdingTaxItem('WC158', 'Goods', datetime(2023, 2, 1), 1000, 10))
+
+    return payee_dict
+
+def form_names(results):
+    return sorted(Path(result['file_path']).name for result in results)
+
+def test_resume_renders_only_the_missing_forms(payor_item, tmp_path: Path, monkeypatch):
+    book_save = XlsxBook.save
+    saved_paths: list[str] = []
+
+    def interrupted_save(book: XlsxBook, path: str):
+        if len(saved_paths) == 2: raise KeyboardInterrupt
+        book_save(book, path)
+        saved_paths.append(path)
+
+    monkeypatch.setattr(XlsxBook, 'save', interrupted_save)
+    with pytest.raises(KeyboardInterrupt):
+        with ExcelSession(XlsxBackend()) as session:
+            generate_forms(session, str(tmp_path), payee_dict_of(PAYEE_TINS), payor_item)
+    monkeypatch.undo()
+
+    journaled_names = FormJournal(str(tmp_path)).completed()
+    assert journaled_names == {Path(saved_path).name for saved_path in saved_paths}
+
+    error_report = ErrorReport()
+    error_report.add_row('source.xlsx!A18:O18', PAYEE_TINS[3], ValueError('The income payment isn\'t a number'))
+    with ExcelSession(XlsxBackend()) as session:
+        results = generate_forms(session, str(tmp_path), payee_dict_of(PAYEE_TINS), payor_item, resume=True, error_report=error_report)
+
+    saved_names = {form_path.name for form_path in tmp_path.glob('*.xlsx')}
+    assert [result['is_success'] for result in results] == [True]
+    assert form_names(results) == sorted(saved_names - journaled_names)
+    assert PAYEE_TINS[2] in form_names(results)[0]
+    assert len(saved_names) == 3
+    assert FormJournal(str(tmp_path)).completed() == saved_names
+
+    report_path = error_report.save(str(tmp_path))
+    assert report_path == str(tmp_path / ERROR_REPORT_NAME)
+    with open(report_path, newline='', encoding='utf-8') as report_file:
+        report_rows = list(csv.DictReader(report_file))
+
+    assert [(row['phase'], row['message']) for row in report_rows] == [
+        ('retrieve', 'ValueError: The income payment isn\'t a number'),
+        ('process', 'Skipped: the payee has invalid source rows')
+    ]
+    assert PAYEE_TINS[3] in report_rows[1]['reference']
+
+def test_resume_renders_a_journaled_form_that_is_gone(payor_item, tmp_path: Path):
+    with ExcelSession(XlsxBackend()) as session:
+        first_results = generate_forms(session, str(tmp_path), payee_dict_of(PAYEE_TINS), payor_item)
+
+    Path(first_results[1]['file_path']).unlink()
+
+    with ExcelSession(XlsxBackend()) as session:
+        results = generate_forms(session, str(tmp_path), payee_dict_of(PAYEE_TINS), payor_item, resume=True)
+
+    assert [result['file_path'] for result in results] == [first_results[1]['file_path']]
@@ -0,0 +1,73 @@
+from session import ExcelSession
+from xlsx_backend import XlsxBackend
+from manifest import OutputManifest
+from process import generate_forms
+from wtax_info import PayeeInfoDict
+from wtax_item import EntityItem, WithholdingTaxItem
+from datetime import datetime
+from pathlib import Path
+import process
+
+PAYEE_BASES = {'123-456-789-00000': 1000.0, '123-456-789-00001': 2000.0, '123-456-789-00002': 3000.0}
+
+def payee_dict_of(payee_bases: dict[str, float]):
+    '''
+        a fresh payee dict on every run since the payee info grows its first item in place
+    '''
+    payee_dict = PayeeInfoDict()
+    for tin, base in payee_bases.items():
+        payee_item = EntityItem(tin, f'Payee {tin[-1]} Inc.', '', '', '', 'Makati City', '1200')
+        payee_dict.process_item(payee_item, WithholdingTaxItem('WC158', 'Goods', datetime(2023, 2, 1), base, base / 100))
+
+    return payee_dict
+
+def incremental_run(drop_path: Path, payee_bases: dict[str, float], payor_item: EntityItem, session: ExcelSession | None = None):
+    '''
+        returns the names of the rendered forms
+    '''
+    with session or ExcelSession(XlsxBackend()) as run_session:
+        results = generate_forms(run_session, str(drop_path), payee_dict_of(payee_bases), payor_item, incremental=True)
+
+    assert all(result['is_success'] for result in results)
+
+    return sorted(Path(result['file_path']).name for result in results)
+
+def saved_names(drop_path: Path):
+    return sorted(form_path.name for form_path in drop_path.glob('*.xlsx'))
+
+def test_unchanged_rerun_renders_nothing(payor_item, tmp_path: Path):
+    first_names = incremental_run(tmp_path, PAYEE_BASES, payor_item)
+
+    assert len(first_names) == 3
+    assert incremental_run(tmp_path, PAYEE_BASES, payor_item) == []
+    assert sorted(OutputManifest.load(str(tmp_path)).forms) == saved_names(tmp_path) == first_names
+
+def test_changed_payee_row_renders_its_form_only(payor_item, tmp_path: Path):
+    first_names = incremental_run(tmp_path, PAYEE_BASES, payor_item)
+
+    changed_names = incremental_run(tmp_path, {**PAYEE_BASES, '123-456-789-00001': 2500.0}, payor_item)
+
+    assert changed_names == [name for name in first_names if '123-456-789-00001' in name]
+
+def test_template_hash_change_renders_every_form(payor_item, tmp_path: Path, monkeypatch):
+    first_names = incremental_run(tmp_path, PAYEE_BASES, payor_item)
+
+    monkeypatch.setattr(process, 'template_hash', lambda template_path: 'changed template')
+
+    assert incremental_run(tmp_path, PAYEE_BASES, payor_item) == first_names
+
+def test_renderer_change_renders_every_form(payor_item, memory_backend, tmp_path: Path):
+    first_names = incremental_run(tmp_path, PAYEE_BASES, payor_item)
+
+    memory_session = ExcelSession(XlsxBackend(), render_backend=memory_backend)
+
+    assert incremental_run(tmp_path, PAYEE_BASES, payor_item, memory_session) == first_names
+    assert len(memory_backend.saved) == 3
+
+def test_stale_forms_are_removed(payor_item, tmp_path: Path):
+    first_names = incremental_run(tmp_path, PAYEE_BASES, payor_item)
+    payee_bases = {tin: base for tin, base in PAYEE_BASES.items() if tin != '123-456-789-00002'}
+
+    assert incremental_run(tmp_path, payee_bases, payor_item) == []
+    assert saved_names(tmp_path) == [name for name in first_names if '123-456-789-00002' not in name]
+    assert sorted(OutputManifest.load(str(tmp_path)).forms) == saved_names(tmp_path)
@@ -0,0 +1,83 @@
+from session import ExcelSession
+from xlsx_backend import XlsxBackend
+from output_sink import DirectorySink, OutputSink, ZipSink
+from process import generate_work_units, process_payees
+from wtax_info import PayeeInfoDict
+from wtax_item import EntityItem, WithholdingTaxItem
+from datetime import datetime
+from pathlib import Path
+import io
+import zipfile
+
+FORM_COUNT = 6
+
+def payee_dict():
+    payee_dict = PayeeInfoDict()
+    for tin_branch in range(FORM_COUNT):
+        payee_item = EntityItem(f'123-456-789-0000{tin_branch}', f'Payee {tin_branch} Inc.', '', '', '', 'Makati City', '1200')
+        payee_dict.process_item(payee_item, WithholdingTaxItem('WC158', 'Goods', datetime(2023, 2, 1), 1000 + tin_branch, 10))
+
+    return payee_dict
+
+def render_forms(payor_item: EntityItem, drop_path: Path, sink: OutputSink):
+    with ExcelSession(XlsxBackend()) as session, sink:
+        results = process_payees({
+            'session': session,
+            'sink': sink,
+            'work_units': generate_work_units(str(drop_path), payee_dict(), payor_item),
+            'journal': None
+        })
+
+    assert [result['is_success'] for result in results] == [True] * FORM_COUNT
+
+    return results
+
+def form_parts(form_data: bytes):
+    '''
+        {part name: part} of a saved form, the parts are compared instead of the bytes
+        since the rendered parts carry the time they were written
+    '''
+    with zipfile.ZipFile(io.BytesIO(form_data)) as form_package:
+        assert form_package.testzip() is None
+        return {name: form_package.read(name) for name in form_package.namelist()}
+
+def directory_forms(drop_path: Path):
+    return {form_path.name: form_parts(form_path.read_bytes()) for form_path in drop_path.glob('*.xlsx')}
+
+def archive_entries(archive_paths: list[str]):
+    entries: dict[str, dict[str, bytes]] = {}
+    for archive_path in archive_paths:
+        with zipfile.ZipFile(archive_path) as archive:
+            assert archive.testzip() is None
+            entries.update((name, form_parts(archive.read(name))) for name in archive.namelist())
+
+    return entries
+
+def test_zip_entries_match_the_directory_forms(payor_item, tmp_path: Path):
+    directory_path = tmp_path / 'directory'
+    zip_path = tmp_path / 'zip'
+    directory_path.mkdir()
+    zip_path.mkdir()
+
+    render_forms(payor_item, directory_path, DirectorySink())
+    zip_sink = ZipSink(str(zip_path))
+    results = render_forms(payor_item, zip_path, zip_sink)
+
+    saved_forms = directory_forms(directory_path)
+    assert len(zip_sink.archive_paths) == 1
+    assert archive_entries(zip_sink.archive_paths) == saved_forms
+    assert {result['file_path'] for result in results} == {f'{zip_sink.archive_paths[0]}#{file_name}' for file_name in saved_forms}
+
+def test_archive_rolls_over_at_max_bytes(payor_item, tmp_path: Path):
+    render_forms(payor_item, tmp_path, DirectorySink())
+    saved_forms = directory_forms(tmp_path)
+    zip_path = tmp_path / 'zip'
+    zip_path.mkdir()
+
+    form_size = max(form_path.stat().st_size for form_path in tmp_path.glob('*.xlsx'))
+    zip_sink = ZipSink(str(zip_path), max_bytes=form_size * 2 + 1024)
+    render_forms(payor_item, zip_path, zip_sink)
+
+    assert len(zip_sink.archive_paths) > 1
+    assert all(Path(archive_path).stat().st_size <= zip_sink.max_bytes for archive_path in zip_sink.archive_paths)
+    assert archive_entries(zip_sink.archive_paths) == saved_forms
@@ -0,0 +1,83 @@
+from payee_master import PayeeMaster
+from checkpoint import ErrorReport
+from retrieve import retrieve_payees_infos
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+KNOWN_TIN = '123-456-789-00000'
+
+def raw_row(tin: str, org_name: str = '', address: str = '', zip_code: Any = '', signor_name: str = '') -> list[Any]:
+    return [
+        tin, org_name, '', '', '', address, zip_code, datetime(2023, 2, 1), 'WC158', 'Goods', 1000.0, 10.0,
+        signor_name, 'President' if signor_name else '', ''
+    ]
+
+def known_row(**fields: Any):
+    return raw_row(KNOWN_TIN, **{'org_name': 'Payee Inc.', 'address': 'Makati City', 'zip_code': 1200, 'signor_name': 'Juan Dela Cruz', **fields})
+
+def src_rows(raw_rows: list[list[Any]]):
+    return [(f'A{row}:O{row}', raw_item) for row, raw_item in enumerate(raw_rows, 15)]
+
+def retrieve(db_path: Path, raw_rows: list[list[Any]]):
+    error_report = ErrorReport()
+    with PayeeMaster(str(db_path)) as payee_master:
+        payee_info_dict = retrieve_payees_infos(src_rows(raw_rows), error_report, payee_master)
+
+    return payee_info_dict, payee_master, error_report
+
+def test_blank_payee_details_are_filled_from_a_known_tin(tmp_path: Path):
+    db_path = tmp_path / 'payees.db'
+    retrieve(db_path, [known_row()])
+
+    payee_info_dict, payee_master, error_report = retrieve(db_path, [raw_row(KNOWN_TIN)])
+
+    assert len(error_report) == 0
+    assert payee_master.filled_rows == 1
+    assert payee_master.hits == 1
+    payee_info = next(payee_info for _, payee_info in payee_info_dict)
+    assert payee_info.info.prod_entity_name == 'PAYEE INC.'
+    assert payee_info.info.address == 'Makati City'
+    assert payee_info.info.signor_info.startswith('JUAN DELA CRUZ')
+
+def test_partly_filled_rows_are_left_alone(tmp_path: Path):
+    db_path = tmp_path / 'payees.db'
+    retrieve(db_path, [known_row()])
+
+    partial_row = raw_row(KNOWN_TIN, org_name='Other Payee Inc.')
+    with PayeeMaster(str(db_path), read_only=True) as payee_master:
+        filled_rows = list(payee_master.fill_rows(src_rows([partial_row])))
+
+    assert filled_rows == [('A15:O15', partial_row)]
+    assert payee_master.filled_rows == 0
+
+def test_unknown_tin_still_fails_the_validation(tmp_path: Path):
+    db_path = tmp_path / 'payees.db'
+    retrieve(db_path, [known_row()])
+
+    payee_info_dict, payee_master, error_report = retrieve(db_path, [raw_row('987-654-321-00000')])
+
+    assert payee_master.filled_rows == 0
+    assert error_report.count('retrieve') == 1
+    assert error_report.failed_tins == {'987-654-321-00000'}
+    assert not list(payee_info_dict)
+
+def test_upserts_are_saved_on_close(tmp_path: Path):
+    db_path = tmp_path / 'payees.db'
+
+    with PayeeMaster(str(db_path)) as payee_master:
+        retrieve_payees_infos(src_rows([known_row()]), payee_master=payee_master)
+
+        assert payee_master.updates == 1
+        assert len(PayeeMaster(str(db_path), read_only=True)) == 0
+
+    assert len(PayeeMaster(str(db_path), read_only=True)) == 1
+
+    _, payee_master, _ = retrieve(db_path, [known_row(address='Pasig City', zip_code=1600), raw_row('987-654-321-00000', 'New Payee Inc.', 'Cebu City', 6000)])
+
+    assert payee_master.updates == 2
+    with PayeeMaster(str(db_path), read_only=True) as saved_master:
+        assert len(saved_master) == 2
+        filled_row = next(saved_master.fill_rows(src_rows([raw_row(KNOWN_TIN)])))[1]
+
+    assert filled_row[1:7] == ['PAYEE INC.', '', '', '', 'Pasig City', '1600']
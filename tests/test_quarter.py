@@ -0,0 +1,53 @@
+from session import ExcelSession
+from retrieve import retrieve_payees_infos
+from process import generate_forms
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+PAYEE_TIN = '123-456-789-00000'
+
+def raw_row(tin: str, date: datetime, atc_code: str, base: float) -> list[Any]:
+    return [
+        tin, f'Payee {tin[-1]} Inc.', '', '', '', 'Makati City', 1200, date, atc_code, f'{atc_code} payments',
+        base, round(base / 100, 2), '', '', ''
+    ]
+
+def saved_forms(raw_rows: list[list[Any]], memory_backend, payor_item, drop_path: Path):
+    '''
+        {file name: saved form sheet} of the quarter forms of the rows
+    '''
+    src_rows = [(f'A{row}:O{row}', raw_item) for row, raw_item in enumerate(raw_rows, 15)]
+    payee_info_dict = retrieve_payees_infos(src_rows, period='quarter')
+
+    with ExcelSession(memory_backend) as session:
+        results = generate_forms(session, str(drop_path), payee_info_dict, payor_item)
+
+    assert all(result['is_success'] for result in results)
+
+    return {Path(result['file_path']).name: memory_backend.saved[result['file_path']].sheets[0] for result in results}
+
+def test_quarter_form_places_each_month_at_its_column(memory_backend, payor_item, tmp_path: Path):
+    forms = saved_forms([
+        raw_row(PAYEE_TIN, datetime(2023, 1, 10), 'WC158', 1000),
+        raw_row(PAYEE_TIN, datetime(2023, 2, 3), 'WC158', 500),
+        raw_row(PAYEE_TIN, datetime(2023, 3, 31), 'WC160', 2000),
+        raw_row(PAYEE_TIN, datetime(2023, 2, 20), 'WC158', 250),
+        raw_row(PAYEE_TIN, datetime(2023, 4, 1), 'WC158', 300)
+    ], memory_backend, payor_item, tmp_path)
+
+    assert sorted(forms) == [f'2023_Q1_{PAYEE_TIN}-PAYEE0INC_1.xlsx', f'2023_Q2_{PAYEE_TIN}-PAYEE0INC_1.xlsx']
+
+    sheet = forms[f'2023_Q1_{PAYEE_TIN}-PAYEE0INC_1.xlsx']
+    assert [sheet[ref].value for ref in ('L38', 'O38', 'T38', 'Y38', 'AD38', 'AI38')] == ['WC158', '1000.00', '750.00', None, '1750.00', '17.50']
+    assert [sheet[ref].value for ref in ('L39', 'O39', 'T39', 'Y39', 'AD39', 'AI39')] == ['WC160', None, None, '2000.00', '2000.00', '20.00']
+    assert sheet['L40'].value is None
+    assert [sheet[ref].value for ref in ('Total_1M', 'Total_2M', 'Total_3M', 'Total_Base', 'Total_Tax')] == ['1000.00', '750.00', '2000.00', '3750.00', '37.50']
+
+    assert sheet.shape_texts['Return_Period_From_mmdd'] == ' 0  1   0   1'
+    assert sheet.shape_texts['Return_Period_To_mmdd'] == ' 0  3   3   1'
+    assert sheet.shape_texts['Return_Period_From_yyyy'] == sheet.shape_texts['Return_Period_To_yyyy'] == ' 2  0   2  3'
+
+    second_quarter = forms[f'2023_Q2_{PAYEE_TIN}-PAYEE0INC_1.xlsx']
+    assert [second_quarter[ref].value for ref in ('O38', 'T38', 'Y38', 'AD38')] == ['300.00', None, None, '300.00']
+    assert second_quarter.shape_texts['Return_Period_To_mmdd'] == ' 0  6   3   0'
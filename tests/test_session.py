@@ -0,0 +1,69 @@
+from session import ExcelSession
+from memory_backend import MemoryBackend, MemoryBook, MemorySheet
+from process import generate_work_units, process_payees, template_path
+from output_sink import DirectorySink
+from wtax_info import PayeeInfoDict
+from wtax_item import EntityItem, WithholdingTaxItem
+from datetime import datetime
+from pathlib import Path
+
+def source_backend():
+    source_sheet = MemorySheet(cells={(1, 1): 'DROP_PATH'})
+    return MemoryBackend({'source.xlsx': MemoryBook([source_sheet])})
+
+def test_template_handle_is_reused_across_leases(memory_backend):
+    with ExcelSession(memory_backend) as session:
+        with session.lease_template(template_path()) as first_template:
+            pass
+        with session.lease_template(template_path()) as second_template:
+            pass
+
+    assert first_template is second_template
+    assert memory_backend.app_starts == 1
+    assert memory_backend.book_opens == 1
+    assert memory_backend.app_quits == 1
+
+def test_pool_opens_one_handle_per_concurrent_lease(memory_backend):
+    with ExcelSession(memory_backend, pool_size=2) as session:
+        with session.lease_template(template_path()) as first_template:
+            with session.lease_template(template_path()) as second_template:
+                assert first_template is not second_template
+                assert first_template.book is not second_template.book
+
+        with session.lease_template(template_path()) as third_template:
+            assert third_template in (first_template, second_template)
+
+    assert memory_backend.app_starts == 2
+    assert memory_backend.book_opens == 2
+
+def test_source_book_is_opened_once():
+    backend = source_backend()
+
+    with ExcelSession(backend) as session:
+        first_sheet = session.first_sheet('source.xlsx')
+        assert session.first_sheet('source.xlsx') is first_sheet
+        assert first_sheet['A1'].value == 'DROP_PATH'
+
+    assert backend.book_opens == 1
+
+def test_forms_share_one_template_handle(memory_backend, payor_item, tmp_path: Path):
+    payee_dict = PayeeInfoDict()
+    for tin_branch in range(3):
+        payee_item = EntityItem(f'123-456-789-0000{tin_branch}', 'Payee Inc.', '', '', '', 'Makati City', '1200')
+        payee_dict.process_item(payee_item, WithholdingTaxItem('WC158', 'Goods', datetime(2023, 2, 1), 1000, 10))
+
+    with ExcelSession(memory_backend) as session:
+        results = process_payees({
+            'session': session,
+            'sink': DirectorySink(),
+            'work_units': generate_work_units(str(tmp_path), payee_dict, payor_item),
+            'journal': None
+        })
+
+    assert [result['is_success'] for result in results] == [True, True, True]
+    assert memory_backend.app_starts == 1
+    assert memory_backend.book_opens == 1
+    assert len(memory_backend.saved) == 3
+
+    saved_sheet = memory_backend.saved[results[-1]['file_path']].sheets[0]
+    assert saved_sheet.shape_texts['Payee_Branch'] == '  0   0   0   0   2'
@@ -0,0 +1,43 @@
+from session import ExcelSession
+from output_sink import DirectorySink
+from process import StampLayers, generate_work_units, template_path, write_payee
+from template_layout import load_layout
+from wtax_info import PayeeInfoDict
+from wtax_item import EntityItem, WithholdingTaxItem
+from datetime import datetime
+from pathlib import Path
+import pickle
+
+def test_unpickled_payor_copies_share_one_payor_layer(memory_backend, payor_item, monkeypatch, tmp_path: Path):
+    payee_dict = PayeeInfoDict()
+    for tin_branch in range(2):
+        payee_item = EntityItem(f'123-456-789-0000{tin_branch}', 'Payee Inc.', '', '', '', 'Makati City', '1200')
+        payee_dict.process_item(payee_item, WithholdingTaxItem('WC158', 'Goods', datetime(2023, 2, 1), 1000, 10))
+
+    work_units = [pickle.loads(pickle.dumps(work_unit)) for work_unit in generate_work_units(str(tmp_path), payee_dict, payor_item)]
+    assert work_units[0]['payor_item'] is not work_units[1]['payor_item']
+
+    applied_plans = []
+    apply_plan = memory_backend.apply_plan
+    def record_plan(sheet, write_plan):
+        applied_plans.append(write_plan)
+        apply_plan(sheet, write_plan)
+    monkeypatch.setattr(memory_backend, 'apply_plan', record_plan)
+
+    layers = StampLayers(load_layout(template_path()))
+    with ExcelSession(memory_backend) as session:
+        for work_unit in work_units:
+            write_payee({
+                'session': session,
+                'template_path': template_path(),
+                'layers': layers,
+                'sink': DirectorySink(),
+                'file_path': work_unit['file_path'],
+                'payee_info': work_unit['payee_info'],
+                'payor_item': work_unit['payor_item']
+            })
+
+    assert layers.payor_plan_count == 1
+    assert sum(write_plan is layers.payor_plan(payor_item) for write_plan in applied_plans) == 1
+    assert len(applied_plans) == 4
+    assert len(memory_backend.saved) == 2
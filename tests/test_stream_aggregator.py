@@ -0,0 +1,80 @@
+from synthetic import synthetic_rows
+from aggregate import WtaxColumns, aggregate_columns
+from pipeline import StreamAggregator
+from retrieve import EntityItemCache, parse_raw_item
+from process import generate_file_name, plan_payee
+from wtax_info import PayeeInfo
+from wtax_item import EntityItem
+from typing import Any, Iterable
+import pytest
+
+ROW_COUNT = 3000
+
+def parsed_rows(raw_rows: list[list[Any]]):
+    entity_cache = EntityItemCache()
+    return [parse_raw_item(raw_item, entity_cache) for raw_item in raw_rows]
+
+def forms_of(payee_infos: Iterable[tuple[int, PayeeInfo]], payor_item: EntityItem) -> dict[str, list[Any]]:
+    '''
+        {file name: every write of the form}
+    '''
+    return {
+        generate_file_name(payee_info, payee_count): list(plan_payee({'payee_info': payee_info, 'payor_item': payor_item}))
+        for payee_count, payee_info in payee_infos
+    }
+
+def aggregated_forms(raw_rows: list[list[Any]], payor_item: EntityItem, period: str):
+    '''
+        forms of the column aggregation, parsed on their own rows since the payee info grows its first item in place
+    '''
+    wtax_columns = WtaxColumns()
+    for payee_item, wtax_item in parsed_rows(raw_rows):
+        wtax_columns.append(payee_item, wtax_item)
+
+    return forms_of(aggregate_columns(wtax_columns, use_numpy=False, period=period), payor_item)
+
+def streamed_forms(raw_rows: list[list[Any]], payor_item: EntityItem, period: str, sorted_source: bool):
+    aggregator = StreamAggregator(sorted_source, period)
+
+    payee_infos: list[tuple[int, PayeeInfo]] = []
+    for payee_item, wtax_item in parsed_rows(raw_rows):
+        payee_infos += aggregator.add(payee_item, wtax_item)
+    payee_infos += aggregator.flush()
+
+    return forms_of(payee_infos, payor_item)
+
+@pytest.mark.parametrize('period', ['month', 'quarter'])
+def test_unsorted_source_gives_the_aggregated_forms(payor_item, period):
+    raw_rows = list(synthetic_rows(ROW_COUNT))
+
+    expected_forms = aggregated_forms(raw_rows, payor_item, period)
+
+    assert any(file_name.endswith('_2.xlsx') for file_name in expected_forms)
+    assert streamed_forms(raw_rows, payor_item, period, sorted_source=False) == expected_forms
+
+@pytest.mark.parametrize('period', ['month', 'quarter'])
+def test_sorted_source_gives_the_aggregated_forms(payor_item, period):
+    period_months = 1 if period == 'month' else 3
+    raw_rows = sorted(synthetic_rows(ROW_COUNT), key=lambda raw_item: (raw_item[0], raw_item[7].year, (raw_item[7].month - 1) // period_months))
+
+    assert streamed_forms(raw_rows, payor_item, period, sorted_source=True) == aggregated_forms(raw_rows, payor_item, period)
+
+def test_sorted_source_closes_each_payee_period_once_its_rows_end(payor_item):
+    raw_rows = sorted(synthetic_rows(200), key=lambda raw_item: (raw_item[0], raw_item[7].month))
+    aggregator = StreamAggregator(sorted_source=True)
+
+    completed_keys = []
+    for payee_item, wtax_item in parsed_rows(raw_rows):
+        for _, payee_info in aggregator.add(payee_item, wtax_item):
+            completed_keys.append((payee_info.info.tin, payee_info.month))
+            assert (payee_info.info.tin, int(payee_info.month)) < (payee_item.tin, wtax_item.month)
+
+    assert completed_keys
+
+def test_sorted_source_rejects_a_payee_period_seen_again():
+    rows = parsed_rows(list(synthetic_rows(200)))
+    aggregator = StreamAggregator(sorted_source=True)
+
+    with pytest.raises(ValueError, match='isn\'t sorted'):
+        for payee_item, wtax_item in rows:
+            aggregator.add(payee_item, wtax_item)
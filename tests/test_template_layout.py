@@ -0,0 +1,83 @@
+from process import template_path
+from template_layout import LAYOUT_SUFFIX, load_layout, template_hash
+from pathlib import Path
+import json
+import shutil
+import template_layout
+import zipfile
+import pytest
+
+@pytest.fixture
+def compiles(monkeypatch) -> list[str]:
+    '''
+        template paths of every layout compile, the layouts loaded by the process are forgotten
+    '''
+    compiled_paths: list[str] = []
+    compile_layout = template_layout.compile_layout
+
+    def counted_compile(template_path: str, content_hash: str | None = None):
+        compiled_paths.append(template_path)
+        return compile_layout(template_path, content_hash)
+
+    monkeypatch.setattr(template_layout, 'compile_layout', counted_compile)
+    monkeypatch.setattr(template_layout, 'loaded_layouts', {})
+
+    return compiled_paths
+
+def cached_layout(copied_path: Path):
+    with open(copied_path.with_name(copied_path.stem + LAYOUT_SUFFIX), encoding='utf-8') as cache_file:
+        return json.load(cache_file)
+
+def move_defined_name(copied_path: Path, name: str, cell_ref: str):
+    '''
+        rewrites the copied template with the defined name pointing at another cell
+    '''
+    with zipfile.ZipFile(copied_path) as template_zip:
+        parts = {part_name: template_zip.read(part_name) for part_name in template_zip.namelist()}
+
+    workbook_xml = parts['xl/workbook.xml'].decode('utf-8')
+    name_start = workbook_xml.index(f'<definedName name="{name}">')
+    name_end = workbook_xml.index('</definedName>', name_start)
+    parts['xl/workbook.xml'] = (workbook_xml[:name_start] + f'<definedName name="{name}">Page1!{cell_ref}' + workbook_xml[name_end:]).encode('utf-8')
+
+    with zipfile.ZipFile(copied_path, 'w', zipfile.ZIP_DEFLATED) as template_zip:
+        for part_name, part in parts.items():
+            template_zip.writestr(part_name, part)
+
+def test_cached_layout_skips_the_scan(compiles, tmp_path: Path, monkeypatch):
+    copied_path = tmp_path / '2307.xlsx'
+    shutil.copy(template_path(), copied_path)
+
+    layout = load_layout(str(copied_path))
+
+    assert compiles == [str(copied_path)]
+    assert cached_layout(copied_path)['content_hash'] == template_hash(str(copied_path)) == layout.content_hash
+    assert load_layout(str(copied_path)) is layout
+
+    monkeypatch.setattr(template_layout, 'loaded_layouts', {})
+    cached = load_layout(str(copied_path))
+
+    assert compiles == [str(copied_path)]
+    assert cached is not layout
+    assert cached.to_dict() == layout.to_dict()
+
+def test_changed_template_rebuilds_the_layout(compiles, tmp_path: Path, monkeypatch):
+    copied_path = tmp_path / '2307.xlsx'
+    shutil.copy(template_path(), copied_path)
+
+    layout = load_layout(str(copied_path))
+    assert layout.cell('Total_Base') == 'AD48'
+
+    move_defined_name(copied_path, 'Total_Base', '$AE$48')
+    changed_layout = load_layout(str(copied_path))
+
+    assert compiles == [str(copied_path)] * 2
+    assert changed_layout.content_hash != layout.content_hash
+    assert changed_layout.cell('Total_Base') == 'AE48'
+    assert cached_layout(copied_path)['content_hash'] == changed_layout.content_hash
+    assert cached_layout(copied_path)['cells']['Total_Base'] == 'AE48'
+
+    monkeypatch.setattr(template_layout, 'loaded_layouts', {})
+
+    assert load_layout(str(copied_path)).cell('Total_Base') == 'AE48'
+    assert len(compiles) == 2
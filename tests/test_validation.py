@@ -0,0 +1,95 @@
+from synthetic import synthetic_rows
+from checkpoint import ErrorReport
+from retrieve import parse_raw_item, parse_src_rows
+from validation import validate_chunk, validate_rows
+from typing import Any, Callable
+import random
+import pytest
+
+ROW_COUNT = 2000
+
+CORRUPTIONS: list[tuple[int, Callable[[Any], Any]]] = [
+    (0, lambda tin: tin.replace('-', '', 1)),
+    (0, lambda tin: tin[:-1]),
+    (1, lambda _: ''),
+    (5, lambda address: address * 8),
+    (6, lambda _: '123456'),
+    (7, lambda date: date.strftime('%m/%d/%Y')),
+    (8, lambda _: ' '),
+    (9, lambda _: None),
+    (10, lambda _: 'N/A'),
+    (11, lambda _: -5),
+    (14, lambda _: '123-45-6789')
+]
+
+def src_rows(raw_rows: list[list[Any]]):
+    return [(f'A{row}:O{row}', raw_item) for row, raw_item in enumerate(raw_rows, 15)]
+
+def corrupted_rows(row_count: int, seed: int = 23):
+    '''
+        synthetic rows with about a fifth of them corrupted in one or two columns, organization
+        names are blanked together with the individual names
+    '''
+    rnd = random.Random(seed)
+    raw_rows = list(synthetic_rows(row_count))
+
+    for raw_item in raw_rows:
+        if rnd.random() >= 0.2: continue
+
+        for column, corrupt in rnd.sample(CORRUPTIONS, rnd.randint(1, 2)):
+            raw_item[column] = corrupt(raw_item[column])
+            if column == 1: raw_item[2] = raw_item[3] = ''
+
+    return raw_rows
+
+def parse_fails(raw_item: list[Any]):
+    try:
+        parse_raw_item(raw_item)
+    except (TypeError, ValueError):
+        return True
+
+    return False
+
+def test_chunk_errors_match_the_per_row_errors():
+    rows = src_rows(corrupted_rows(ROW_COUNT))
+
+    chunk_errors = validate_chunk(rows)
+
+    assert any(chunk_errors)
+    assert chunk_errors == [validate_chunk([row])[0] for row in rows]
+
+def test_rows_are_flagged_when_their_items_cannot_be_created():
+    rows = src_rows(corrupted_rows(ROW_COUNT))
+
+    flagged = [bool(row_errors) for row_errors in validate_chunk(rows)]
+
+    assert flagged == [parse_fails(raw_item) for _, raw_item in rows]
+
+def test_reading_stops_at_the_first_row_without_a_tin():
+    raw_rows = list(synthetic_rows(50))
+    raw_rows[30][0] = ' '
+
+    validated = list(validate_rows(src_rows(raw_rows), chunk_size=7))
+
+    assert [current_ref for current_ref, *_ in validated] == [f'A{row}:O{row}' for row in range(15, 45)]
+
+def test_invalid_row_raises_every_invalid_column_without_an_error_report():
+    raw_rows = list(synthetic_rows(20))
+    raw_rows[5][6] = '123456'
+    raw_rows[5][10] = 'N/A'
+
+    with pytest.raises(ValueError) as error_info:
+        parse_src_rows(src_rows(raw_rows))
+
+    assert str(error_info.value).startswith('G: ')
+    assert '; K: ' in str(error_info.value)
+
+def test_invalid_rows_are_collected_to_the_error_report():
+    raw_rows = corrupted_rows(ROW_COUNT)
+    error_report = ErrorReport()
+
+    wtax_columns = parse_src_rows(src_rows(raw_rows), error_report=error_report)
+
+    failed_count = sum(parse_fails(raw_item) for raw_item in raw_rows)
+    assert len(error_report.errors) == failed_count
+    assert len(wtax_columns) == ROW_COUNT - failed_count
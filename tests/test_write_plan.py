@@ -0,0 +1,69 @@
+from write_plan import WritePlan
+from process import plan_payee, template_path
+from wtax_info import PayeeInfoDict, WtaxCellRef
+from wtax_item import EntityItem, WithholdingTaxItem
+from datetime import datetime
+
+def test_range_blocks_merge_consecutive_rows_of_a_column():
+    write_plan = WritePlan()
+    write_plan.add('A38', 'first', 'range')
+    write_plan.add('Total_Base', '10.00', 'range')
+    write_plan.add('A39', 'second', 'range')
+    write_plan.add('A41', 'fourth', 'range')
+    write_plan.add('L38', 'WC158', 'range')
+    write_plan.add('Payee_Name', 'Payee Inc.', 'shape')
+
+    assert write_plan.range_blocks() == [
+        ('A38:A39', [['first'], ['second']]),
+        ('A41', 'fourth'),
+        ('L38', 'WC158'),
+        ('Total_Base', '10.00')
+    ]
+    assert write_plan.shape_texts() == [('Payee_Name', 'Payee Inc.')]
+
+def test_later_write_replaces_the_value_at_its_position():
+    write_plan = WritePlan()
+    write_plan.add('A38', None, 'range')
+    write_plan.add('A39', None, 'range')
+    write_plan.add('A38', 'first', 'range')
+
+    assert write_plan.range_blocks() == [('A38:A39', [['first'], [None]])]
+    assert len(write_plan) == 2
+
+def plan_of_lines(payor_item: EntityItem, line_count: int):
+    payee_dict = PayeeInfoDict()
+    payee_item = EntityItem('123-456-789-00000', 'Payee Inc.', '', '', '', 'Makati City', '1200')
+    for line in range(line_count):
+        payee_dict.process_item(payee_item, WithholdingTaxItem(f'WC{line:03d}', f'Line {line}', datetime(2023, 2, 1), 100 + line, 1))
+
+    payee_info = next(payee_info for _, payee_info in payee_dict)
+
+    return plan_payee({'payee_info': payee_info, 'payor_item': payor_item})
+
+def test_plan_payee_writes_the_atc_rows_as_column_blocks(payor_item):
+    write_plan = plan_of_lines(payor_item, 3)
+    blocks = dict(write_plan.range_blocks())
+
+    first_row = WtaxCellRef.default_row + 1
+    last_row = WtaxCellRef.default_row + WtaxCellRef.max_rows
+    assert blocks[f'L{first_row}:L{last_row}'] == [['WC000'], ['WC001'], ['WC002']] + [[None]] * 7
+    assert blocks[f'T{first_row}:T{last_row}'] == [['100.00'], ['101.00'], ['102.00']] + [[None]] * 7
+    assert blocks[f'O{first_row}:O{last_row}'] == [[None]] * 10
+    assert blocks['Total_2M'] == '303.00'
+    assert blocks['Total_1M'] is None
+
+    column_blocks = [range_ref for range_ref, _ in write_plan.range_blocks() if ':' in range_ref]
+    assert column_blocks == [f'{column}{first_row}:{column}{last_row}' for column in ('A', 'L', 'O', 'T', 'Y', 'AD', 'AI')]
+
+def test_apply_plan_writes_one_range_per_block(memory_backend, payor_item):
+    write_plan = plan_of_lines(payor_item, 2)
+    template_sheet = memory_backend.open_book(memory_backend.start_app(), template_path()).sheets[0]
+
+    memory_backend.apply_plan(template_sheet, write_plan)
+
+    assert memory_backend.range_writes == len(write_plan.range_blocks())
+    assert memory_backend.shape_writes == len(write_plan.shape_texts())
+    assert template_sheet['L38'].value == 'WC000'
+    assert template_sheet['L39'].value == 'WC001'
+    assert template_sheet['L40'].value is None
+    assert template_sheet['Total_2M'].value == '201.00'
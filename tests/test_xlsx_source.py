@@ -0,0 +1,140 @@
+from alphalist import PAYOR_FIELDS
+from xlsx_source import XlsxSource, is_date_format
+from datetime import datetime
+from pathlib import Path
+import zipfile
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+STYLES_XML = (
+    f'<styleSheet xmlns="{MAIN_NS}"><numFmts count="3">'
+    '<numFmt numFmtId="164" formatCode="mmm\\-yy"/>'
+    '<numFmt numFmtId="165" formatCode="&quot;Day &quot;0"/>'
+    '<numFmt numFmtId="166" formatCode="[Red]#,##0.00"/>'
+    '</numFmts><cellXfs count="5">'
+    '<xf numFmtId="0" fontId="0"/><xf numFmtId="14" fontId="0"/><xf numFmtId="164" fontId="0"/>'
+    '<xf numFmtId="165" fontId="0"/><xf numFmtId="166" fontId="0"/>'
+    '</cellXfs></styleSheet>'
+)
+SHARED_STRINGS = [
+    '<si><t>Payee Inc.</t></si>',
+    '<si><r><t>Rich </t></r><r><rPr><b/></rPr><t>Text</t></r><rPh sb="0" eb="1"><t>phonetic</t></rPh></si>',
+    '<si><t>00123</t></si>',
+    '<si><t>WC158</t></si>'
+]
+
+def write_source_book(book_path: Path, sheet_rows: dict[int, str], date1904: bool = False, payor_cells: dict[str, str] | None = None):
+    '''
+        writes a minimal source book package: its first sheet holds the given `<c>` xml of each row,
+        every payor field is a defined name of a cell at column B of rows 1-11
+    '''
+    payor_cells = payor_cells or {}
+    rows = dict(sheet_rows)
+    for field_row, field in enumerate(PAYOR_FIELDS, 1):
+        if field in payor_cells: rows[field_row] = payor_cells[field]
+
+    sheet_data = ''.join(f'<row r="{row}">{rows[row]}</row>' for row in sorted(rows))
+    defined_names = ''.join(
+        f'<definedName name="{field}">\'Source Data\'!$B${field_row}</definedName>'
+        for field_row, field in enumerate(PAYOR_FIELDS, 1)
+    )
+
+    workbook_props = '<workbookPr date1904="1"/>' if date1904 else '<workbookPr/>'
+
+    with zipfile.ZipFile(book_path, 'w') as package:
+        package.writestr('xl/workbook.xml', (
+            f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">{workbook_props}'
+            '<sheets><sheet name="Source Data" sheetId="1" r:id="rId1"/></sheets>'
+            f'<definedNames>{defined_names}<definedName name="_xlnm.Print_Area">\'Source Data\'!$A$1:$O$20</definedName></definedNames>'
+            '</workbook>'
+        ))
+        package.writestr('xl/_rels/workbook.xml.rels', (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{REL_NS}/styles" Target="styles.xml"/>'
+            f'<Relationship Id="rId3" Type="{REL_NS}/sharedStrings" Target="/xl/sharedStrings.xml"/>'
+            '</Relationships>'
+        ))
+        package.writestr('xl/styles.xml', STYLES_XML)
+        package.writestr('xl/sharedStrings.xml', f'<sst xmlns="{MAIN_NS}">{"".join(SHARED_STRINGS)}</sst>')
+        package.writestr('xl/worksheets/sheet1.xml', f'<worksheet xmlns="{MAIN_NS}"><sheetData>{sheet_data}</sheetData></worksheet>')
+
+def row_values(book_path: Path, row: int):
+    with XlsxSource(str(book_path)) as source:
+        return next(row_values for current_row, row_values in source.iter_rows() if current_row == row)
+
+def test_cell_values_are_the_xlwings_values(tmp_path: Path):
+    book_path = tmp_path / 'source.xlsx'
+    write_source_book(book_path, {20: (
+        '<c r="A20" t="s"><v>0</v></c><c r="B20" t="s"><v>1</v></c><c r="C20" t="s"><v>2</v></c>'
+        '<c r="D20" t="inlineStr"><is><t>Inline &amp; text</t></is></c><c r="E20" t="str"><f>A20</f><v>Payee Inc.</v></c>'
+        '<c r="F20"><v>1200</v></c><c r="G20" s="4"><v>-1234.5</v></c><c r="H20" t="b"><v>1</v></c>'
+        '<c r="I20" t="e"><v>#N/A</v></c><c r="J20" s="1"/><c r="L20"><v>1E-2</v></c>'
+    )})
+
+    assert row_values(book_path, 20) == {
+        1: 'Payee Inc.',
+        2: 'Rich Text',
+        3: '00123',
+        4: 'Inline & text',
+        5: 'Payee Inc.',
+        6: 1200.0,
+        7: -1234.5,
+        8: True,
+        12: 0.01
+    }
+
+def test_only_the_date_styles_give_datetimes(tmp_path: Path):
+    book_path = tmp_path / 'source.xlsx'
+    write_source_book(book_path, {20: (
+        '<c r="A20" s="1"><v>44958</v></c><c r="B20" s="2"><v>44958.5</v></c>'
+        '<c r="C20" s="3"><v>44958</v></c><c r="D20" s="4"><v>44958</v></c><c r="E20"><v>44958</v></c>'
+    )})
+
+    assert row_values(book_path, 20) == {
+        1: datetime(2023, 2, 1),
+        2: datetime(2023, 2, 1, 12),
+        3: 44958.0,
+        4: 44958.0,
+        5: 44958.0
+    }
+    assert is_date_format('[$-409]mmm\\-yy;@')
+    assert not is_date_format('"Day "0')
+    assert not is_date_format('[Red]#,##0.00')
+
+def test_dates_of_a_1904_book(tmp_path: Path):
+    book_path = tmp_path / 'source.xlsx'
+    write_source_book(book_path, {20: '<c r="A20" s="1"><v>43496</v></c><c r="B20"><v>43496</v></c>'}, date1904=True)
+
+    assert row_values(book_path, 20) == {1: datetime(2023, 2, 1), 2: 43496.0}
+
+def test_payor_fields_and_rows_of_the_source(tmp_path: Path):
+    book_path = tmp_path / 'source.xlsx'
+    source_row = (
+        '<c r="A{row}" t="inlineStr"><is><t>123-456-789-000{row}</t></is></c><c r="B{row}" t="s"><v>0</v></c>'
+        '<c r="H{row}" s="2"><v>44958</v></c><c r="I{row}" t="s"><v>3</v></c><c r="K{row}"><v>1000</v></c>'
+    )
+    write_source_book(
+        book_path,
+        {15: source_row.format(row=15), 16: source_row.format(row=16), 18: source_row.format(row=18)},
+        payor_cells={
+            'DROP_PATH': '<c r="B1" t="inlineStr"><is><t>/tmp/drop</t></is></c>',
+            'PAYOR_TIN': '<c r="B2" t="s"><v>2</v></c>',
+            'PAYOR_ZIP_CODE': '<c r="B8"><v>1200</v></c>'
+        }
+    )
+
+    with XlsxSource(str(book_path)) as source:
+        payor_fields = source.payor_fields
+        rows = list(source.rows())
+
+    assert payor_fields == {
+        **{field: None for field in PAYOR_FIELDS},
+        'DROP_PATH': '/tmp/drop', 'PAYOR_TIN': '00123', 'PAYOR_ZIP_CODE': 1200.0
+    }
+    assert [row_ref for row_ref, _ in rows] == ['A15:O15', 'A16:O16']
+    assert rows[0][1] == [
+        '123-456-789-00015', 'Payee Inc.', None, None, None, None, None, datetime(2023, 2, 1),
+        'WC158', None, 1000.0, None, None, None, None
+    ]
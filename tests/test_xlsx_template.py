@@ -0,0 +1,100 @@
+from xlsx_backend import XlsxBackend
+from xlsx_template import XlsxTemplate
+from process import plan_payee, template_path
+from wtax_info import PayeeInfoDict
+from wtax_item import EntityItem, WithholdingTaxItem
+from utils import split_cell_ref
+from datetime import datetime
+from pathlib import Path
+from xml.etree import ElementTree
+import re
+import zipfile
+
+SPREADSHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+def saved_parts(template: XlsxTemplate, file_path: Path) -> tuple[str, str]:
+    '''
+        returns the xml of the first sheet and of its drawing of a saved form, both checked to be well formed
+    '''
+    with zipfile.ZipFile(file_path) as package:
+        assert package.testzip() is None
+        sheet_xml = package.read(template.sheet_part).decode('utf-8')
+        drawing_xml = package.read(str(template.drawing_part)).decode('utf-8')
+
+    ElementTree.fromstring(sheet_xml)
+    ElementTree.fromstring(drawing_xml)
+
+    return sheet_xml, drawing_xml
+
+def cell_tag(template: XlsxTemplate, sheet_xml: str, ref: str):
+    cell_ref = template.resolve(ref)
+    cell_match = re.search(rf'<c r="{cell_ref}"[^>]*?(/>|>.*?</c>)', sheet_xml)
+    assert cell_match is not None
+
+    return cell_match.group(0)
+
+def shape_body(template: XlsxTemplate, drawing_xml: str, shape_name: str):
+    shape_id = template.shape_slots[shape_name].shape_id
+    shape_start = drawing_xml.index(f'<xdr:cNvPr id="{shape_id}"')
+
+    return drawing_xml[drawing_xml.index('<xdr:txBody>', shape_start):drawing_xml.index('</xdr:txBody>', shape_start)]
+
+def test_rendered_form_escapes_and_converts_its_values(payor_item, tmp_path: Path):
+    backend = XlsxBackend()
+    book = backend.open_book(backend.start_app(), template_path())
+    template = book.template
+
+    payee_dict = PayeeInfoDict()
+    payee_item = EntityItem('123-456-789-00000', 'Tan & Sons <Trading>', '', '', '', 'Makati City', '1200')
+    payee_dict.process_item(payee_item, WithholdingTaxItem('WC158', 'Goods & <Services>', datetime(2023, 2, 1), 1234.5, 12.35))
+    payee_info = next(payee_info for _, payee_info in payee_dict)
+
+    backend.apply_plan(book.sheets[0], plan_payee({'payee_info': payee_info, 'payor_item': payor_item}))
+    book.save(str(tmp_path / 'form.xlsx'))
+
+    sheet_xml, drawing_xml = saved_parts(template, tmp_path / 'form.xlsx')
+    description_style = template.cell_slots[split_cell_ref(template.resolve('A38'))].style
+    total_style = template.cell_slots[split_cell_ref(template.resolve('Total_Base'))].style
+
+    assert cell_tag(template, sheet_xml, 'A38') == (
+        f'<c r="A38" s="{description_style}" t="inlineStr"><is><t xml:space="preserve">Goods &amp; &lt;Services&gt;</t></is></c>'
+    )
+    assert cell_tag(template, sheet_xml, 'L38').endswith('t="inlineStr"><is><t xml:space="preserve">WC158</t></is></c>')
+    assert cell_tag(template, sheet_xml, 'Total_Base') == f'<c r="{template.resolve("Total_Base")}" s="{total_style}"><v>1234.5</v></c>'
+    assert cell_tag(template, sheet_xml, 'Total_1M').endswith('/>')
+    assert '<a:t>TAN &amp; SONS &lt;TRADING&gt;</a:t>' in shape_body(template, drawing_xml, 'Payee_Name')
+
+def test_emptied_cells_and_shapes_are_cleared(tmp_path: Path):
+    template = XlsxTemplate(template_path())
+    total_ref = split_cell_ref(template.resolve('Total_Base'))
+
+    template.save(str(tmp_path / 'first.xlsx'), {total_ref: '10.00'}, {'Payee_Name': 'Payee Inc.', 'Rectangle 234': ' 2307'})
+    template.save(str(tmp_path / 'second.xlsx'), {total_ref: None}, {'Payee_Name': '', 'Rectangle 234': ''})
+
+    first_sheet, first_drawing = saved_parts(template, tmp_path / 'first.xlsx')
+    second_sheet, second_drawing = saved_parts(template, tmp_path / 'second.xlsx')
+
+    assert '<v>10.0</v>' in cell_tag(template, first_sheet, 'Total_Base')
+    assert cell_tag(template, second_sheet, 'Total_Base') == f'<c r="{template.resolve("Total_Base")}" s="{template.cell_slots[total_ref].style}"/>'
+    assert '<a:t>Payee Inc.</a:t>' in shape_body(template, first_drawing, 'Payee_Name')
+    for shape_name in ('Payee_Name', 'Rectangle 234'):
+        assert '<a:t>' not in shape_body(template, second_drawing, shape_name)
+        assert '<a:p>' in shape_body(template, second_drawing, shape_name)
+
+def test_only_plain_decimal_texts_become_numbers(tmp_path: Path):
+    template = XlsxTemplate(template_path())
+    texts = ['303.00', '-5', ' 12 ', '00123', '1e5', '12.', '1,000.00', '123-456-789', 'WC158']
+    cells = {(38, col): text for col, text in zip((1, 12, 15, 20, 25, 30, 35), texts)}
+    cells.update({(39, 1): texts[7], (39, 12): texts[8]})
+
+    template.save(str(tmp_path / 'form.xlsx'), cells, {})
+
+    sheet_xml, _ = saved_parts(template, tmp_path / 'form.xlsx')
+    cell_values = {}
+    for cell in ElementTree.fromstring(sheet_xml).iter(f'{SPREADSHEET_NS}c'):
+        if split_cell_ref(cell.get('r')) not in cells: continue
+        value = cell.find(f'{SPREADSHEET_NS}v')
+        inline_text = cell.find(f'{SPREADSHEET_NS}is/{SPREADSHEET_NS}t')
+        cell_values[split_cell_ref(cell.get('r'))] = float(value.text) if value is not None else inline_text.text
+
+    assert [cell_values[cell] for cell in cells] == [303.0, -5.0, 12.0, 123.0, '1e5', '12.', '1,000.00', '123-456-789', 'WC158']
@@ -0,0 +1,74 @@
+from xlsx_template import XlsxTemplate, DEFINED_NAME_PATTERN, parse_attrs
+from xlsx_workbook import XlsxWorkbookWriter, SHEET_TITLE_MAX_LEN, sheet_title
+from process import template_path
+from utils import split_cell_ref
+from collections import Counter
+from pathlib import Path
+from xml.etree import ElementTree
+import re
+import zipfile
+
+LONG_NAME = '2023_1_123-456-789-00000-AVeryLongPayeeNameTradingCorporation'
+
+def test_sheet_titles_keep_the_period_and_the_count():
+    used_titles: set[str] = set()
+
+    titles = [
+        sheet_title(name, used_titles)
+        for name in (f'{LONG_NAME}_1', f'{LONG_NAME}_2', f'{LONG_NAME}_2', '2023_Q1_Payee: [A/B]_1', 'Payee', 'payee')
+    ]
+
+    assert titles == [
+        '2023_1_123-456-789-00000-AVer_1',
+        '2023_1_123-456-789-00000-AVer_2',
+        '2023_1_123-456-789-00000-AV~2_2',
+        '2023_Q1_Payee_ _A_B__1',
+        'Payee',
+        'payee~2'
+    ]
+    assert all(len(title) <= SHEET_TITLE_MAX_LEN for title in titles)
+
+def test_workbook_shares_the_template_parts(tmp_path: Path):
+    template = XlsxTemplate(template_path())
+    total_ref = split_cell_ref(template.resolve('Total_Base'))
+    workbook_path = tmp_path / 'forms.xlsx'
+
+    with open(workbook_path, 'wb') as workbook_file:
+        with XlsxWorkbookWriter(template, workbook_file) as workbook_writer:
+            titles = [
+                workbook_writer.add_sheet(f'{LONG_NAME}_{count}', {total_ref: f'{count}00.00'}, {'Payee_Name': f'Payee {count}'})
+                for count in (1, 2, 3)
+            ]
+
+    with zipfile.ZipFile(workbook_path) as package:
+        assert package.testzip() is None
+        part_counts = Counter(package.namelist())
+        workbook_xml = package.read('xl/workbook.xml').decode('utf-8')
+        sheet_xmls = [package.read(f'xl/worksheets/sheet{index}.xml').decode('utf-8') for index in (1, 2, 3)]
+        sheet_rels = [package.read(f'xl/worksheets/_rels/sheet{index}.xml.rels').decode('utf-8') for index in (1, 2, 3)]
+
+    assert titles == [f'2023_1_123-456-789-00000-AVer_{count}' for count in (1, 2, 3)]
+    assert [sheet.get('name') for sheet in ElementTree.fromstring(workbook_xml).iter('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}sheet')] == titles
+
+    shared_parts = [
+        part_name for part_name in template.part_names
+        if part_name.startswith(('xl/styles', 'xl/theme/', 'xl/media/', 'xl/sharedStrings', 'xl/printerSettings/'))
+    ]
+    assert len(shared_parts) == 6
+    assert all(part_counts[part_name] == 1 for part_name in shared_parts)
+    assert max(part_counts.values()) == 1
+    assert {f'xl/drawings/drawing{index}.xml' for index in (1, 2, 3)} <= set(part_counts)
+
+    template_names = [parse_attrs(name_attrs)['name'] for name_attrs, _ in DEFINED_NAME_PATTERN.findall(template.read_part('xl/workbook.xml'))]
+    local_names = [
+        (parse_attrs(name_attrs)['name'], parse_attrs(name_attrs)['localSheetId'], name_ref)
+        for name_attrs, name_ref in DEFINED_NAME_PATTERN.findall(workbook_xml)
+    ]
+    assert len(local_names) == len(template_names) * 3
+    assert ('Total_Base', '1', f'\'{titles[1]}\'!$AD$48') in local_names
+    assert all(name_ref.startswith(f'\'{titles[int(sheet_id)]}\'!') for _, sheet_id, name_ref in local_names)
+
+    for index, (sheet_xml, rels_xml) in enumerate(zip(sheet_xmls, sheet_rels), 1):
+        assert f'<v>{index}00.0</v>' in sheet_xml
+        assert f'Target="../drawings/drawing{index}.xml"' in rels_xml
+        assert ('tabSelected="1"' in sheet_xml) == (index == 1)